@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+
+Benchmark of build buffers of large images (1 GB by default), kept in memory or backed by a temporary file.
+
+Each variant runs in a new process, which creates the build buffer with Buffer.create_build_buffer and goes through
+the steps of a build:
+ - fill - the buffer is filled with 0xFF as before the layout is built,
+ - write - image content is written in chunks, as components write their values,
+ - hash - SHA-384 of the image is calculated over a memoryview, as by hash functions,
+ - save - the image is written to a file as by BinaryGenerator.save.
+The benchmark reports time of the steps, peak resident memory of the process and its resident memory not backed by
+files (anonymous and shared memory, Linux only) after the image is written. Pages of a disk-backed buffer are part of
+the page cache and can be written back to the file and dropped under memory pressure, pages of a buffer in memory
+can't without swap.
+
+The benchmark fails (exit code 1) if the variants produce different images.
+
+Usage: python3 benchmark/buffer_benchmark.py [--size-mb MB] [--dir DIR] [-n RUNS]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess  # nosec - runs this script with the current interpreter only
+import sys
+import tempfile
+import time
+
+IBST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, IBST_DIR)
+
+# pylint: disable=wrong-import-position
+from tool.FileManager import FileManager
+from tool.LibConfig import LibConfig
+from tool.structures import Buffer, DiskBuffer
+
+VARIANTS = ['memory', 'disk']
+CHUNK_SIZE = 1024 * 1024
+STEPS = ['fill', 'write', 'hash', 'save']
+
+
+def get_unbacked_memory_mb():
+    """Returns resident memory of the process not backed by files [MB] or None if it's not known. Anonymous mappings
+    of Buffer are shared, so they are counted as shared memory."""
+    try:
+        with open('/proc/self/status', encoding='utf-8') as status:
+            sizes = [int(line.split()[1]) for line in status if line.startswith(('RssAnon:', 'RssShmem:'))]
+    except OSError:
+        return None
+    return sum(sizes) / 1024 if sizes else None
+
+
+def get_peak_memory_mb():
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        # not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_variant(variant, size, directory, output_path):
+    """Builds image of given size in the buffer of the variant, returns times of steps and memory usage."""
+    LibConfig.diskBufferThreshold = None if variant == 'memory' else 0
+    LibConfig.diskBufferDir = directory
+    chunks = [random.Random(index).getrandbits(CHUNK_SIZE * 8).to_bytes(CHUNK_SIZE, 'little') for index in range(4)]
+    times = {}
+
+    start = time.perf_counter()
+    buffer = Buffer.create_build_buffer(size)
+    expected_type = Buffer if variant == 'memory' else DiskBuffer
+    if type(buffer) is not expected_type:  # pylint: disable=unidiomatic-typecheck
+        raise RuntimeError(f"Buffer of the '{variant}' variant is {type(buffer).__name__}")
+    buffer.fill(0xFF, 0, size)
+    times['fill'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buffer.seek(0)
+    # the last chunk is left filled, as padding of the image
+    for index, offset in enumerate(range(0, size - CHUNK_SIZE, CHUNK_SIZE)):
+        buffer.seek(offset)
+        buffer.write(chunks[index % len(chunks)])
+    buffer.seek(size)
+    times['write'] = time.perf_counter() - start
+    unbacked_mb = get_unbacked_memory_mb()
+
+    start = time.perf_counter()
+    with memoryview(buffer) as view:
+        digest = hashlib.sha384(view[:buffer.tell()]).hexdigest()
+    times['hash'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buffer = buffer.reduce_buffer_to_match_content()
+    with memoryview(buffer) as view, view[:buffer.tell()] as data:
+        FileManager.save_binary_file(output_path, data)
+    times['save'] = time.perf_counter() - start
+    buffer.close()
+    return {'times': times, 'digest': digest, 'peak_mb': get_peak_memory_mb(), 'unbacked_mb': unbacked_mb}
+
+
+def run_in_process(variant, size, directory, output_path):
+    command = [sys.executable, os.path.abspath(__file__), '--variant', variant, '--size', str(size),
+               '--output', output_path]
+    if directory:
+        command += ['--dir', directory]
+    process = subprocess.run(command, capture_output=True, text=True, check=False)  # nosec - fixed command line
+    if process.returncode != 0:
+        raise RuntimeError(f"'{variant}' variant failed with exit code {process.returncode}:\n{process.stderr}")
+    return json.loads(process.stdout)
+
+
+def file_digest(path):
+    digest = hashlib.sha384()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of build buffers of large images')
+    parser.add_argument('--size-mb', type=int, default=1024, help='image size in MB (default: 1024)')
+    parser.add_argument('--dir', help='directory of disk-backed buffers (default: system temporary directory)')
+    parser.add_argument('-n', '--runs', type=int, default=1, help='number of runs of each variant')
+    # single variant run in a child process
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.size, args.dir, args.output)))
+        return 0
+
+    size = args.size_mb * 1024 * 1024
+    output_dir = tempfile.mkdtemp(prefix='ibst-buffer-benchmark-')
+    failed = False
+    try:
+        print(f"image size: {args.size_mb} MB, disk buffers in: {args.dir or tempfile.gettempdir()}\n")
+        print(f"{'variant':<10}" + ''.join(f"{step + ' [s]':>12}" for step in STEPS) +
+              f"{'total [s]':>12}{'peak RSS [MB]':>16}{'unbacked [MB]':>18}")
+        digests = set()
+        for variant in VARIANTS:
+            for _ in range(args.runs):
+                output_path = os.path.join(output_dir, f'{variant}.bin')
+                result = run_in_process(variant, size, args.dir, output_path)
+                digests.add(result['digest'])
+                digests.add(file_digest(output_path))
+                os.remove(output_path)
+                times = result['times']
+                peak, unbacked = (f"{result[key]:.0f}" if result[key] is not None else '-'
+                                  for key in ('peak_mb', 'unbacked_mb'))
+                print(f"{variant:<10}" + ''.join(f"{times[step]:>12.2f}" for step in STEPS) +
+                      f"{sum(times.values()):>12.2f}{peak:>16}{unbacked:>18}")
+        if len(digests) != 1:
+            print("\nFAILED: variants produced different images")
+            failed = True
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+
+Benchmark and check of digests calculated in the thread pool of DigestScheduler.
+
+CoSigningManifest.xml is built with the test key and a module binary (64 MB by default), once for each number of
+digest threads (LibConfig.digestThreads, 1 disables the scheduler). The benchmark reports build time and number of
+digests taken from the thread pool.
+
+The benchmark fails (exit code 1) if a build fails, values of hash and crc functions (except signatures, which are
+randomized) differ between the variants, or a build with 2 or more threads doesn't take any digest from the pool.
+
+Usage: python3 benchmark/digest_benchmark.py [--size-mb MB] [--threads N [N ...]]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+IBST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, IBST_DIR)
+
+# pylint: disable=wrong-import-position
+from tool.BinaryGenerator import BinaryGenerator
+from tool.DigestScheduler import DigestScheduler
+from tool.LibConfig import LibConfig
+from tool.PathResolver import PathResolver
+from tool.SecureXmlParser import SecureXmlParser
+from tool.components.IComponent import IComponent
+from tool.components.function.CrcFunction import CrcFunction
+from tool.components.function.HashFunction import HashFunction
+from tool.components.function.SignFunction import SignFunction
+# pylint: enable=wrong-import-position
+
+CONFIG = os.path.join(IBST_DIR, 'config', 'CoSigningManifest.xml')
+TEST_KEY = os.path.join(IBST_DIR, 'config', '3k_test_key_private.pem')
+
+
+def setup_lib_config():
+    LibConfig.toolType = LibConfig.ToolType.IBST
+    LibConfig.appDir = IBST_DIR
+    LibConfig.settingsTag = 'settings'
+    LibConfig.overridesTag = 'ibst_overrides'
+    LibConfig.defaultPaddingValue = IComponent.AlignByte.Byte00
+    LibConfig.rootTag = 'ibst'
+    LibConfig.maxBufferSize = 512 * 1024 * 1024
+
+
+def build(binary, threads):
+    """Builds the configuration, returns build time, digests taken from the pool and values of digest functions."""
+    LibConfig.digestThreads = threads
+    pool_digests = []
+    get_result = DigestScheduler.get_result.__func__
+
+    def counting_get_result(cls, function):
+        result = get_result(cls, function)
+        if result is not None:
+            pool_digests.append(function.name)
+        return result
+
+    DigestScheduler.get_result = classmethod(counting_get_result)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator = BinaryGenerator(CONFIG, SecureXmlParser.Schema.NoSchema, PathResolver(IBST_DIR))
+            generator.apply_overrides([f'key={TEST_KEY}', f'module_bin={binary}', 'module_bin_enabled=1'])
+            generator._substitute_nodes()  # pylint: disable=protected-access
+            start = time.perf_counter()
+            generator.build_binary()
+            build_time = time.perf_counter() - start
+    finally:
+        DigestScheduler.get_result = classmethod(get_result)
+    digests = {component.get_string_path(): bytes(component.value) for component in generator.layout_root.descendants
+               if isinstance(component, (HashFunction, CrcFunction)) and not isinstance(component, SignFunction) and
+               component.value is not None}
+    return build_time, len(pool_digests), digests
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of digests calculated in a thread pool')
+    parser.add_argument('--size-mb', type=int, default=64, help='size of the module binary in MB (default: 64)')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4],
+                        help='numbers of digest threads to compare (default: 1 2 4)')
+    args = parser.parse_args()
+
+    setup_lib_config()
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        binary = os.path.join(tmp_dir, 'module.bin')
+        with open(binary, 'wb') as f:
+            f.write(os.urandom(args.size_mb * 1024 * 1024))
+
+        print(f"module binary: {args.size_mb} MB\n")
+        print(f"{'threads':<10}{'build [s]':>12}{'digests from pool':>20}")
+        reference = None
+        for threads in args.threads:
+            build_time, pool_digests, digests = build(binary, threads)
+            print(f"{threads:<10}{build_time:>12.2f}{pool_digests:>20}")
+            if reference is None:
+                reference = digests
+            elif digests != reference:
+                print(f"FAILED: digests built with {threads} threads differ")
+                failed = True
+            if threads >= 2 and pool_digests == 0:
+                print(f"FAILED: no digest was taken from the thread pool with {threads} threads")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+
+Micro-benchmark of formula evaluation on the shipped configurations.
+
+Every shipped configuration is built with the test key, all formulas evaluated during the build are recorded and then
+evaluated again on the built component tree:
+ - 'parse each time' clears compiled formula cache before every evaluation (cost of tokenizing and parsing formula
+   on every call, which is how formulas were evaluated before they were compiled),
+ - 'compiled' evaluates formulas already present in the cache.
+
+Usage: python3 benchmark/formula_benchmark.py [-n ROUNDS]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+IBST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, IBST_DIR)
+
+# pylint: disable=wrong-import-position
+from tool.BinaryGenerator import BinaryGenerator
+from tool.ExpressionEngine import ExpressionEngine
+from tool.FormulaCompiler import FormulaCompiler
+from tool.LibConfig import LibConfig
+from tool.PathResolver import PathResolver
+from tool.SecureXmlParser import SecureXmlParser
+from tool.components.IComponent import IComponent
+# pylint: enable=wrong-import-position
+
+CONFIG_DIR = os.path.join(IBST_DIR, 'config')
+TEST_KEY = os.path.join(CONFIG_DIR, '3k_test_key_private.pem')
+SHIPPED_CONFIGS = {
+    'CoSigningManifest.xml': ['key={key}', 'module_bin={binary}', 'module_bin_enabled=1'],
+    'OEMToken.xml': ['key={key}'],
+    'OemKeyManifest.xml': ['key={key}', 'fd0v_key={key}'],
+    'FD0V_Manifest.xml': ['key={key}', 'extension_binary={binary}'],
+}
+
+
+def setup_lib_config():
+    LibConfig.toolType = LibConfig.ToolType.IBST
+    LibConfig.appDir = IBST_DIR
+    LibConfig.settingsTag = 'settings'
+    LibConfig.overridesTag = 'ibst_overrides'
+    LibConfig.defaultPaddingValue = IComponent.AlignByte.Byte00
+    LibConfig.rootTag = 'ibst'
+    LibConfig.maxBufferSize = 128 * 1024 * 1024
+
+
+def record_formulas(config, overrides):
+    """Builds configuration and returns all successful formula evaluations done during the build."""
+    recorded = []
+    calculate_value = ExpressionEngine.calculate_value
+
+    def recording_calculate_value(engine, formula=None, parts=None, allow_calculate=False, allow_none_return=False,
+                                  build_process=False):
+        value = calculate_value(engine, formula, parts, allow_calculate, allow_none_return, build_process)
+        if formula is not None and not build_process:
+            recorded.append((engine, formula, allow_calculate, allow_none_return))
+        return value
+
+    ExpressionEngine.calculate_value = recording_calculate_value
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator = BinaryGenerator(os.path.join(CONFIG_DIR, config), SecureXmlParser.Schema.NoSchema,
+                                        PathResolver(IBST_DIR))
+            generator.apply_overrides(overrides)
+            generator._substitute_nodes()  # pylint: disable=protected-access
+            generator.parse_configuration()
+            generator.parse_layout()
+            generator.build_layout()
+            generator.build()
+    finally:
+        ExpressionEngine.calculate_value = calculate_value
+    return recorded
+
+
+def evaluate_all(formulas, rounds, parse_each_time):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for engine, formula, allow_calculate, allow_none_return in formulas:
+            if parse_each_time:
+                FormulaCompiler.clear_cache()
+            engine.calculate_value(formula, allow_calculate=allow_calculate, allow_none_return=allow_none_return)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Formula evaluation micro-benchmark')
+    parser.add_argument('-n', '--rounds', type=int, default=50, help='number of evaluations of every formula')
+    args = parser.parse_args()
+
+    setup_lib_config()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        binary = os.path.join(tmp_dir, 'binary.bin')
+        with open(binary, 'wb') as f:
+            f.write(os.urandom(64 * 1024))
+
+        print(f"{'configuration':<24}{'formulas':>10}{'parse each time [ms]':>24}{'compiled [ms]':>16}{'speedup':>10}")
+        for config, overrides in SHIPPED_CONFIGS.items():
+            overrides = [o.format(key=TEST_KEY, binary=binary) for o in overrides]
+            formulas = record_formulas(config, overrides)
+            parsed = evaluate_all(formulas, args.rounds, parse_each_time=True)
+            compiled = evaluate_all(formulas, args.rounds, parse_each_time=False)
+            print(f"{config:<24}{len(formulas):>10}{parsed * 1000:>24.1f}{compiled * 1000:>16.1f}"
+                  f"{parsed / compiled:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+
+Start-up time benchmark of ibst.py.
+
+'ibst.py --help' is run in a new interpreter with 'python -X importtime' several times, the benchmark reports:
+ - median wall time of the process and median import time of IBST modules (cumulative time of tool.ibst_main),
+ - modules with the longest cumulative import time in the fastest run,
+ - deferred modules (crypto, crc, schematron, multiprocessing) which must be imported only by builds using them.
+
+The benchmark fails (exit code 1) if the import time of IBST modules exceeds the threshold or a deferred module is
+imported at start-up, so it can be used as a regression check.
+
+Usage: python3 benchmark/startup_benchmark.py [-n RUNS] [--max-import-ms MS] [--top N]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess  # nosec - runs ibst.py with the current interpreter only
+import sys
+import time
+
+IBST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IBST_SCRIPT = os.path.join(IBST_DIR, 'ibst.py')
+MAIN_MODULE = 'tool.ibst_main'
+# modules (and their submodules) imported on first use only
+DEFERRED_MODULES = ['cryptography', 'crcmod', 'cffi', 'lxml.isoschematron', 'multiprocessing',
+                    'concurrent.futures.process']
+DEFAULT_MAX_IMPORT_MS = 120.0
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def run_once():
+    """Returns wall time of the process [s] and {module: (self [us], cumulative [us])} of its imports."""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', IBST_SCRIPT, '--help'], cwd=IBST_DIR,
+                             capture_output=True, text=True, check=False)  # nosec - fixed command line
+    wall_time = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"ibst.py --help failed with exit code {process.returncode}:\n{process.stderr}")
+    imports = {}
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            imports[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    if MAIN_MODULE not in imports:
+        raise RuntimeError(f"Import time of '{MAIN_MODULE}' not found in the output of -X importtime")
+    return wall_time, imports
+
+
+def get_deferred_imports(imports):
+    return sorted(name for name in imports
+                  if any(name == deferred or name.startswith(deferred + '.') for deferred in DEFERRED_MODULES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ibst.py start-up time benchmark')
+    parser.add_argument('-n', '--runs', type=int, default=10, help='number of runs of ibst.py --help')
+    parser.add_argument('--max-import-ms', type=float, default=DEFAULT_MAX_IMPORT_MS,
+                        help=f'maximal median import time of IBST modules (default: {DEFAULT_MAX_IMPORT_MS} ms)')
+    parser.add_argument('--top', type=int, default=15, help='number of the slowest modules to report')
+    args = parser.parse_args()
+
+    # the first run warms up file caches and writes bytecode of changed modules (unless PYTHONDONTWRITEBYTECODE is set,
+    # then run 'python -m compileall' first), it's not measured
+    run_once()
+    runs = [run_once() for _ in range(args.runs)]
+    wall_ms = statistics.median(wall_time for wall_time, _ in runs) * 1000
+    import_ms = statistics.median(imports[MAIN_MODULE][1] for _, imports in runs) / 1000
+    _, fastest = min(runs, key=lambda run: run[1][MAIN_MODULE][1])
+
+    print(f"ibst.py --help: {wall_ms:.1f} ms (median of {args.runs} runs), import of IBST modules: {import_ms:.1f} ms "
+          f"(threshold {args.max_import_ms:.1f} ms), modules imported: {len(fastest)}")
+    print(f"\n{'module':<60}{'self [ms]':>12}{'cumulative [ms]':>18}")
+    for name, (self_us, cumulative_us) in sorted(fastest.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{name:<60}{self_us / 1000:>12.1f}{cumulative_us / 1000:>18.1f}")
+
+    failed = False
+    deferred = get_deferred_imports(fastest)
+    if deferred:
+        print(f"\nFAILED: deferred modules imported at start-up: {', '.join(deferred)}")
+        failed = True
+    if import_ms > args.max_import_ms:
+        print(f"\nFAILED: import of IBST modules takes {import_ms:.1f} ms, threshold is {args.max_import_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
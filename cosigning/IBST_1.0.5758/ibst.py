@@ -21,6 +21,10 @@ from tool import ibst_main  # pylint: disable=import-error
 def main():
     if __name__ == '__main__':
         is_exe = bool(getattr(sys, 'frozen', False))
+        if is_exe:
+            # required by --jobs process pool in frozen executable
+            import multiprocessing  # pylint: disable=import-outside-toplevel
+            multiprocessing.freeze_support()
         app_file = sys.executable if is_exe else __file__
         sys.exit(ibst_main.main(app_file, sys.argv[1:]))
 
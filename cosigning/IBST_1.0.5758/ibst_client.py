@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import sys
+from tool.BuildClient import BuildClient  # pylint: disable=import-error
+
+
+def main():
+    if __name__ == '__main__':
+        sys.exit(BuildClient.main(sys.argv[1:]))
+
+
+main()
@@ -15,18 +15,30 @@ implied warranties, other than those that are expressly stated in the License.
 """
 
 import os
-from typing import Set
-
+import copy
+from contextlib import nullcontext
+from typing import List, Optional, Set
+from lxml.etree import Element  # nosec - only used to select elements among xml nodes
+
+from .BuildCache import BuildCache
+from .BuildProfiler import BuildProfiler
+from .ConfigSnapshot import ConfigSnapshot
+from .DecompositionStream import DecompositionStream
+from .DigestScheduler import DigestScheduler
 from .FileManager import FileManager
-from .MapGenerator import MapGenerator, XmlMapFormatter, XmlInfoFormatter
+from .IncrementalBuilder import IncrementalBuilder
+from .MappedOutputFile import MappedOutputFile
+from .MapGenerator import MapGenerator, XmlMapFormatter, XmlInfoFormatter, DecompositionMapWriter
 from .components.ComponentFactory import ComponentFactory
 from .components.IComponent import IComponent
-from .LibException import LibException, ComponentException, FileException, BinaryGeneratorException
+from .LibException import LibException, ComponentException, FileException, BinaryGeneratorException, \
+    DecompositionFileNotGiven
 from .utils import get_file_name_no_ext, get_file_ext
 from .SecureXmlParser import SecureXmlParser
-from .structures import Buffer
+from .structures import Buffer, LayoutBuffer
 from .LibConfig import LibConfig
 from .PathResolver import PathResolver
+from .XmlNameIndex import XmlNameIndex
 
 
 class BinaryGenerator:
@@ -44,25 +56,49 @@ class BinaryGenerator:
     configuration_root = None
     decomp_root = None
     buffer = None
+    incremental_builder: Optional[IncrementalBuilder] = None
+    _xml_index = None
 
     def __init__(self, xml_config_file, schema: SecureXmlParser.Schema, path_resolver: PathResolver = None,
-                 component_factory=ComponentFactory):
+                 component_factory=ComponentFactory, snapshot: ConfigSnapshot = None, xml_root: Element = None):
+        """xml_root is a configuration already parsed by the caller, xml_config_file is then used only as its name."""
         BinaryGenerator.buildOptsTag = LibConfig.settingsTag
-        try:
-            FileManager.validate_path_to_open(xml_config_file)
-        except FileException as ex:
-            raise BinaryGeneratorException('Could not load binary generator.\n' + ex.message) from None
+        if xml_root is None:
+            try:
+                FileManager.validate_path_to_open(xml_config_file)
+            except FileException as ex:
+                raise BinaryGeneratorException('Could not load binary generator.\n' + ex.message) from None
         self.xml_name = xml_config_file
         self.schema = schema
-        self.xml_root = SecureXmlParser(xml_config_file, schema).xml_root
+        if xml_root is not None:
+            self.xml_root = SecureXmlParser.validate_xml_root(xml_root, xml_config_file, schema)
+        elif snapshot:
+            self.xml_root = snapshot.get_xml_root()
+        else:
+            self.xml_root = SecureXmlParser(xml_config_file, schema).xml_root
         if path_resolver:
             path_resolver.resolve_paths(self.xml_root, LibConfig.settingsTag)
 
-        self.max_size = LibConfig.maxBufferSize
+        self.max_size = Buffer.get_max_image_size()
         self.xml_config_file = xml_config_file
         self.map_gen = MapGenerator(XmlMapFormatter)
         self.component_factory_cls = component_factory
 
+    def clone(self) -> 'BinaryGenerator':
+        """
+        Returns generator of the same configuration which is overridden and built independently of this one.
+        The configuration file is read, validated and its paths are resolved only once, clones get a copy
+        of the xml tree, so a generator which is not parsed yet can be used as a template for many builds
+        (e.g. <cosign> nodes of an override file).
+        """
+        if self.root_component is not None:
+            raise BinaryGeneratorException("Generator can be cloned only before its configuration is parsed")
+        generator = copy.copy(self)
+        # xml index of this generator is not used by the clone, it's rebuilt for the copied tree
+        generator.xml_root = copy.deepcopy(self.xml_root)
+        generator.map_gen = MapGenerator(XmlMapFormatter)
+        return generator
+
     def switch_xml(self, xml_config_file, path_resolver: PathResolver = None):
         self.xml_name = xml_config_file
         self.xml_root = SecureXmlParser(xml_config_file, self.schema).xml_root
@@ -70,6 +106,12 @@ class BinaryGenerator:
             path_resolver.resolve_paths(self.xml_root, LibConfig.settingsTag)
         self.xml_config_file = xml_config_file
 
+    @property
+    def xml_index(self) -> XmlNameIndex:
+        if self._xml_index is None or self._xml_index.root is not self.xml_root:
+            self._xml_index = XmlNameIndex(self.xml_root)
+        return self._xml_index
+
     @staticmethod
     def get_override_nodes(overrides_file):
         if not os.path.isfile(overrides_file):
@@ -89,16 +131,18 @@ class BinaryGenerator:
         if settings_node is None:
             raise LibException(f"Invalid configuration file: missing '{self.buildOptsTag}' node")
 
-        for override_node in override_root:
-            override_name = IComponent.get_name(override_node)
-            xml_nodes = settings_node.findall(override_node.tag)
+        settings_by_name = {}
+        for xml_node in settings_node.iterchildren(tag=Element):
+            settings_by_name.setdefault((xml_node.tag, IComponent.get_name(xml_node)), []).append(xml_node)
 
-            for xml_node in xml_nodes:
-                if override_name == IComponent.get_name(xml_node):
-                    settings_node.remove(xml_node)
-                    break
+        for override_node in override_root:
+            xml_nodes = settings_by_name.setdefault((override_node.tag, IComponent.get_name(override_node)), [])
+            if xml_nodes:
+                settings_node.remove(xml_nodes.pop(0))
 
             settings_node.append(override_node)
+            xml_nodes.append(override_node)
+        self.xml_index.invalidate()
 
     def _get_substitution_src_nodes(self):
         settings_node = self.xml_root.find(self.buildOptsTag)
@@ -109,10 +153,14 @@ class BinaryGenerator:
     def _substitute_target_nodes(self, nodes):
         for node in nodes:
             node_name = node.attrib[IComponent.Tags.NAME]
-            dst_nodes = self.xml_root.findall('.//' + node_name)
+            if '/' in node_name or '[' in node_name:
+                dst_nodes = self.xml_root.findall('.//' + node_name)
+            else:
+                dst_nodes = self.xml_index.find_all_by_tag(node_name)
             if len(dst_nodes) != 1:
                 raise LibException("Substituted nodes need to be unique")
             dst_node = dst_nodes[0]
+            self.xml_index.remove_descendants(dst_node)
             dst_node.clear()
             dst_node.extend(node.getchildren())
             print(f"Overriding {node_name} component")
@@ -157,21 +205,21 @@ class BinaryGenerator:
         for override in overrides:
             path, path_parts, value = self.split_override(override)
 
-            xml_node = self.xml_root.find(self.buildOptsTag)
+            xml_node = self.xml_index.find_child_by_tag(self.xml_root, self.buildOptsTag)
             if xml_node is None:
                 raise LibException(f"Invalid configuration file: missing '{self.buildOptsTag}' node")
 
             for path_part in path_parts:
                 # flat setting search
-                child_node = xml_node.find(f"*[@name='{path_part}']")
+                child_node = self.xml_index.find_child(xml_node, path_part)
 
                 # group setting search
                 if child_node is None:
-                    child_node = xml_node.find(f".//*[@name='{path_part}']")
+                    child_node = self.xml_index.find_descendant(xml_node, path_part)
 
                 # node search
                 if child_node is None:
-                    child_node = xml_node.find(path_part)
+                    child_node = self.xml_index.find_child_by_tag(xml_node, path_part)
 
                 if child_node is None:
                     raise LibException(f"Invalid path: '{path}', node '{xml_node.tag}' "
@@ -184,10 +232,27 @@ class BinaryGenerator:
         self.root_component = self.component_factory_cls().create_root_component(self.xml_root,
                                                                                  skip_calculates=skip_calculates)
 
+    def apply_setting_overrides(self, overrides):
+        """Applies setting overrides given as for '-s' option (<setting_name>=<value>) and substitutes nodes."""
+        self.apply_overrides(overrides)
+        self._substitute_nodes()
+
+    def track_dependencies(self):
+        """Records dependencies of components from the next parsing of the configuration, so the binary can be
+        rebuilt incrementally after it's built (see 'rebuild')."""
+        self.incremental_builder = IncrementalBuilder()
+
+    def _recording(self, phase: str):
+        if self.incremental_builder is None:
+            return nullcontext()
+        return self.incremental_builder.recording(phase)
+
     def parse_configuration(self, skip_calculates: bool = False):
-        self._set_root_component(skip_calculates)
-        self.configuration_root = self.root_component.get_child(self.buildOptsTag)
-        self.root_component.initialize_defaults()
+        with BuildProfiler.section(BuildProfiler.Phase.COMPONENTS, self.buildOptsTag), \
+                self._recording(IncrementalBuilder.Phase.PARSE):
+            self._set_root_component(skip_calculates)
+            self.configuration_root = self.root_component.get_child(self.buildOptsTag)
+            self.root_component.initialize_defaults()
 
     def parse_decomposition(self):
         self.parse_root_child(LibConfig.decompositionTag)
@@ -200,6 +265,18 @@ class BinaryGenerator:
         self.parse_root_child(LibConfig.layoutTag)
         self.layout_root = self.root_component.get_child(LibConfig.layoutTag)
 
+    def decompose(self, stream: DecompositionStream):
+        """Parses the configuration and decomposes the input file of the decomposition node, its components are
+        emitted to the stream as they are parsed (layout is not parsed)."""
+        if not self.decomposition_node_exists():
+            raise LibException(f"Invalid configuration file: missing '{LibConfig.decompositionTag}' node")
+        self.parse_configuration()
+        with stream:
+            decomposition = self.parse_root_child(LibConfig.decompositionTag)
+        if not decomposition.file_name:
+            path_split = decomposition.file_dep_path.rsplit('.')[0] if decomposition.file_dep_path else ''
+            raise DecompositionFileNotGiven(path_split, decomposition.name)
+
     def parse_build_nodes(self, skip_calculates: bool = False):
         self.layout_root = self.parse_root_child(LibConfig.layoutTag, skip_calculates=skip_calculates)
 
@@ -213,7 +290,9 @@ class BinaryGenerator:
             self.root_component.remove_child(node_name)
             factory = self.component_factory_cls()
             factory.root = self.root_component
-            return factory.create_component(node, parent=self.root_component, skip_calculates=skip_calculates)
+            with BuildProfiler.section(BuildProfiler.Phase.COMPONENTS, node_name), \
+                    self._recording(IncrementalBuilder.Phase.PARSE):
+                return factory.create_component(node, parent=self.root_component, skip_calculates=skip_calculates)
         return None
 
     def add_child_to_root(self, child: IComponent):
@@ -222,18 +301,52 @@ class BinaryGenerator:
         self.root_component.children_by_name[child.name] = child
 
     def build_layout(self, clear_build_settings=False):
-        buffer = Buffer(-1, self.max_size)
+        buffer = LayoutBuffer(self.max_size)
         self.root_component.clear_data()
-        self.layout_root.build_layout(buffer, clear_build_settings)
-
-    def build(self):
-        self.buffer = Buffer(-1, 1 if self.layout_root.size == 0 else self.layout_root.size)
-        self.buffer.write(b'\xff' * self.layout_root.size)
-        self.buffer.seek(0)
-        self.layout_root.build(self.buffer)
+        with self._recording(IncrementalBuilder.Phase.LAYOUT):
+            BuildProfiler.call(BuildProfiler.Phase.LAYOUT, self.layout_root, self.layout_root.build_layout, buffer,
+                               clear_build_settings)
+
+    def build(self, output_file: MappedOutputFile = None):
+        """Builds the binary in a new buffer, mapped to output_file if it's given (see Buffer.create_build_buffer)."""
+        with DigestScheduler(LibConfig.digestThreads) as digest_scheduler, \
+                self._recording(IncrementalBuilder.Phase.BUILD):
+            digest_scheduler.schedule(self.layout_root)
+            length = 1 if self.layout_root.size == 0 else self.layout_root.size
+            self.buffer = output_file.create_buffer(length) if output_file else Buffer.create_build_buffer(length)
+            self.buffer.fill(0xFF, 0, self.layout_root.size)
+            BuildProfiler.call(BuildProfiler.Phase.BUILD, self.layout_root, self.layout_root.build, self.buffer)
         self.buffer = self.buffer.reduce_buffer_to_match_content()
 
-    def save(self, file_path, start=None, end=None):
+    def build_binary(self, output_file: MappedOutputFile = None):
+        """Parses components of the configuration, lays them out and builds the binary."""
+        self.parse_configuration()
+        self.parse_layout()
+        self.build_layout()
+        self.build(output_file)
+
+    def rebuild(self, overrides) -> IncrementalBuilder.Report:
+        """
+        Builds the binary again with setting overrides given as for '-s' option (<setting_name>=<value>).
+        Components affected by the overrides are recomputed and patched in the current buffer when the result is the
+        same as the result of a build from scratch, otherwise the whole binary is built. Dependencies must be tracked
+        (see 'track_dependencies') before the binary is built for the first time.
+        """
+        if self.incremental_builder is None or self.buffer is None:
+            raise BinaryGeneratorException("Binary must be built with tracked dependencies before it's rebuilt")
+        report = IncrementalBuilder.Report()
+        changed = self.apply_cmd_overrides(overrides)
+        self.apply_overrides(overrides)
+        try:
+            self.incremental_builder.rebuild(self.layout_root, self.buffer, changed, report)
+        except IncrementalBuilder.FullBuildRequired as ex:
+            report.recomputed.clear()
+            report.full_build_reason = str(ex)
+            self.track_dependencies()
+            self.build_binary()
+        return report.stop()
+
+    def save(self, file_path, start=None, end=None, output_file: MappedOutputFile = None):
         """
         Saves current buffer as binary file
 
@@ -241,10 +354,17 @@ class BinaryGenerator:
         :param file_path: destined file path
         :param start: start offset (optional)
         :param end: end offset (optional)
+        :param output_file: file the buffer was built in, it replaces the file at file_path instead of writing it
         """
+        if output_file and start is None and end is None and output_file.is_saved_by(self.buffer, file_path):
+            with BuildProfiler.section(BuildProfiler.Phase.FILE_IO, file_path):
+                output_file.commit()
+            return
         start = start if start is not None else 0
         end = end if end is not None else self.buffer.tell()
-        FileManager.save_binary_file(file_path, self.buffer[start:end])
+        with BuildProfiler.section(BuildProfiler.Phase.FILE_IO, file_path), \
+                memoryview(self.buffer) as view, view[start:end] as data:
+            FileManager.save_binary_file(file_path, data)
 
     def save_info(self, file_path, save_components_to_binary=False):
         try:
@@ -255,9 +375,10 @@ class BinaryGenerator:
 
         file_path = os.path.abspath(file_path)
         root_directory, ext = os.path.splitext(file_path)
-        file_path = self.map_gen.generate_map(layout_node, root_directory, ext)
-        if save_components_to_binary:
-            self.save_components(layout_node, root_directory)
+        with BuildProfiler.section(BuildProfiler.Phase.MAP, file_path):
+            file_path = self.map_gen.generate_map(layout_node, root_directory, ext)
+            if save_components_to_binary:
+                self.save_components(layout_node, root_directory)
         return file_path
 
     def save_components(self, root: IComponent, directory):
@@ -304,24 +425,83 @@ class BinaryGenerator:
         input_name = get_file_name_no_ext(command_line_options.input_file)
         return os.path.join(command_line_options.app_dir, input_name + '.bin')
 
-    def process_build(self, command_line_options, input_name):
-        self.apply_overrides(command_line_options.setting_overrides)
-        self._substitute_nodes()
-        self.parse_configuration()
-        self.parse_layout()
-        self.build_layout()
-        self.build()
-        if not command_line_options.output_file and (LibConfig.generateOutput or LibConfig.generateOutput is None):
-            output = self.get_output_name(command_line_options)
-            command_line_options.output_file = output
-        if command_line_options.output_file:
-            self.save(command_line_options.output_file)
+    @staticmethod
+    def get_build_cache(command_line_options) -> Optional[BuildCache]:
+        """Returns build cache if it's enabled, outputs of --info are not cached."""
+        if not LibConfig.buildCacheDir or not command_line_options.use_cache or command_line_options.output_info:
+            return None
+        return BuildCache(LibConfig.buildCacheDir, LibConfig.buildCacheMaxSize)
+
+    @staticmethod
+    def restore_from_cache(build_cache: BuildCache, command_line_options, input_name) -> Optional[List[str]]:
+        outputs = build_cache.restore()
+        if outputs is None:
+            return None
+        print(f"{input_name} outputs restored from build cache")
+        for kind, path in outputs:
+            if kind == BuildCache.OutputKind.BINARY:
+                command_line_options.output_file = path
+            else:
+                print(f"{input_name} map created: {path}")
+        return [path for _, path in outputs]
+
+    @staticmethod
+    def is_output_generated() -> bool:
+        return LibConfig.generateOutput or LibConfig.generateOutput is None
+
+    def get_mapped_output_file(self, command_line_options):
+        """Returns output file to build the binary in for --direct_output (context manager removing it unless it's
+        saved), the output name is known after the configuration is parsed."""
+        if not command_line_options.direct_output or not MappedOutputFile.isSupported:
+            return nullcontext()
+
+        def get_path():
+            if command_line_options.output_file:
+                return command_line_options.output_file
+            # functions of the build can disable the output later, then the file is removed
+            return self.get_output_name(command_line_options) if self.is_output_generated() else None
+        return MappedOutputFile(get_path, fsync=command_line_options.fsync)
+
+    def process_decomposition(self, command_line_options, input_name) -> List[str]:
+        """Decomposes the input file of the decomposition node and streams its map to the file given by --decompose.
+        Returns paths of created files."""
+        self.apply_setting_overrides(command_line_options.setting_overrides)
+        map_path = os.path.abspath(command_line_options.decompose_map)
+        with BuildProfiler.section(BuildProfiler.Phase.MAP, map_path), DecompositionMapWriter(map_path) as writer:
+            self.decompose(DecompositionStream(writer.write_node, command_line_options.decompose_paths,
+                                               command_line_options.decompose_depth))
+        print(f"{input_name} decomposition map created: {map_path}")
+        return [map_path]
+
+    def process_build(self, command_line_options, input_name) -> List[str]:
+        """Builds the binary and saves output files. Returns paths of created files."""
+        created_files = []
+        self.apply_setting_overrides(command_line_options.setting_overrides)
+        build_cache = self.get_build_cache(command_line_options)
+        if build_cache:
+            build_cache.compute_fingerprint(self.xml_root, command_line_options)
+            restored_files = self.restore_from_cache(build_cache, command_line_options, input_name)
+            if restored_files is not None:
+                return restored_files
+        cached_outputs = []
+        with self.get_mapped_output_file(command_line_options) as output_file:
+            with build_cache.recording() if build_cache else nullcontext():
+                self.build_binary(output_file)
+            if not command_line_options.output_file and self.is_output_generated():
+                output = self.get_output_name(command_line_options)
+                command_line_options.output_file = output
+            if command_line_options.output_file:
+                self.save(command_line_options.output_file, output_file=output_file)
+                created_files.append(os.path.abspath(command_line_options.output_file))
+                cached_outputs.append((BuildCache.OutputKind.BINARY, created_files[-1]))
 
         if command_line_options.output_info:
             info_path = os.path.abspath(command_line_options.output_info)
             self.map_gen.formatter = XmlInfoFormatter
             final_info_path = self.save_info(file_path=info_path, save_components_to_binary=True)
             print(f"{input_name} info created: {final_info_path}")
+            if final_info_path:
+                created_files.append(final_info_path)
 
         if not command_line_options.output_map and command_line_options.output_file:
             file_name = command_line_options.output_file
@@ -333,3 +513,10 @@ class BinaryGenerator:
             map_path = os.path.abspath(command_line_options.output_map)
             final_map_path = self.save_info(file_path=map_path)
             print(f"{input_name} map created: {final_map_path}")
+            if final_map_path:
+                created_files.append(final_map_path)
+                cached_outputs.append((BuildCache.OutputKind.MAP, final_map_path))
+
+        if build_cache and LibConfig.exitCode == 0:
+            build_cache.store(cached_outputs)
+        return created_files
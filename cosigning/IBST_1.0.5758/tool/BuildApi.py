@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import os
+import copy
+from collections import namedtuple
+from typing import Dict, Optional, Union
+
+from lxml.etree import Element  # nosec - only used for type hints
+
+from . import ibst_main
+from .BinaryGenerator import BinaryGenerator
+from .BuildContext import BuildContext
+from .LibConfig import LibConfig
+from .LibException import LibException
+from .PathResolver import PathResolver
+from .SecureXmlParser import SecureXmlParser
+from .components.function.IFunction import IFunction
+
+
+class BuildApi:
+    """
+    Builds binaries in the calling process: configuration is given as a path or an already parsed xml tree, settings
+    as a dict and input files (binaries, keys) as their contents, the result is the binary with offsets, sizes and
+    values of hashes, signatures and other functions. Nothing is written to disk, no output or map file is created.
+
+    ```python
+    api = BuildApi()
+    result = api.build('config/OEMToken.xml', settings={'key': 'key.pem'}, files={'key.pem': key_pem})
+    signature = result.components['/ibst/layout/token/manifest/manifest_header_e/signature'].digest
+    ```
+
+    Each build runs in its own BuildContext, so builds can run concurrently in threads of one process.
+    """
+    ComponentInfo = namedtuple('ComponentInfo', 'path, offset, size, digest')
+
+    class Result:
+        def __init__(self, image: bytes, components: Dict[str, 'BuildApi.ComponentInfo']):
+            self.image = image
+            # laid out components by path, digest is the value of a function (hash, signature, crc, ...) or None
+            self.components = components
+
+    def __init__(self, app_dir: str = None):
+        self.app_dir = app_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def build(self, config: Union[str, Element], settings: Dict[str, object] = None,
+              files: Dict[str, bytes] = None, validate: bool = True) -> 'BuildApi.Result':
+        """
+        Builds the binary. Settings are applied as '-s <name>=<value>' options. Files are keyed by paths used
+        in the configuration or in the settings, their contents are used instead of files on disk.
+        Raises LibException if the build fails.
+        """
+        with BuildContext().activate() as context:
+            ibst_main.configure_lib_config(self.app_dir)
+            LibConfig.exitCode = 0
+            schema = SecureXmlParser.Schema.Ibst if validate else SecureXmlParser.Schema.NoSchema
+            overrides = [f'{name}={value}' for name, value in (settings or {}).items()]
+            context.memory_files = {os.path.normpath(path): data for path, data in (files or {}).items()}
+            generator = self._create_generator(config, schema)
+            generator.apply_setting_overrides(overrides)
+            generator.build_binary()
+            if LibConfig.exitCode != 0:
+                raise LibException(f"Failed to build '{generator.xml_name}'")
+            return self.Result(self._get_image(generator), self._get_components(generator))
+
+    def _create_generator(self, config: Union[str, Element], schema: SecureXmlParser.Schema) -> BinaryGenerator:
+        path_resolver = PathResolver(self.app_dir)
+        if isinstance(config, str):
+            return BinaryGenerator(config, schema, path_resolver)
+        # the configuration is resolved and overridden in place, the caller's tree stays unchanged
+        return BinaryGenerator(LibConfig.rootTag, schema, path_resolver, xml_root=copy.deepcopy(config))
+
+    @staticmethod
+    def _get_image(generator: BinaryGenerator) -> bytes:
+        with memoryview(generator.buffer) as view, view[:generator.buffer.tell()] as data:
+            return bytes(data)
+
+    @classmethod
+    def _get_components(cls, generator: BinaryGenerator) -> Dict[str, 'BuildApi.ComponentInfo']:
+        components = {}
+        for component in [generator.layout_root] + list(generator.layout_root.descendants):
+            if component.offset is None or not component.is_enabled():
+                continue
+            path = component.get_string_path()
+            components[path] = cls.ComponentInfo(path, component.offset, component.size, cls._get_digest(component))
+        return components
+
+    @staticmethod
+    def _get_digest(component) -> Optional[bytes]:
+        if not isinstance(component, IFunction) or not isinstance(component.value, (bytes, bytearray, memoryview)):
+            return None
+        return bytes(component.value)
+
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import os
+import json
+import secrets
+import shutil
+import hashlib
+import stat
+import sys
+import tempfile
+from contextlib import contextmanager, suppress
+from datetime import date
+from typing import List, Optional, Tuple
+
+from lxml.etree import tostring  # nosec - only serializes already parsed and validated xml
+
+from .BuildContext import BuildContext
+from .ColorPrint import log
+from .FileManager import FileManager
+from .FileOpener import open_file
+from .LibConfig import LibConfig
+from .LibException import LibException, SymlinkException
+
+
+class BuildCache:
+    """
+    Content-addressed cache of IBST outputs (binary and map).
+
+    A build is described by its fingerprint: the configuration XML after all overrides (including '-s' settings),
+    output options, working directory, IBST version and sources (the executable of frozen IBST). All files read
+    during the build (input binaries, keys, decomposed images) are recorded, and outputs are stored under the
+    fingerprint combined with content hashes of these files. A later build with the same fingerprint hashes the
+    recorded files again and, if an entry for their current content exists, copies outputs from the cache instead of
+    building and signing the binary.
+    Outputs are restored as they are saved by a build (symlinks are not accepted) and only if they match digests
+    stored in the entry.
+
+    Builds which write any other files (exported manifests, saved hashes, external signing) are not stored.
+    Cache size is limited, least recently used entries are removed first.
+    """
+    formatVersion = 2
+    inputsExt = '.inputs.json'
+    manifestName = 'manifest.json'
+    hashChunkSize = 1024 * 1024
+    tempSuffix = '.tmp'
+
+    class OutputKind:
+        BINARY = 'binary'
+        MAP = 'map'
+
+    _tool_digest = None
+    # content hashes of files keyed by (path, mtime, size), so unchanged files are hashed once per process
+    _file_digests = {}
+
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.fingerprint = None
+        self._read_files = set()
+        self._written_files = set()
+
+    @classmethod
+    def tool_digest(cls) -> str:
+        """Hash of IBST sources, so entries created by other IBST version are never used."""
+        if cls._tool_digest is None:
+            digest = hashlib.sha256()
+            tool_dir = os.path.dirname(os.path.abspath(__file__))
+            for root, dirs, files in os.walk(tool_dir):
+                dirs.sort()
+                for file_name in sorted(f for f in files if f.endswith('.py')):
+                    path = os.path.join(root, file_name)
+                    digest.update(os.path.relpath(path, tool_dir).encode())
+                    with open_file(path, 'rb') as f:
+                        digest.update(f.read())
+            cls._tool_digest = digest.hexdigest()
+        return cls._tool_digest
+
+    @classmethod
+    def file_digest(cls, path: str) -> str:
+        file_stat = os.stat(path)
+        key = (path, file_stat.st_mtime_ns, file_stat.st_size)
+        if key not in cls._file_digests:
+            digest = hashlib.sha256()
+            with open_file(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(cls.hashChunkSize), b''):
+                    digest.update(chunk)
+            cls._file_digests[key] = digest.hexdigest()
+        return cls._file_digests[key]
+
+    def compute_fingerprint(self, xml_root, command_line_options) -> str:
+        digest = hashlib.sha256()
+        parts = [str(self.formatVersion), str(LibConfig.toolVersion), self.tool_digest(), os.getcwd(), LibConfig.appDir,
+                 os.path.abspath(command_line_options.input_file), str(command_line_options.output_file),
+                 str(command_line_options.output_map), str(LibConfig.generateOutput)]
+        if getattr(sys, 'frozen', False):
+            # sources of a frozen executable are not next to the modules, tool_digest doesn't cover them
+            parts.append(self.file_digest(os.path.realpath(sys.executable)))
+        if xml_root.xpath("boolean(//date[not(@value) or @value=''])"):
+            # date component without value gets the current date
+            parts.append(date.today().isoformat())
+        for part in parts:
+            digest.update(part.encode() + b'\0')
+        digest.update(tostring(xml_root, method='c14n'))
+        self.fingerprint = digest.hexdigest()
+        return self.fingerprint
+
+    def _inputs_path(self) -> str:
+        return os.path.join(self.cache_dir, self.fingerprint + self.inputsExt)
+
+    def _entry_path(self, input_files: List[str]) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode())
+        for path in input_files:
+            digest.update(b'\0' + path.encode() + b'\0' + self.file_digest(path).encode())
+        return os.path.join(self.cache_dir, digest.hexdigest())
+
+    def _on_file_access(self, path, mode):
+        path = os.path.abspath(path)
+        if any(flag in mode for flag in 'wax+'):
+            self._written_files.add(path)
+        else:
+            self._read_files.add(path)
+
+    @contextmanager
+    def recording(self):
+        """Records files opened while the build is running."""
+        listeners = BuildContext.current().file_access_listeners
+        listeners.append(self._on_file_access)
+        try:
+            yield self
+        finally:
+            listeners.remove(self._on_file_access)
+
+    def restore(self) -> Optional[List[Tuple[str, str]]]:
+        """Copies outputs of a matching entry to their paths. Returns (kind, path) of restored outputs or None."""
+        temp_paths = []
+        try:
+            with open_file(self._inputs_path(), 'r', encoding='utf-8') as f:
+                input_files = json.load(f)
+            entry_path = self._entry_path(input_files)
+            with open_file(os.path.join(entry_path, self.manifestName), 'r', encoding='utf-8') as f:
+                outputs = json.load(f)
+            # all outputs are verified before any of them replaces its file
+            for output in outputs:
+                temp_paths.append(self._copy_to_temp_file(os.path.join(entry_path, output['file']),
+                                                          output['digest'], output['path']))
+            for output, temp_path in zip(outputs, temp_paths):
+                os.replace(temp_path, output['path'])
+            os.utime(entry_path)
+            os.utime(self._inputs_path())
+        except (OSError, LibException, ValueError, KeyError, TypeError):
+            # no entry for current content of input files, or output can't be restored as the build would save it
+            return None
+        finally:
+            for temp_path in temp_paths:
+                with suppress(OSError):
+                    os.remove(temp_path)
+        return [(output['kind'], output['path']) for output in outputs]
+
+    def _copy_to_temp_file(self, cached_path: str, digest: str, path: str) -> str:
+        """Copies cached output to a new temporary file next to path, returns path of the temporary file. Raises
+        LibException if the cached file doesn't match its digest."""
+        if os.path.islink(path):
+            raise SymlinkException(path)
+        directory, name = os.path.split(path)
+        FileManager.create_dir_tree_if_absent(directory)
+        temp_path = os.path.join(directory, f'.{name}.{secrets.token_hex(4)}{self.tempSuffix}')
+        # mode of a new file is set by umask as for files opened for writing
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                content_digest = self._copy_file(cached_path, target)
+            if content_digest != digest:
+                raise LibException(f"Cached output '{cached_path}' doesn't match its digest")
+            if os.path.exists(path):
+                os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+            if LibConfig.toolType == LibConfig.ToolType.FIT:
+                FileManager.set_linux_permissions(temp_path)
+        except BaseException:
+            with suppress(OSError):
+                os.remove(temp_path)
+            raise
+        return temp_path
+
+    def _copy_file(self, path: str, target) -> str:
+        """Copies file to target opened for writing, returns SHA-256 of the copied content."""
+        digest = hashlib.sha256()
+        with open_file(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(self.hashChunkSize), b''):
+                digest.update(chunk)
+                target.write(chunk)
+        return digest.hexdigest()
+
+    def store(self, outputs: List[Tuple[str, str]]):
+        """Stores outputs given as (kind, path) of the recorded build."""
+        if self._written_files:
+            log().debug(f"Build output is not cached, build has written files: {', '.join(self._written_files)}")
+            return
+        input_files = sorted(self._read_files)
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(input_files)
+            tmp_path = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp')
+            manifest = []
+            for index, (kind, path) in enumerate(outputs):
+                file_name = f'{index}_{kind}'
+                with open_file(os.path.join(tmp_path, file_name), 'wb') as target:
+                    digest = self._copy_file(path, target)
+                manifest.append({'kind': kind, 'path': os.path.abspath(path), 'file': file_name, 'digest': digest})
+            with open_file(os.path.join(tmp_path, self.manifestName), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path, ignore_errors=True)
+            os.replace(tmp_path, entry_path)
+            tmp_path = None
+            tmp_inputs_path = f'{self._inputs_path()}.{os.getpid()}.tmp'
+            with open_file(tmp_inputs_path, 'w', encoding='utf-8') as f:
+                json.dump(input_files, f)
+            os.replace(tmp_inputs_path, self._inputs_path())
+        except (OSError, LibException) as ex:
+            # cache is only an optimization, the build does not depend on it
+            log().debug(f"Build output was not cached: {ex}")
+        finally:
+            if tmp_path:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until cache fits in its maximum size."""
+        items = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for item in it:
+                    if item.name.startswith('.'):
+                        continue
+                    size = item.stat().st_size
+                    if item.is_dir():
+                        size = sum(f.stat().st_size for f in os.scandir(item.path))
+                    items.append((item.stat().st_mtime, size, item.path))
+        except OSError:
+            return
+        total_size = sum(size for _, size, _ in items)
+        for _, size, path in sorted(items):
+            if total_size <= self.max_size:
+                break
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                with suppress(OSError):
+                    os.remove(path)
+            total_size -= size
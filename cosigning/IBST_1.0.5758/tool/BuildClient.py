@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import os
+import sys
+import getpass
+import secrets
+import tempfile
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from typing import List, Tuple
+
+from .LibException import LibException
+
+
+class BuildClient:
+    """
+    Thin client of IBST build server ('ibst.py serve'). Sends command line arguments of a single IBST run to the
+    server and prints its output. Only standard library modules are imported, so client starts immediately.
+    """
+    addressOption = '--server_address'
+    stopOption = '--stop_server'
+    authkeySize = 32
+
+    class Command:
+        BUILD = 'build'
+        STOP = 'stop'
+
+    def __init__(self, address: str = None):
+        self.address = address or self.default_address()
+
+    @staticmethod
+    def default_address() -> str:
+        """Named pipe on Windows, Unix socket in temporary directory elsewhere, unique per user."""
+        user = getpass.getuser()
+        if sys.platform == 'win32':
+            return rf'\\.\pipe\ibst-{user}'
+        return os.path.join(tempfile.gettempdir(), f'ibst-{user}.sock')
+
+    @staticmethod
+    def authkey_path() -> str:
+        return os.path.join(os.path.expanduser('~'), '.ibst', 'server.key')
+
+    @classmethod
+    def load_authkey(cls, create=False) -> bytes:
+        """
+        Reads key used to authenticate connections to the server. Key is stored in user's home directory and
+        readable only by the user, so other users can't send build requests to the server.
+        """
+        path = cls.authkey_path()
+        if create and not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+                f.write(secrets.token_bytes(cls.authkeySize))
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError as ex:
+            raise LibException(f"Cannot read IBST server key '{path}', is the server running? {ex}") from None
+
+    def _send(self, request: dict) -> dict:
+        try:
+            with Client(self.address, authkey=self.load_authkey()) as connection:
+                connection.send(request)
+                return connection.recv()
+        except (OSError, EOFError, AuthenticationError) as ex:
+            raise LibException(f"Cannot connect to IBST server at '{self.address}': {ex}") from None
+
+    def build(self, input_args: List[str], cwd: str = None) -> Tuple[int, str, List[str]]:
+        """Runs IBST with given arguments on the server. Returns exit code, output and paths of created files."""
+        response = self._send({'command': self.Command.BUILD, 'args': list(input_args), 'cwd': cwd or os.getcwd()})
+        return response['exit_code'], response['output'], response['files']
+
+    def stop(self):
+        self._send({'command': self.Command.STOP})
+
+    @classmethod
+    def main(cls, input_args: List[str]) -> int:
+        """
+        Usage: ibst_client.py [--server_address ADDRESS] [--stop_server] <ibst.py arguments>
+        """
+        address = None
+        stop = False
+        while input_args and input_args[0] in (cls.addressOption, cls.stopOption):
+            if input_args[0] == cls.stopOption:
+                stop = True
+                input_args = input_args[1:]
+            else:
+                if len(input_args) < 2:
+                    print(f"Missing value of {cls.addressOption} option")
+                    return -1
+                address = input_args[1]
+                input_args = input_args[2:]
+        client = cls(address)
+        try:
+            if stop:
+                client.stop()
+                return 0
+            exit_code, output, _ = client.build(input_args)
+        except LibException as ex:
+            print(ex)
+            return -1
+        print(output, end='')
+        return exit_code
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List
+from weakref import WeakKeyDictionary
+
+
+class BuildContext:
+    """
+    State of a single build: LibConfig values set during the build, the component factory and the root component
+    of the parsed configuration, active profiler, digest scheduler, dependency recorder and decomposition stream,
+    indexes of manifest magic numbers, files given in memory and listeners of opened files.
+
+    The context is found through a context variable, so each thread (or asyncio task) running a build in its own
+    activated context has its own state and builds running concurrently in one process don't interfere. Code which
+    runs without an activated context (e.g. scripts driving BinaryGenerator directly) shares one process-wide
+    context and LibConfig class attributes, as before.
+
+    Existing call sites keep their syntax: LibConfig attributes are read and set as class attributes and e.g.
+    'BuildProfiler.active' is an 'Attribute' of the current context.
+    """
+
+    class Attribute:
+        """Class attribute whose value is kept in the current build context (read-only on the class)."""
+
+        def __init__(self, name: str):
+            self.name = name
+
+        def __get__(self, instance, owner):
+            return getattr(BuildContext.current(), self.name)
+
+    contextVar: ContextVar = ContextVar('ibst_build_context', default=None)
+    _process_context: 'BuildContext' = None
+
+    def __init__(self):
+        # LibConfig attributes set while this context is active, other attributes are read from the class
+        self.config: Dict[str, object] = {}
+        self.component_factory = None
+        self.root_component = None
+        self.profiler = None
+        self.digest_scheduler = None
+        self.incremental_builder = None
+        self.decomposition_stream = None
+        # offsets of manifest magic numbers found in buffers (see IManifestFunction.MagicNumberIndex)
+        self.magic_number_indexes: WeakKeyDictionary = WeakKeyDictionary()
+        self.memory_files: Dict[str, bytes] = {}
+        self.file_access_listeners: List[Callable] = []
+
+    @classmethod
+    def current(cls) -> 'BuildContext':
+        context = cls.contextVar.get()
+        if context is None:
+            if cls._process_context is None:
+                cls._process_context = cls()
+            context = cls._process_context
+        return context
+
+    @contextmanager
+    def activate(self):
+        token = self.contextVar.set(self)
+        try:
+            yield self
+        finally:
+            self.contextVar.reset(token)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import os
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+from .BuildContext import BuildContext
+from .FileManager import FileManager
+
+
+class BuildProfiler:
+    """
+    Records wall time, CPU time, call counts and number of evaluated formulas per build phase and per component
+    path. Profiling is turned on by 'start' and instrumented code checks 'active' only, so there is no overhead
+    when IBST runs without --profile.
+
+    Report is saved as JSON with one entry per (phase, name) and as speedscope profile (https://www.speedscope.app),
+    which shows nesting of phases and components as a flame graph.
+    """
+
+    class Phase:
+        XML_PARSE = 'xml_parse'
+        SCHEMA_VALIDATION = 'schema_validation'
+        COMPONENTS = 'components'
+        LAYOUT = 'build_layout'
+        BUILD = 'build'
+        HASH = 'hash'
+        SIGN = 'sign'
+        MAP = 'map'
+        FILE_IO = 'file_io'
+
+    speedscopeExt = '.speedscope.json'
+    speedscopeSchema = 'https://www.speedscope.app/file-format-schema.json'
+
+    # profiler of the current build (see BuildContext)
+    active: 'BuildProfiler' = BuildContext.Attribute('profiler')
+    _inactive_section = nullcontext()
+
+    def __init__(self):
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.formulas = 0
+        self.entries = {}
+        self.phases = {}
+        self.frames = {}
+        self.events = []
+        self._stack = []
+
+    @classmethod
+    def start(cls) -> 'BuildProfiler':
+        profiler = cls()
+        BuildContext.current().profiler = profiler
+        return profiler
+
+    def stop(self):
+        context = BuildContext.current()
+        if context.profiler is self:
+            context.profiler = None
+        self.wall = time.perf_counter() - self.start_wall
+        self.cpu = time.process_time() - self.start_cpu
+
+    @classmethod
+    def section(cls, phase: str, name: str = ''):
+        """Context manager measuring given phase, it does nothing when profiling is off."""
+        profiler = cls.active
+        if profiler is None:
+            return cls._inactive_section
+        return profiler.measure(phase, name)
+
+    @classmethod
+    def call(cls, phase: str, component, method, *args):
+        """Calls build method of a component, measured under component path when profiling is on."""
+        profiler = cls.active
+        if profiler is None:
+            return method(*args)
+        with profiler.measure(phase, component.get_string_path()):
+            return method(*args)
+
+    @classmethod
+    def count_formula(cls):
+        profiler = cls.active
+        if profiler is not None:
+            profiler.formulas += 1
+            if profiler._stack:  # pylint: disable=protected-access
+                profiler._stack[-1][4] += 1  # pylint: disable=protected-access
+
+    @contextmanager
+    def measure(self, phase: str, name: str = ''):
+        frame_name = f'{phase} {name}' if name else phase
+        frame = self.frames.setdefault(frame_name, len(self.frames))
+        # [phase, name, wall start, cpu start, formulas, children wall, children cpu]
+        record = [phase, name, time.perf_counter(), time.process_time(), 0, 0.0, 0.0]
+        self.events.append(('O', frame, record[2]))
+        self._stack.append(record)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            end_wall = time.perf_counter()
+            self.events.append(('C', frame, end_wall))
+            self._add(record, end_wall - record[2], time.process_time() - record[3])
+
+    def _add(self, record, wall, cpu):
+        phase, name, _, _, formulas, children_wall, children_cpu = record
+        entry = self.entries.setdefault((phase, name), {'phase': phase, 'name': name, 'count': 0, 'wall': 0.0,
+                                                        'cpu': 0.0, 'self_wall': 0.0, 'self_cpu': 0.0,
+                                                        'formulas': 0})
+        entry['count'] += 1
+        entry['wall'] += wall
+        entry['cpu'] += cpu
+        entry['self_wall'] += wall - children_wall
+        entry['self_cpu'] += cpu - children_cpu
+        entry['formulas'] += formulas
+        if self._stack:
+            parent = self._stack[-1]
+            parent[4] += formulas
+            parent[5] += wall
+            parent[6] += cpu
+        # nested sections of the same phase (e.g. child components) are already included in the outer one
+        if all(parent[0] != phase for parent in self._stack):
+            totals = self.phases.setdefault(phase, {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'formulas': 0})
+            totals['count'] += 1
+            totals['wall'] += wall
+            totals['cpu'] += cpu
+            totals['formulas'] += formulas
+
+    def report(self) -> dict:
+        return {
+            'total': {'wall': self.wall, 'cpu': self.cpu, 'formulas': self.formulas},
+            'phases': self.phases,
+            'entries': sorted(self.entries.values(), key=lambda entry: entry['wall'], reverse=True),
+        }
+
+    def speedscope(self, name: str) -> dict:
+        frames = sorted(self.frames, key=self.frames.get)
+        return {
+            '$schema': self.speedscopeSchema,
+            'name': name,
+            'exporter': 'IBST',
+            'shared': {'frames': [{'name': frame} for frame in frames]},
+            'profiles': [{
+                'type': 'evented',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': self.wall * 1000,
+                'events': [{'type': event_type, 'frame': frame, 'at': (at - self.start_wall) * 1000}
+                           for event_type, frame, at in self.events],
+            }],
+        }
+
+    def save(self, path: str, name: str = 'IBST build') -> str:
+        """Saves JSON report under given path and speedscope profile next to it. Returns speedscope file path."""
+        speedscope_path = os.path.splitext(path)[0] + self.speedscopeExt
+        FileManager.save_text_file(path, json.dumps(self.report(), indent=2))
+        FileManager.save_text_file(speedscope_path, json.dumps(self.speedscope(name)))
+        return speedscope_path
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import List
+
+from . import ibst_main
+from .BuildClient import BuildClient
+from .ColorPrint import ColorPrint, log
+from .IbstCommandLineOptions import IbstCommandLineOptions
+from .LibConfig import LibConfig
+from .LibException import LibException
+from .SecureXmlParser import SecureXmlParser
+
+
+class BuildServer:
+    """
+    Resident IBST process serving build requests sent by BuildClient over a Unix socket or a named pipe.
+
+    Imported modules, compiled schemas and compiled formulas stay in memory between builds, so each build skips
+    interpreter start-up and one-time initialization. Builds are run one at a time, global settings (LibConfig
+    and command line class attributes) are restored to their initial state before each build.
+    """
+    statefulClasses = (LibConfig, IbstCommandLineOptions, SecureXmlParser.Schema)
+
+    def __init__(self, appfilepath: str, address: str = None):
+        self.appfilepath = appfilepath
+        self.address = address or BuildClient.default_address()
+        self.cwd = os.getcwd()
+        self.initial_state = {}
+
+    def _save_initial_state(self):
+        for cls in self.statefulClasses:
+            self.initial_state[cls] = {name: value for name, value in vars(cls).items()
+                                       if not name.startswith('__') and not callable(value)
+                                       and not isinstance(value, (classmethod, staticmethod, property))}
+
+    def _restore_initial_state(self):
+        for cls, attributes in self.initial_state.items():
+            for name, value in attributes.items():
+                setattr(cls, name, value)
+        ColorPrint.buffer.clear()
+
+    def build(self, input_args: List[str], cwd: str) -> dict:
+        self._restore_initial_state()
+        output = io.StringIO()
+        exit_code = -1
+        created_files = []
+        try:
+            os.chdir(cwd)
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                try:
+                    exit_code, created_files = ibst_main.run(self.appfilepath, input_args)
+                except SystemExit as ex:  # invalid arguments, --help and --version
+                    exit_code = ex.code if isinstance(ex.code, int) else -1
+                except Exception:  # pylint: disable=broad-except
+                    # unexpected error of a single build must not stop the server
+                    traceback.print_exc()
+        except OSError as ex:
+            output.write(f"Cannot change working directory to '{cwd}': {ex}\n")
+        finally:
+            os.chdir(self.cwd)
+        return {'exit_code': exit_code, 'output': output.getvalue(), 'files': created_files}
+
+    def _check_address(self):
+        """Removes Unix socket left by a server which was not stopped, fails if the server is still running."""
+        if self.address.startswith('\\\\') or not os.path.exists(self.address):
+            return
+        try:
+            with Client(self.address, authkey=BuildClient.load_authkey()):
+                pass
+        except (OSError, EOFError, AuthenticationError, LibException):
+            os.remove(self.address)
+            return
+        raise LibException(f"IBST server is already running at '{self.address}'")
+
+    def serve(self):
+        self._check_address()
+        self._save_initial_state()
+        authkey = BuildClient.load_authkey(create=True)
+        with Listener(self.address, authkey=authkey) as listener:
+            print(f"IBST server is listening at: {self.address}")
+            while True:
+                try:
+                    with listener.accept() as connection:
+                        request = connection.recv()
+                        if request.get('command') == BuildClient.Command.STOP:
+                            connection.send({})
+                            break
+                        if request.get('command') == BuildClient.Command.BUILD:
+                            response = self.build(request['args'], request['cwd'])
+                            print(f"Build {' '.join(request['args'])} finished with exit code: "
+                                  f"{response['exit_code']}")
+                            connection.send(response)
+                except (OSError, EOFError, AuthenticationError) as ex:
+                    # failed authentication or client disconnected before receiving response
+                    log().warning(f"Connection error: {ex}")
+        print("IBST server stopped")
+
+    @classmethod
+    def main(cls, appfilepath: str, input_args: List[str]) -> int:
+        parser = argparse.ArgumentParser(f'{os.path.basename(appfilepath)} serve',
+                                         description='Runs IBST build server. Builds are requested with '
+                                                     'ibst_client.py which accepts the same arguments as ibst.py.')
+        parser.add_argument('--address', help='Unix socket path or Windows named pipe (\\\\.\\pipe\\<name>) '
+                                              f'(default: {BuildClient.default_address()})')
+        args = parser.parse_args(input_args)
+        try:
+            cls(appfilepath, args.address).serve()
+        except KeyboardInterrupt:
+            print("IBST server stopped")
+        except LibException as ex:
+            print(f"IBST server error: {ex}")
+            return -1
+        finally:
+            sys.stdout.flush()
+        return 0
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import os
+import sys
+import copy
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import ibst_main
+from .BinaryGenerator import BinaryGenerator
+from .BuildContext import BuildContext
+from .LibConfig import LibConfig
+from .LibException import LibException, ComponentException
+from .PathResolver import PathResolver
+from .SecureXmlParser import SecureXmlParser
+
+
+class BuildWatcher:
+    """
+    Builds the configuration again whenever one of its inputs changes (--watch): the configuration, the override file
+    and every file read by the build (binaries, keys, included configurations).
+
+    The configuration is loaded (parsed, validated, paths resolved) once and each build gets its clone, so only
+    a change of a file read while the configuration was loaded loads it again. Changes are detected with inotify
+    on Linux or by polling modification times and sizes of the files, a burst of writes is collected until the files
+    are quiet for debounceSeconds. Builds don't use the build cache, so each of them records its inputs.
+    """
+    debounceSeconds = 0.3
+    pollSeconds = 0.5
+
+    class PollingMonitor:
+        """Wakes up periodically, changed files are found by comparing their modification times and sizes."""
+        name = 'polling'
+
+        def watch(self, paths: Set[str]):
+            pass
+
+        def wait(self, timeout: Optional[float]) -> bool:
+            time.sleep(BuildWatcher.pollSeconds if timeout is None else timeout)
+            return False
+
+        def close(self):
+            pass
+
+    class InotifyMonitor:
+        """
+        Waits for inotify events in directories of watched files, directories are watched because editors and build
+        tools often replace files instead of writing them.
+        """
+        name = 'inotify'
+        # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        eventMask = 0x2 | 0x4 | 0x8 | 0x80 | 0x100 | 0x200
+        eventHeader = struct.Struct('iIII')
+
+        def __init__(self):
+            self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if self._fd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+            self._directories: Dict[int, str] = {}
+            self._paths: Set[str] = set()
+
+        def watch(self, paths: Set[str]):
+            self._paths = paths
+            watched_directories = set(self._directories.values())
+            for directory in {os.path.dirname(path) for path in paths} - watched_directories:
+                descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.eventMask)
+                if descriptor >= 0:
+                    self._directories[descriptor] = directory
+
+        def wait(self, timeout: Optional[float]) -> bool:
+            """Returns True if a watched file was changed before timeout (None waits for any event)."""
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+            if not readable:
+                return False
+            changed = False
+            while True:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    return changed
+                position = 0
+                while position < len(data):
+                    descriptor, _, _, name_length = self.eventHeader.unpack_from(data, position)
+                    position += self.eventHeader.size
+                    name = data[position:position + name_length].rstrip(b'\0')
+                    position += name_length
+                    directory = self._directories.get(descriptor)
+                    if directory is not None and os.path.join(directory, os.fsdecode(name)) in self._paths:
+                        changed = True
+
+        def close(self):
+            os.close(self._fd)
+
+    def __init__(self, command_line_options, schema: SecureXmlParser.Schema, path_resolver: PathResolver,
+                 input_name: str):
+        self.command_line_options = copy.deepcopy(command_line_options)
+        self.command_line_options.use_cache = False
+        self.schema = schema
+        self.path_resolver = path_resolver
+        self.input_name = input_name
+        self.template: Optional[BinaryGenerator] = None
+        self.override_nodes = []
+        self.exit_code = 0
+        self.created_files: List[str] = []
+        # LibConfig set by command line options, each build starts with it
+        self._config = dict(BuildContext.current().config)
+        # signatures of files read while the configuration was loaded and while it was built, when they were read
+        self._template_inputs: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._build_inputs: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._recorded_inputs = self._build_inputs
+        self._outputs: Set[str] = set()
+        self._watched: Set[str] = set()
+
+    @classmethod
+    def create_monitor(cls):
+        if sys.platform.startswith('linux'):
+            try:
+                return cls.InotifyMonitor()
+            except (OSError, AttributeError):
+                pass
+        return cls.PollingMonitor()
+
+    @staticmethod
+    def get_signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def run(self) -> Tuple[int, List[str]]:
+        """Builds the configuration and rebuilds it after changes until interrupted. Returns the last exit code
+        and paths of files created by the last build."""
+        monitor = self.create_monitor()
+        changed: Set[str] = set()
+        try:
+            while True:
+                self.build(changed)
+                watched = self._get_watched_paths()
+                if self.exit_code != 0:
+                    # a failed build may not read all its inputs (e.g. it stops at a missing file), keep watching them
+                    for path in self._watched - watched:
+                        self._build_inputs.setdefault(path, self.get_signature(path))
+                    watched |= self._watched
+                self._watched = watched
+                monitor.watch(self._watched)
+                print(f"Watching {len(self._watched)} files ({monitor.name}), press Ctrl+C to stop")
+                changed = self._wait_for_changes(monitor)
+                print(f"\nChanged: {', '.join(sorted(changed))}")
+        except KeyboardInterrupt:
+            print("Watch stopped")
+        finally:
+            monitor.close()
+        return self.exit_code, self.created_files
+
+    def build(self, changed: Set[str]):
+        """Builds the configuration, it's loaded again if it was not loaded yet or one of its files has changed."""
+        start = time.perf_counter()
+        load_time = None
+        with BuildContext().activate() as context:
+            context.config.update(self._config)
+            context.file_access_listeners.append(self._on_file_access)
+            LibConfig.exitCode = 0
+            self.created_files = []
+            self._outputs = set()
+            try:
+                if self.template is None or changed & self._template_inputs.keys():
+                    load_time = self._load_configuration()
+                self._build_inputs = {}
+                self._recorded_inputs = self._build_inputs
+                for override_node in self.override_nodes:
+                    self.created_files += self._build_node(override_node)
+            except (LibException, ComponentException) as ex:
+                print(f"Failed to build image, an error occurred: {ex}")
+                LibConfig.exitCode = -1
+            self.exit_code = LibConfig.exitCode
+        loaded = f"configuration loaded in {load_time:.3f}s" if load_time is not None else "configuration reused"
+        status = 'finished' if self.exit_code == 0 else 'failed'
+        print(f"Build {status} in {time.perf_counter() - start:.3f}s ({loaded})")
+
+    def _load_configuration(self) -> float:
+        start = time.perf_counter()
+        self.template = None
+        self._template_inputs = {}
+        self._recorded_inputs = self._template_inputs
+        options = self.command_line_options
+        # watched even if they can't be read now
+        self._record_input(options.input_file)
+        self.override_nodes = [None]
+        if options.config_override_file is not None:
+            self._record_input(options.config_override_file)
+            self.override_nodes = BinaryGenerator.get_override_nodes(options.config_override_file)
+        self.template = BinaryGenerator(options.input_file, self.schema, self.path_resolver,
+                                        snapshot=ibst_main.get_snapshot(options, self.schema))
+        return time.perf_counter() - start
+
+    def _build_node(self, override_node) -> List[str]:
+        if override_node is not None:
+            return ibst_main.build_override_node(self.command_line_options, self.template, override_node,
+                                                 self.input_name)
+        options = copy.deepcopy(self.command_line_options)
+        created_files = self.template.clone().process_build(options, self.input_name)
+        ibst_main.print_info(self.input_name, options)
+        return created_files
+
+    def _record_input(self, path: str):
+        path = os.path.abspath(path)
+        if path not in self._recorded_inputs:
+            self._recorded_inputs[path] = self.get_signature(path)
+
+    def _on_file_access(self, path, mode):
+        if any(flag in mode for flag in 'wax+'):
+            self._outputs.add(os.path.abspath(path))
+        else:
+            self._record_input(path)
+
+    def _get_watched_paths(self) -> Set[str]:
+        # caches are read by the build but they don't change its result
+        cache_dirs = [os.path.abspath(d) + os.sep for d in (LibConfig.buildCacheDir, LibConfig.schemaCacheDir) if d]
+        return {path for path in self._template_inputs.keys() | self._build_inputs.keys()
+                if path not in self._outputs and not any(path.startswith(d) for d in cache_dirs)}
+
+    def _get_changed_paths(self) -> Set[str]:
+        inputs = {**self._build_inputs, **self._template_inputs}
+        return {path for path in self._watched if self.get_signature(path) != inputs[path]}
+
+    def _wait_for_changes(self, monitor) -> Set[str]:
+        while True:
+            monitor.wait(None)
+            if not self._get_changed_paths():
+                continue
+            # a burst of writes (editor saving files, tool creating the input binary) ends with a quiet period
+            signatures = {path: self.get_signature(path) for path in self._watched}
+            while True:
+                event = monitor.wait(self.debounceSeconds)
+                current = {path: self.get_signature(path) for path in self._watched}
+                if not event and current == signatures:
+                    break
+                signatures = current
+            changed = self._get_changed_paths()
+            if changed:
+                return changed
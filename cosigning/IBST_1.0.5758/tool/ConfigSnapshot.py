@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import os
+import copy
+import hashlib
+from typing import Optional
+
+from lxml.etree import Element, tostring  # nosec - only serializes already parsed and validated xml
+
+from .BuildCache import BuildCache
+from .ColorPrint import log
+from .FileManager import FileManager
+from .FileOpener import open_file
+from .LibConfig import LibConfig
+from .LibException import LibException
+from .SecureXmlParser import SecureXmlParser
+
+
+class ConfigSnapshot:
+    """
+    Snapshot of a parsed and schema-validated configuration XML, so later runs skip schema validation, which is
+    the most expensive part of loading a configuration.
+
+    Snapshot is keyed by the hash of the configuration file, the hash of IBST sources and the schema used
+    for validation. A snapshot created for other content of any of them is not used, the configuration is parsed
+    and validated as usual instead. Settings, '-s' options and override files are applied on top of the loaded
+    configuration, so one snapshot serves all builds of the configuration.
+
+    Components are not stored: settings (including overridden ones) take part in parsing the layout, e.g. in enabled
+    formulas, so the component tree is created for each build.
+    """
+    formatVersion = 1
+    snapshotTag = 'ibst_snapshot'
+
+    class Attributes:
+        FORMAT = 'format'
+        TOOL = 'tool'
+        CONFIG = 'config'
+        SCHEMA = 'schema'
+
+    def __init__(self, xml_config_file: str, schema: SecureXmlParser.Schema, load_path: str = None,
+                 save_path: str = None):
+        self.xml_config_file = xml_config_file
+        self.schema = schema
+        self.load_path = load_path
+        self.save_path = save_path
+
+    def get_key(self) -> dict:
+        with open_file(self.xml_config_file, 'rb') as f:
+            config_digest = hashlib.sha256(f.read()).hexdigest()
+        schema_digest = ''
+        if self.schema is not SecureXmlParser.Schema.NoSchema and not LibConfig.skipSchemaValidation:
+            schema_digest = SecureXmlParser(self.xml_config_file, self.schema).schema_digest
+        return {
+            self.Attributes.FORMAT: str(self.formatVersion),
+            self.Attributes.TOOL: BuildCache.tool_digest(),
+            self.Attributes.CONFIG: config_digest,
+            self.Attributes.SCHEMA: schema_digest,
+        }
+
+    def get_xml_root(self) -> Element:
+        """Returns root of the configuration loaded from the snapshot or parsed (and saved to the snapshot)."""
+        key = self.get_key()
+        xml_root = self.load(key) if self.load_path else None
+        if xml_root is not None:
+            return xml_root
+        xml_root = SecureXmlParser(self.xml_config_file, self.schema).xml_root
+        if self.save_path:
+            self.save(key, xml_root)
+        return xml_root
+
+    def load(self, key: dict) -> Optional[Element]:
+        if not os.path.isfile(self.load_path):
+            log().warning(f"Configuration snapshot '{self.load_path}' does not exist, configuration is parsed")
+            return None
+        snapshot_root = SecureXmlParser(self.load_path, SecureXmlParser.Schema.NoSchema).xml_root
+        if snapshot_root.tag != self.snapshotTag or dict(snapshot_root.attrib) != key or len(snapshot_root) != 1:
+            log().warning(f"Configuration snapshot '{self.load_path}' was created for other configuration, schema "
+                          f"or IBST version, configuration is parsed")
+            return None
+        xml_root = snapshot_root[0]
+        snapshot_root.remove(xml_root)
+        return xml_root
+
+    def save(self, key: dict, xml_root: Element):
+        snapshot_root = Element(self.snapshotTag, key)
+        # the configuration is resolved and overridden later, the snapshot gets a copy
+        snapshot_root.append(copy.deepcopy(xml_root))
+        try:
+            # not pretty printed, whitespace of the configuration is kept as it is
+            FileManager.save_binary_file(self.save_path, tostring(snapshot_root, xml_declaration=True,
+                                                                  encoding='utf-8'))
+        except LibException as ex:
+            log().warning(f"Failed to save configuration snapshot: {ex}")
+            return
+        print(f"Configuration snapshot saved: {os.path.abspath(self.save_path)}")
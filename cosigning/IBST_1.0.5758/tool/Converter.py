@@ -111,6 +111,8 @@ class Converter:
             return value.to_bytes(size, byteorder=byte_order)
         if isinstance(value, bytes):
             return value
+        if isinstance(value, memoryview):
+            return value.tobytes()
         raise LibException(f"Cannot convert '{value}' to bytes.")
 
     @staticmethod
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+from fnmatch import fnmatchcase
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .BuildContext import BuildContext
+from .structures import Buffer
+
+
+class DecompositionStream:
+    """
+    Streaming decomposition: components of the decomposition node are emitted to a callback as soon as their subtree
+    is parsed, i.e. children before their parent, in offset order of the input file (unless the decomposition uses
+    random_access). After a component is emitted, pages of its range of the mapped input file are released, so
+    the resident part of the input is the component being handled instead of the whole file.
+
+    Only components selected by the filter are emitted, with their ancestors (selected=False) so the structure can be
+    reconstructed: components up to max_depth (children of the decomposition node have depth 1) whose path relative to
+    the decomposition node (e.g. 'me_binary/partitions/partition0') or path of an ancestor matches one of path patterns
+    (fnmatch syntax). Components which are not selected are still parsed, as sizes and counts of later components may
+    depend on them, but their values are not formatted or copied by the consumer.
+
+    Components stay in the tree, formulas of later components refer to them by path (e.g. table counts and sort keys).
+    """
+
+    class Node(NamedTuple):
+        component: object
+        # path relative to the decomposition node ('' for the node itself) and depth in it
+        path: str
+        depth: int
+        selected: bool
+
+    # stream of the current build (see BuildContext)
+    active: 'DecompositionStream' = BuildContext.Attribute('decomposition_stream')
+
+    def __init__(self, on_node: Callable[['DecompositionStream.Node'], None], paths: Optional[List[str]] = None,
+                 max_depth: Optional[int] = None):
+        self.on_node = on_node
+        self.paths = [path.strip('/') for path in paths] if paths else None
+        self.max_depth = max_depth
+        # depths with emitted components whose parent was not emitted yet
+        self._emitted_depths: Dict[int, bool] = {}
+        self._context: Optional[BuildContext] = None
+
+    def __enter__(self):
+        self._context = BuildContext.current()
+        self._context.decomposition_stream = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._context.decomposition_stream is self:
+            self._context.decomposition_stream = None
+        self._emitted_depths.clear()
+
+    def is_selected(self, path: str, depth: int) -> bool:
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        if self.paths is None:
+            return True
+        parts = path.split('/')
+        return any(fnmatchcase('/'.join(parts[:length]), pattern)
+                   for length in range(1, len(parts) + 1) for pattern in self.paths)
+
+    def emit(self, component):
+        """Handles component of the decomposition node whose subtree was parsed."""
+        full_path = component.path
+        path = full_path.partition('/')[2]
+        depth = full_path.count('/')
+        has_emitted_children = self._emitted_depths.pop(depth + 1, False)
+        if component.size is None or not component.is_enabled():
+            return
+        selected = depth == 0 or (bool(path) and self.is_selected(path, depth))
+        if selected or has_emitted_children:
+            self.on_node(self.Node(component, path, depth, selected))
+            self._emitted_depths[depth] = True
+        if isinstance(component.buffer, Buffer) and component.offset is not None:
+            component.buffer.release_pages(component.offset, component.offset + component.size)
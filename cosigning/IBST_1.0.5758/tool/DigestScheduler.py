@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor, CancelledError
+from typing import Dict, List, Optional, Tuple
+
+from .BuildContext import BuildContext
+from .ColorPrint import log
+from .LibConfig import LibConfig
+from .LibException import LibException
+
+
+class DigestScheduler:
+    """
+    Calculates digests of hash and crc functions in a thread pool while the binary is being built.
+
+    The build writes the buffer and values of components in tree order, so a function can depend on anything built
+    before it. Only functions whose inputs are immutable data independent of the build are scheduled: every input is
+    a value formula (e.g. '/settings/module_bin.data') returning bytes or a read-only view of a mapped file. Such
+    functions have no dependencies on other components being built, so their digests are calculated concurrently
+    (hashlib releases the GIL while hashing) and the build only waits for the result when it reaches the function.
+    When the function is built, its inputs are evaluated again and the digest is used only if they are the same data,
+    otherwise it is calculated as usual.
+    """
+
+    class Job:
+        def __init__(self, function, sources: List[Tuple], future: Future):
+            self.function = function
+            self.sources = sources
+            self.future = future
+
+    # scheduler of the current build (see BuildContext)
+    active: 'DigestScheduler' = BuildContext.Attribute('digest_scheduler')
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = None
+        self._jobs: Dict[int, DigestScheduler.Job] = {}
+        self._context: Optional[BuildContext] = None
+
+    def schedule(self, layout_root) -> 'DigestScheduler':
+        if self.max_workers < 2:
+            return self
+        # planning must not change the result of the build, errors are reported when the function is built
+        exit_code = LibConfig.exitCode
+        try:
+            for component in layout_root.descendants:
+                self._schedule_function(component)
+        finally:
+            LibConfig.exitCode = exit_code
+        return self
+
+    def _schedule_function(self, function):
+        new_input_digest = getattr(function, 'new_input_digest', None)
+        if new_input_digest is None or id(function) in self._jobs:
+            return
+        try:
+            if not function.is_enabled_before_build():
+                return
+            static_inputs = function.get_static_input_segments()
+            digest = new_input_digest() if static_inputs else None
+        except (ValueError, LibException):
+            return
+        if digest is None:
+            return
+        sources, segments = static_inputs
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='digest')
+        future = self._executor.submit(self._calculate, digest, segments)
+        self._jobs[id(function)] = self.Job(function, sources, future)
+
+    @staticmethod
+    def _calculate(digest, segments):
+        for segment in segments:
+            digest.update(segment)
+        return digest
+
+    @staticmethod
+    def _same_sources(scheduled: List[Tuple], current: List[Tuple]) -> bool:
+        if len(scheduled) != len(current):
+            return False
+        for (scheduled_data, *scheduled_ranges), (current_data, *current_ranges) in zip(scheduled, current):
+            if scheduled_ranges != current_ranges:
+                return False
+            if scheduled_data is not current_data and scheduled_data != current_data:
+                return False
+        return True
+
+    @classmethod
+    def get_result(cls, function) -> Optional[object]:
+        """Returns digest object of scheduled function updated with its input data or None if it was not scheduled
+        or its inputs have changed since it was scheduled."""
+        scheduler = cls.active
+        job = scheduler._jobs.pop(id(function), None) if scheduler else None  # pylint: disable=protected-access
+        if job is None or job.function is not function:
+            return None
+        try:
+            static_inputs = function.get_static_input_segments()
+        except (ValueError, LibException):
+            static_inputs = None
+        if not static_inputs or not cls._same_sources(job.sources, static_inputs[0]):
+            job.future.cancel()
+            return None
+        try:
+            return job.future.result()
+        except CancelledError:
+            return None
+        except Exception as ex:  # pylint: disable=broad-except
+            # digest is calculated again in the build, which reports the error if there is one
+            log().debug(f"Scheduled digest of '{function.name}' failed: {ex}")
+            return None
+
+    def __enter__(self):
+        self._context = BuildContext.current()
+        self._context.digest_scheduler = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._context.digest_scheduler is self:
+            self._context.digest_scheduler = None
+        if self._executor is not None:
+            # shutdown(cancel_futures=True) requires Python 3.9
+            for job in self._jobs.values():
+                job.future.cancel()
+            self._executor.shutdown(wait=True)
+        self._jobs.clear()
@@ -16,15 +16,25 @@ import builtins
 import os
 from contextlib import contextmanager, closing
 
+from .BuildContext import BuildContext
 from .LibException import SymlinkException
 
 
+def notify_file_access(path, mode='r'):
+    """Notifies callables in file_access_listeners of the current build context, e.g. to record inputs of a build."""
+    for listener in BuildContext.current().file_access_listeners:
+        listener(path, mode)
+
+
 # pylint: disable=unspecified-encoding
 @contextmanager
 def open_file(path, *args, **kwargs):
     if os.path.islink(path):
         raise SymlinkException(path)
 
+    if BuildContext.current().file_access_listeners:
+        notify_file_access(path, args[0] if args else kwargs.get('mode', 'r'))
+
     file = builtins.open(path, *args, **kwargs)
     with closing(file):
         yield file
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from .Converter import Converter
+from .LibConfig import LibConfig
+from .LibException import ComponentException, LibException
+from .utils import last_index, bin_operators_map
+
+
+class FormulaNode:
+    """Base class of compiled formula nodes. Nodes are immutable and shared by all components using the formula."""
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        raise NotImplementedError
+
+
+class RaiseNode(FormulaNode):
+    """Formula error which is raised when (and only if) evaluation reaches the invalid part of the formula."""
+
+    def __init__(self, message: str):
+        self.message = message
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        raise ComponentException(self.message, engine.component.name)
+
+
+class InvalidCalculationNode(FormulaNode):
+    """Expression without any known operator, error message contains the expression as it looks during evaluation."""
+
+    def __init__(self, parts: List):
+        self.parts = parts
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        formula = ' '.join(part if isinstance(part, str) else part.text(slots) for part in self.parts)
+        raise ComponentException(f"Invalid calculation formula: '{formula}'", engine.component.name)
+
+
+class VariableNode(FormulaNode):
+    """Single formula element - literal (number, bool, string) or path to a component / component property."""
+    _noLiteral = object()
+
+    def __init__(self, variable: str):
+        self.variable = variable
+        self.is_unique_check = "unique[" in variable
+        self.literal = self._noLiteral
+        if '{index}' not in variable and '{parent_index}' not in variable:
+            try:
+                self.literal = FormulaCompiler.literal_from_string(variable)
+            except ValueError:
+                # Invalid literal, e.g. string with unescaped quotes - let it be raised during evaluation
+                pass
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        if self.literal is self._noLiteral:
+            value = engine.value_from_string(self.variable)
+        else:
+            value = self.literal
+        if self.is_unique_check:
+            return engine.is_variable_not_unique(self.variable)
+        if value is not None:
+            return value
+        value = engine.calculate_value_from_path(self.variable, allow_calculate, build_process)
+
+        if value is None and not allow_none_return:
+            raise ComponentException(f"Expression '{self.variable}' returns no value.", engine.component.name)
+        return value
+
+    def text(self, _slots) -> str:
+        return self.variable
+
+
+class SlotNode(FormulaNode):
+    """
+    Placeholder of an already calculated bracket. Value of the bracket is put back into the formula as a string
+    and then treated like any other formula element.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        return engine.get_value_of_variable(slots[self.index], allow_calculate, allow_none_return, build_process)
+
+    def text(self, slots) -> str:
+        return slots[self.index]
+
+
+class BracketsNode(FormulaNode):
+    """Brackets are calculated from the innermost one, each result is stored in a slot used by the rest of formula."""
+
+    def __init__(self, brackets: List[FormulaNode], body: FormulaNode):
+        self.brackets = brackets
+        self.body = body
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        slots = []
+        for bracket in self.brackets:
+            slots.append(str(bracket.evaluate(engine, False, False, False, slots)))
+        return self.body.evaluate(engine, False, False, False, slots)
+
+
+class ConditionalNode(FormulaNode):
+    """'condition ? value_if_true : value_if_false' expression."""
+
+    def __init__(self, condition: FormulaNode, if_true: FormulaNode, if_false: FormulaNode):
+        self.condition = condition
+        self.if_true = if_true
+        self.if_false = if_false
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        if self.condition.evaluate(engine, False, False, False, slots):
+            return self.if_true.evaluate(engine, allow_calculate, False, build_process, slots)
+        return self.if_false.evaluate(engine, allow_calculate, False, build_process, slots)
+
+
+class OperatorNode(FormulaNode):
+    """Binary (or unary 'not') operator applied to left and right part of the expression."""
+
+    def __init__(self, operator: str, left: Optional[FormulaNode], right: FormulaNode):
+        self.operator = operator
+        self.function = bin_operators_map[operator][0]
+        self.left = left
+        self.right = right
+
+    def evaluate(self, engine, allow_calculate, allow_none_return, build_process, slots):
+        if self.operator == 'and':
+            return self.left.evaluate(engine, allow_calculate, False, False, slots) and \
+                self.right.evaluate(engine, allow_calculate, False, False, slots)
+        if self.operator == 'or':
+            return self.left.evaluate(engine, allow_calculate, False, False, slots) or \
+                self.right.evaluate(engine, allow_calculate, False, False, slots)
+        if self.operator == 'not':
+            return not self.right.evaluate(engine, allow_calculate, False, False, slots)
+        left_value = self.left.evaluate(engine, allow_calculate, False, False, slots)
+        right_value = self.right.evaluate(engine, allow_calculate, False, False, slots)
+        # views of mapped files support only a subset of bytes operations
+        if isinstance(left_value, memoryview):
+            left_value = left_value.tobytes()
+        if isinstance(right_value, memoryview):
+            right_value = right_value.tobytes()
+        if isinstance(left_value, (bytes, bytearray)) and isinstance(right_value, int):
+            left_value = int.from_bytes(left_value, "big")
+        if isinstance(left_value, int) and isinstance(right_value, (bytes, bytearray)):
+            right_value = int.from_bytes(right_value, "big")
+        if isinstance(left_value, (bytes, bytearray)) and isinstance(right_value, str):
+            left_value = left_value.decode('utf-8')
+        if isinstance(left_value, str) and isinstance(right_value, (bytes, bytearray)):
+            right_value = right_value.decode('utf-8')
+        return self.function(left_value, right_value)
+
+
+class CompiledFormula:
+    """
+    Formula split into parts and compiled into a tree of nodes.
+
+    Data ranges like '/settings/component.data[parent/start.value:parent/end.value]' depend on values of other
+    components, so they are calculated on every evaluation and the formula with numbers put in place of the range
+    formulas is compiled (and cached) separately.
+    """
+    DataRange = Tuple[int, str, Optional[str]]
+
+    def __init__(self, parts: Tuple[str, ...], data_ranges: List[DataRange]):
+        self.parts = parts
+        self.data_ranges = data_ranges
+        self.body = None if data_ranges else FormulaCompiler.compile_level(list(parts))
+
+    def evaluate(self, engine, allow_calculate=False, allow_none_return=False, build_process=False):
+        body = self.body
+        if body is None:
+            parts = list(self.parts)
+            for index, range_start, range_end in self.data_ranges:
+                parts[index] = parts[index].replace(range_start, str(engine.calculate_value(range_start)))
+                if range_end is not None:
+                    parts[index] = parts[index].replace(range_end, str(engine.calculate_value(range_end)))
+            body = FormulaCompiler.compile_body(tuple(parts))
+        return body.evaluate(engine, allow_calculate, allow_none_return, build_process, None)
+
+
+class PathStep:
+    """Single part of a path to a component, e.g. 'parent', 'manifest' or 'hash.value' (last part of the path)."""
+
+    def __init__(self, index: int, part: str, is_last: bool):
+        self.index = index
+        self.part = part
+        self.name = None
+        self.property_name = None
+        self.bracket_child = None
+        if not part:
+            return
+        subparts = part.rsplit(".", maxsplit=1) if is_last else [part]
+        self.name = subparts[0]
+        if len(subparts) > 1:
+            self.property_name = subparts[1]
+        if self.name not in ("parent", "this"):
+            brackets = re.search(r'(.*)\[(.*)\]', self.name)
+            if brackets:
+                self.bracket_child = brackets[1]
+        self.has_index = "{index}" in self.name
+        self.has_parent_index = "{parent_index}" in self.name
+
+
+class FormulaCompiler:
+    """
+    Turns formula text into CompiledFormula. Compiled formulas are kept in a process wide cache keyed by formula
+    text, so every formula is tokenized and parsed only once, no matter how many components or builds use it.
+    """
+    _dataRangeRegex = re.compile(r"((?<=\.data\[)|(?<=\.value\[))(.*):(.*)(?=\])")
+    # bound of caches of compiled formulas, keys include formulas of all configurations built by the process
+    maxCacheSize = 4096
+
+    @staticmethod
+    def literal_from_string(variable: str):
+        """Converts formula element to bool, int or string, returns None if it isn't a literal."""
+        try:
+            return Converter.string_to_bool(variable)
+        except ValueError:
+            pass
+        try:
+            return Converter.string_to_int(variable)
+        except LibException:
+            pass
+        try:
+            return Converter.inner_string(variable)
+        except LibException:
+            pass
+        return None
+
+    @classmethod
+    def compile(cls, formula: str) -> CompiledFormula:
+        return cls.compile_parts(tuple(filter(None, formula.split(" "))))
+
+    @classmethod
+    @lru_cache(maxsize=maxCacheSize)
+    def compile_parts(cls, parts: Tuple[str, ...]) -> CompiledFormula:
+        data_ranges = []
+        if any('.data[' in s for s in parts) or any('.value[' in s for s in parts):
+            for index, element in enumerate(parts):
+                data_range_result = cls._dataRangeRegex.search(element)
+                if data_range_result:
+                    data_range_text = data_range_result.group(0)
+                    colon_index = data_range_text.index(':')
+                    range_end = data_range_text[colon_index + 1:] if data_range_text[-1] != ':' else None
+                    data_ranges.append((index, data_range_text[:colon_index], range_end))
+        return CompiledFormula(parts, data_ranges)
+
+    @classmethod
+    @lru_cache(maxsize=maxCacheSize)
+    def compile_body(cls, parts: Tuple[str, ...]) -> FormulaNode:
+        return cls.compile_level(list(parts))
+
+    @classmethod
+    @lru_cache(maxsize=maxCacheSize)
+    def compile_path(cls, path: str) -> Tuple[PathStep, ...]:
+        parts = path.split(LibConfig.pathSeparator)
+        return tuple(PathStep(i, part, i == len(parts) - 1) for i, part in enumerate(parts))
+
+    @classmethod
+    def clear_cache(cls):
+        cls.compile_parts.cache_clear()
+        cls.compile_body.cache_clear()
+        cls.compile_path.cache_clear()
+
+    @classmethod
+    def compile_level(cls, parts: List) -> FormulaNode:
+        if any(isinstance(s, str) and ('(' in s or ')' in s) for s in parts):
+            return cls._compile_brackets(parts)
+        if parts.count(':') > 0 or parts.count('?') > 0:
+            return cls._compile_conditional(parts)
+        if not parts:
+            return RaiseNode("Invalid formula")
+        if len(parts) == 1:
+            return VariableNode(parts[0]) if isinstance(parts[0], str) else parts[0]
+        return cls._compile_expression(parts)
+
+    @classmethod
+    def _compile_expression(cls, parts: List) -> FormulaNode:
+        for oper, pair in bin_operators_map.items():
+            try:
+                i = last_index(parts, oper) if pair[1] else parts.index(oper)
+            except ValueError:
+                continue
+            left = None if oper == 'not' else cls.compile_level(parts[:i])
+            return OperatorNode(oper, left, cls.compile_level(parts[i + 1:]))
+        return InvalidCalculationNode(parts)
+
+    @staticmethod
+    def _split_brackets(temp_parts: List[str]) -> List[str]:
+        parts = []
+        for part in temp_parts:
+            left_cnt = part.count('(')
+            right_cnt = part.count(')')
+            parts.extend(['('] * left_cnt)
+            if right_cnt == 0:               # here we change '(value)' into '(', 'value', ')' [could be ((value)) etc.]
+                parts.append(part[left_cnt:])   # we need to unhook number of '(' from left and ')' for right
+            else:                               # there is exception if there is no ')' then we can't unhook from right
+                parts.append(part[left_cnt:-1 * right_cnt])
+            parts.extend([')'] * right_cnt)
+        return list(filter(None, parts))
+
+    @classmethod
+    def _compile_brackets(cls, temp_parts: List[str]) -> FormulaNode:
+        parts = cls._split_brackets(temp_parts)
+        if parts.count('(') != parts.count(')'):
+            return RaiseNode("Invalid formula, number of '(' and ')' must be equal")
+        brackets = []
+        while ')' in parts:
+            close_idx = parts.index(')')
+            try:
+                # find the closest '(' to the left of ')'
+                open_idx = close_idx - parts[close_idx::-1].index('(')
+            except ValueError:
+                return BracketsNode(brackets, RaiseNode("Invalid formula, '(' must be before ')'"))
+            # sentence between them is calculated as a pure sentence and replaced with its value
+            brackets.append(cls.compile_level(parts[open_idx + 1:close_idx]))
+            parts = parts[:open_idx] + [SlotNode(len(brackets) - 1)] + parts[close_idx + 1:]
+        return BracketsNode(brackets, cls.compile_level(parts))
+
+    @classmethod
+    def _compile_conditional(cls, parts: List) -> FormulaNode:
+        try:
+            question_mark_idx = parts.index("?")
+            colon_idx = parts.index(":")
+        except ValueError:
+            return RaiseNode("Invalid formula, missing ':' / '?' operator required by '?' / ':'")
+        if colon_idx < question_mark_idx:
+            return RaiseNode("Invalid formula, ':' must be behind '?'")
+        return ConditionalNode(cls.compile_level(parts[:question_mark_idx]),
+                               cls.compile_level(parts[question_mark_idx + 1:colon_idx]),
+                               cls.compile_level(parts[colon_idx + 1:]))
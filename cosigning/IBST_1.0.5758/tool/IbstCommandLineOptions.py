@@ -41,6 +41,18 @@ class IbstCommandLineOptions:
     example = None
     output_info = None
     output_map = None
+    jobs = 1
+    use_cache = True
+    profile_file = None
+    snapshot_in_file = None
+    snapshot_out_file = None
+    watch = False
+    direct_output = False
+    fsync = False
+    buffer_dir = None
+    decompose_map = None
+    decompose_paths = None
+    decompose_depth = None
 
     def __init__(self, app_name, app_dir, input_args):
         self.app_name = app_name
@@ -51,7 +63,12 @@ class IbstCommandLineOptions:
             f"   $ python3 {self.app_name} OEMToken.xml -o OEMToken.bin\n" \
             f"   $ python3 {self.app_name} IE.xml -o ie.bin -s ftpr_key=rsa_key.pem\n" \
             f"   $ python3 {self.app_name} OEMToken.xml -o OEMToken.bin --skip_valid\n" \
-            f"   $ python3 {self.app_name} -s is_acm=1 binary=ACM.bin key=keys.pem -- CoSigningManifest.xml\n"
+            f"   $ python3 {self.app_name} -s is_acm=1 binary=ACM.bin key=keys.pem -- CoSigningManifest.xml\n" \
+            f"   $ python3 {self.app_name} CoSigningManifest.xml --config_override overrides.xml -j 4\n\n" \
+            f"build server (keeps IBST loaded between builds, " \
+            f"run builds with ibst_client.py and ibst.py arguments):\n" \
+            f"   $ python3 {self.app_name} serve [--address ADDRESS]\n" \
+            f"   $ python3 ibst_client.py OEMToken.xml -o OEMToken.bin\n"
 
         parser = argparse.ArgumentParser(app_name,
                                          formatter_class=IbstHelpFormatter,
@@ -73,11 +90,51 @@ class IbstCommandLineOptions:
         parser.add_argument('--info', help=argparse.SUPPRESS)
         parser.add_argument('--map', help="output XML file with binary's map")
         parser.add_argument('--verbose', help="print additional information", action='store_true')
+        parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='number of parallel builds of <cosign> nodes from --config_override file '
+                                 '(default: 1). Output is printed in order of nodes. With any number of jobs, '
+                                 'all nodes are built even if one of them fails')
+        parser.add_argument('--no_cache', '--no-cache', action='store_true',
+                            help='always build the binary, do not use outputs of previous identical builds stored in '
+                                 'build_cache directory')
+        parser.add_argument('--profile', metavar='PROFILE',
+                            help='save time spent in build phases and components to JSON report PROFILE and to '
+                                 'speedscope profile with .speedscope.json extension (use with --no_cache to profile '
+                                 'the full build)')
+        parser.add_argument('--snapshot_out', '--snapshot-out', metavar='SNAPSHOT',
+                            help='save parsed and validated configuration XML to SNAPSHOT file, so later runs can '
+                                 'load it with --snapshot_in instead of validating the configuration again')
+        parser.add_argument('--snapshot_in', '--snapshot-in', metavar='SNAPSHOT',
+                            help='load configuration from SNAPSHOT file saved by --snapshot_out, the configuration is '
+                                 'parsed and validated as usual if it has changed since the snapshot was saved')
+        parser.add_argument('--watch', action='store_true',
+                            help='build again whenever the configuration, the override file or a file read by '
+                                 'the build (binary, key) changes, until interrupted with Ctrl+C (build cache is not '
+                                 'used)')
+        parser.add_argument('--direct_output', '--direct-output', action='store_true',
+                            help='build the binary directly in a memory mapped temporary file which replaces the '
+                                 'output file when the build succeeds, so the image is held in memory only once '
+                                 '(the binary is written as usual on Windows)')
+        parser.add_argument('--fsync', action='store_true',
+                            help='with --direct_output, flush the binary to disk before it replaces the output file')
+        parser.add_argument('--buffer_dir', '--buffer-dir', metavar='DIR',
+                            help='directory for temporary files backing build buffers of images too large to be '
+                                 'built in memory (default: system temporary directory)')
+        parser.add_argument('--decompose', metavar='MAP',
+                            help='decompose the input file of <decomposition> node and write map of its components to '
+                                 'MAP as they are parsed, pages of the input file are released from memory after '
+                                 'their components are parsed (the binary is not built)')
+        parser.add_argument('--decompose_path', '--decompose-path', metavar='PATTERN', nargs='+',
+                            help='with --decompose, map only components whose path in <decomposition> node matches '
+                                 'one of patterns (e.g. me_binary/partitions/*) and their descendants')
+        parser.add_argument('--decompose_depth', '--decompose-depth', metavar='DEPTH', type=int,
+                            help='with --decompose, map only components up to DEPTH levels below <decomposition> '
+                                 'node')
         args = parser.parse_args(args=input_args)
 
         self.input_file = args.input
         if args.output is not None:
-            IbstCommandLineOptions.output_file = args.output
+            self.output_file = args.output
         if args.info:
             self.output_info = args.info
         if args.map:
@@ -89,3 +146,26 @@ class IbstCommandLineOptions:
         if args.verbose:
             LibConfig.isVerbose = True
         self.skip_validation = args.skip_valid is not False
+        if args.jobs < 1:
+            parser.error(f"argument -j/--jobs: invalid value: '{args.jobs}', must be at least 1")
+        self.jobs = args.jobs
+        self.use_cache = not args.no_cache
+        self.profile_file = args.profile
+        self.snapshot_in_file = args.snapshot_in
+        self.snapshot_out_file = args.snapshot_out
+        self.watch = args.watch
+        self.direct_output = args.direct_output
+        self.fsync = args.fsync
+        if args.buffer_dir:
+            self.buffer_dir = args.buffer_dir
+            LibConfig.diskBufferDir = args.buffer_dir
+        if (args.decompose_path or args.decompose_depth is not None) and not args.decompose:
+            parser.error("arguments --decompose_path and --decompose_depth require --decompose")
+        if args.decompose and (args.watch or args.config_override):
+            parser.error(f"argument --decompose: not allowed with argument "
+                         f"{'--watch' if args.watch else '--config_override'}")
+        if args.decompose_depth is not None and args.decompose_depth < 1:
+            parser.error(f"argument --decompose_depth: invalid value: '{args.decompose_depth}', must be at least 1")
+        self.decompose_map = args.decompose
+        self.decompose_paths = args.decompose_path
+        self.decompose_depth = args.decompose_depth
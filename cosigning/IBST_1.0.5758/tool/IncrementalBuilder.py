@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Set, Tuple
+
+from .BuildContext import BuildContext
+from .LibException import LibException
+
+
+class IncrementalBuilder:
+    """
+    Records dependencies between components while the binary is parsed and built, so after settings are changed
+    the binary can be rebuilt by recomputing only the affected components (calculated values, hashes, crcs,
+    signatures) and patching their bytes in the existing buffer.
+
+    Every component resolved by a formula is recorded as a dependency of the component which owns the formula, and
+    every buffer range read by a function input is recorded with the function. A rebuild marks changed settings dirty
+    and goes through built components in build order: a component is built again if it depends on a dirty component
+    or reads a dirty range of the buffer, and if its value changes it becomes dirty too, together with its parents
+    (their values are snapshots of the buffer).
+
+    The result must be the same as the result of a build from scratch, so the whole binary is built instead when:
+    a dirty component was used while components were parsed or laid out (it may change sizes and offsets), a component
+    to recompute used data written later in the build (e.g. a hash of a range containing itself), its size changes,
+    it's encrypted, it cannot be built on its own or a component reads the buffer without recording it.
+    """
+
+    class Phase:
+        PARSE = 'parse'
+        LAYOUT = 'layout'
+        # values of components with known size calculated while the layout is built, the build calculates them again
+        VALUE = 'value'
+        BUILD = 'build'
+
+    class FullBuildRequired(LibException):
+        pass
+
+    class Report:
+        """Components recomputed by a rebuild, or the reason why the whole binary was built."""
+
+        def __init__(self):
+            self.recomputed: List[str] = []
+            self.full_build_reason: Optional[str] = None
+            self.duration = 0.0
+            self._start = time.perf_counter()
+
+        @property
+        def full_build(self) -> bool:
+            return self.full_build_reason is not None
+
+        def stop(self) -> 'IncrementalBuilder.Report':
+            self.duration = time.perf_counter() - self._start
+            return self
+
+        def __str__(self):
+            if self.full_build:
+                return f"Binary built in {self.duration:.3f}s (full build: {self.full_build_reason})"
+            return f"Binary rebuilt in {self.duration:.3f}s, recomputed {len(self.recomputed)} component(s): " \
+                   f"{', '.join(self.recomputed) if self.recomputed else 'none'}"
+
+    # builder recording dependencies of the current build (see BuildContext)
+    active: 'IncrementalBuilder' = BuildContext.Attribute('incremental_builder')
+    _inactive_section = nullcontext()
+
+    def __init__(self):
+        self.phase = None
+        self._clock = 0
+        self._built: List = []
+        self._built_at: Dict[object, int] = {}
+        self._written_at: Dict[object, int] = {}
+        self._dependents: Dict[object, Dict[object, Set[str]]] = {}
+        self._layout_reads: Dict[object, Set[str]] = {}
+        self._value_reads: Dict[object, Dict[object, int]] = {}
+        self._buffer_reads: Dict[object, Dict[Tuple[Tuple[int, int], ...], int]] = {}
+        # state of the running rebuild
+        self._in_layout: Optional[Set] = None
+        self._written_ranges: Optional[List[Tuple[int, int, int]]] = None
+        self._dirty: Optional[Set] = None
+        self._dirty_ranges: List[Tuple[int, int]] = []
+        self._pending: Optional[Set] = None
+        self._stale_parents: List = []
+        self._current = None
+
+    @contextmanager
+    def recording(self, phase: str):
+        context = BuildContext.current()
+        previous_active, previous_phase = context.incremental_builder, self.phase
+        context.incremental_builder, self.phase = self, phase
+        try:
+            yield self
+        finally:
+            context.incremental_builder, self.phase = previous_active, previous_phase
+
+    @classmethod
+    def section(cls, phase: str):
+        """Context manager recording reads under given phase, it does nothing when dependencies are not recorded."""
+        if cls.active is None:
+            return cls._inactive_section
+        return cls.active.recording(phase)
+
+    @classmethod
+    def record_read(cls, component, owner, property_name: str = None):
+        """Records component (or its property) resolved by a formula of owner."""
+        builder = cls.active
+        if builder is not None:
+            builder.add_read(component, owner, property_name)
+
+    @classmethod
+    def record_buffer_read(cls, owner, start: int, end: int, exclude_ranges=None):
+        """Records range of the buffer read by owner, exclude ranges are relative to the start."""
+        builder = cls.active
+        if builder is not None:
+            builder.add_buffer_read(owner, start, end, exclude_ranges)
+
+    @classmethod
+    def record_built(cls, component, target=None):
+        """Records that component was built and wrote target (the component itself by default)."""
+        builder = cls.active
+        if builder is not None:
+            builder.add_built(component, target)
+
+    def add_read(self, component, owner, property_name: str = None):
+        if component is owner or component is None:
+            return
+        property_name = property_name.split('[', 1)[0] if property_name else ''
+        if self.phase not in (self.Phase.VALUE, self.Phase.BUILD):
+            self._layout_reads.setdefault(component, set()).add(property_name)
+            return
+        self._dependents.setdefault(component, {}).setdefault(owner, set()).add(property_name)
+        if self.phase == self.Phase.BUILD and property_name and property_name not in component.layout_properties:
+            self._value_reads.setdefault(owner, {}).setdefault(component, self._clock)
+
+    def add_buffer_read(self, owner, start: int, end: int, exclude_ranges=None):
+        ranges = []
+        position = start
+        for exclude_start, exclude_end in sorted(exclude_ranges or []):
+            if start + exclude_start > position:
+                ranges.append((position, min(start + exclude_start, end)))
+            position = max(position, start + exclude_end)
+        if end > position:
+            ranges.append((position, end))
+        self._buffer_reads.setdefault(owner, {}).setdefault(tuple(ranges), self._clock)
+
+    def add_built(self, component, target=None):
+        self._clock += 1
+        if component not in self._built_at:
+            self._built_at[component] = self._clock
+            self._built.append(component)
+        if target is None or target is component:
+            self._written_at[component] = self._clock
+            return
+        # values of parents are updated together with the target
+        while target is not None:
+            self._written_at[target] = self._clock
+            target = target.parent
+
+    def rebuild(self, layout_root, buffer, changed: Set, report: 'IncrementalBuilder.Report'):
+        """Builds again components affected by changed components and patches them in the buffer.
+        Raises FullBuildRequired if the result could differ from a build from scratch."""
+        for component in self._built:
+            if component.untracked_buffer_access:
+                raise self.FullBuildRequired(f"'{component.get_string_path()}' reads the buffer without recording it")
+        self._in_layout = set(layout_root.descendants)
+        self._in_layout.add(layout_root)
+        self._written_ranges = self._get_written_ranges()
+        self._dirty, self._dirty_ranges, self._pending, self._stale_parents = set(), [], set(), []
+        self._current = None
+        position, clock = buffer.tell(), self._clock
+        try:
+            with self.recording(self.Phase.BUILD):
+                for component in changed:
+                    self._mark_dirty(component)
+                for component in list(self._built):
+                    if self._is_affected(component):
+                        self._recompute(component, buffer, report)
+                self._refresh_parents(buffer)
+        finally:
+            buffer.seek(position)
+            self._clock = clock
+            self._in_layout, self._written_ranges, self._dirty, self._pending = None, None, None, None
+
+    def _get_written_ranges(self) -> List[Tuple[int, int, int]]:
+        """Returns (write time, start, end) of buffer ranges written by built components."""
+        ranges = []
+        for component, written_at in self._written_at.items():
+            if component.offset is None or not component.size or component.calc_only:
+                continue
+            start, end = component.offset, component.offset + component.size
+            if component.children:
+                if component.encryption_key_component or component.is_offline_encryption() or component.fill:
+                    pass
+                elif component.padding:
+                    if component.align_with_end:
+                        end = start + len(component.padding)
+                    else:
+                        start = end - len(component.padding)
+                else:
+                    continue
+            ranges.append((written_at, start, end))
+        return ranges
+
+    def _is_stable(self, component, visited=None) -> bool:
+        """Checks that component used only data which were final when it was built in the original build."""
+        visited = visited if visited is not None else set()
+        if component in visited:
+            return True
+        visited.add(component)
+        for source, read_at in self._value_reads.get(component, {}).items():
+            if self._written_at.get(source, -1) > read_at:
+                return False
+            # values calculated on demand by formulas of other components (e.g. settings)
+            if source not in self._built_at and not self._is_stable(source, visited):
+                return False
+        for ranges, read_at in self._buffer_reads.get(component, {}).items():
+            for written_at, start, end in self._written_ranges:
+                if written_at > read_at and any(start < read_end and read_start < end
+                                                for read_start, read_end in ranges):
+                    return False
+        return True
+
+    def _mark_dirty(self, component):
+        if component in self._dirty:
+            return
+        is_built = component in self._built_at
+        layout_reads = self._layout_reads.get(component)
+        if layout_reads and (not is_built or not layout_reads.issubset(component.layout_properties)):
+            raise self.FullBuildRequired(f"'{component.get_string_path()}' is used by the layout")
+        self._dirty.add(component)
+        for dependent, properties in self._dependents.get(component, {}).items():
+            if is_built and properties.issubset(component.layout_properties):
+                continue
+            dependent = dependent.get_build_unit()
+            if dependent is self._current:
+                continue
+            built_at = self._built_at.get(dependent)
+            if built_at is None:
+                if dependent.value_formula and dependent.value is not None:
+                    raise self.FullBuildRequired(f"'{dependent.get_string_path()}' keeps value calculated from "
+                                                 f"'{component.get_string_path()}'")
+                self._mark_dirty(dependent)
+            elif dependent not in self._in_layout:
+                raise self.FullBuildRequired(f"'{dependent.get_string_path()}' is built outside of the layout")
+            elif self._current is not None and built_at <= self._built_at[self._current]:
+                raise self.FullBuildRequired(f"'{dependent.get_string_path()}' was built before "
+                                             f"'{component.get_string_path()}' changed")
+            else:
+                self._pending.add(dependent)
+
+    def _is_affected(self, component) -> bool:
+        if component in self._pending:
+            return True
+        for ranges in self._buffer_reads.get(component, {}):
+            for read_start, read_end in ranges:
+                if any(start < read_end and read_start < end for start, end in self._dirty_ranges):
+                    return True
+        return False
+
+    def _recompute(self, component, buffer, report: 'IncrementalBuilder.Report'):
+        path = component.get_string_path()
+        if not component.is_rebuildable():
+            raise self.FullBuildRequired(f"'{path}' cannot be built on its own")
+        if not self._is_stable(component):
+            raise self.FullBuildRequired(f"'{path}' uses data written later in the build")
+        self._refresh_parents(buffer)
+        target = component.get_build_target()
+        parent = target
+        while parent is not None:
+            if parent.encryption_key_component or parent.is_offline_encryption() or parent.save_file_path:
+                raise self.FullBuildRequired(f"'{parent.get_string_path()}' is encrypted or saved to a file")
+            parent = parent.parent
+        offset, size, value = target.offset, target.size, target.value
+        children_values = [child.value for child in target.children]
+        written = not target.calc_only and offset is not None and size
+        old_bytes = buffer[offset:offset + size] if written else None
+
+        self._current = component
+        # formulas are recorded at the same point of the build as in the original build
+        self._clock = self._built_at[component] - 1
+        try:
+            component.reset_build()
+            component.build(buffer)
+        except LibException as ex:
+            raise self.FullBuildRequired(f"'{path}' failed: {ex}") from None
+        report.recomputed.append(path)
+
+        if target.offset != offset or target.size != size:
+            raise self.FullBuildRequired(f"size of '{target.get_string_path()}' has changed")
+        if not self._is_stable(component):
+            raise self.FullBuildRequired(f"'{path}' uses data written later in the build")
+        bytes_changed = written and buffer[offset:offset + size] != old_bytes
+        if not bytes_changed and target.value == value:
+            return
+        self._mark_dirty(target)
+        # children built together with the target, e.g. bits of a bit field
+        for child, child_value in zip(target.children, children_values):
+            if child.value != child_value:
+                self._mark_dirty(child)
+        if bytes_changed:
+            self._dirty_ranges.append((offset, offset + size))
+            parent = target.parent
+            while parent is not None and parent in self._built_at:
+                self._stale_parents.append(parent)
+                self._mark_dirty(parent)
+                parent = parent.parent
+
+    def _refresh_parents(self, buffer):
+        """Parents keep their content read from the buffer after their children were built."""
+        for parent in self._stale_parents:
+            if parent.offset is not None and parent.value is not None:
+                buffer.seek(parent.offset)
+                parent.set_value(parent.read_buffer_value(buffer))
+        self._stale_parents.clear()
@@ -14,8 +14,13 @@ This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
 
+import os
 from enum import Enum
 
+from .BuildContext import BuildContext
+
+_build_context = BuildContext.contextVar
+
 
 class LoadingUserXml:
     """Context manager keeping track of isLoadingUserXml property of LibConfig."""
@@ -26,7 +31,25 @@ class LoadingUserXml:
         LibConfig.isLoadingUserXml = False
 
 
-class LibConfig:
+class ContextualConfig(type):
+    """Keeps attributes set while a build context is activated in the context, so concurrent builds have their own
+    configuration. Without an activated context attributes are plain class attributes."""
+
+    def __getattribute__(cls, name):
+        context = _build_context.get()
+        if context is not None and name in context.config:
+            return context.config[name]
+        return super().__getattribute__(name)
+
+    def __setattr__(cls, name, value):
+        context = _build_context.get()
+        if context is None:
+            super().__setattr__(name, value)
+        else:
+            context.config[name] = value
+
+
+class LibConfig(metaclass=ContextualConfig):
     class ToolType(Enum):
         UNKNOWN = None
         IBST = 'IBST'
@@ -70,7 +93,24 @@ class LibConfig:
     layoutsPath: str = ''
     pluginsPath: str = ''
     skipSchemaValidation = False
+    '''schemaCacheDir - directory for precompiled schema validators, if it's None they are kept only in memory'''
+    schemaCacheDir: str = None
+    '''buildCacheDir - directory for cached build outputs, if it's None builds are not cached'''
+    buildCacheDir: str = None
+    buildCacheMaxSize = 1024 * 1024 * 1024
+    '''
+    diskBufferThreshold - images larger than this are built in buffers backed by temporary files in diskBufferDir
+    (system temporary directory if it's None) instead of memory, then they can be up to maxDiskBufferSize instead of
+    maxBufferSize. If it's None, all images are built in memory.
+    '''
+    diskBufferThreshold: int = None
+    diskBufferDir: str = None
+    maxDiskBufferSize = 16 * 1024 * 1024 * 1024
+    '''digestThreads - threads calculating digests of inputs independent of the build, less than 2 disables them'''
+    digestThreads = min(4, os.cpu_count() or 1)
     toolType: ToolType = ToolType.UNKNOWN
+    '''toolVersion - version of the tool running the build, outputs cached by other versions are not used'''
+    toolVersion: str = None
     legacyMap = False
     defaultVersion = '1.0.0'
     serverPortString = ''
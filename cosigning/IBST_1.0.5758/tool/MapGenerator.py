@@ -13,9 +13,14 @@ the related documents without Intel's prior written permission.
 This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
+import os
+from contextlib import ExitStack
+from typing import Dict, List
+
 from lxml.etree import Element, SubElement  # nosec
 from lxml import etree  # nosec
 
+from .DecompositionStream import DecompositionStream
 from .FileManager import FileManager
 from .components.IComponent import IComponent
 from .components.TableEntryComponent import TableEntryComponent
@@ -122,6 +127,74 @@ class XmlInfoFormatter(XmlMapFormatter):
     skipEmpty = False
 
 
+class DecompositionMapWriter(XmlInfoFormatter):
+    """
+    Writes map of a streamed decomposition (see DecompositionStream) with offsets, sizes and values of components as
+    they are emitted: each child of the decomposition node is written to the file when its subtree is complete, so
+    only elements of the child being decomposed are kept in memory. Values are given for selected components without
+    emitted children.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        # elements of emitted components waiting for their parent, by depth
+        self._pending: Dict[int, List[Element]] = {}
+        self._exit_stack = ExitStack()
+        self._xml_file = None
+        self._root_element = None
+
+    def __enter__(self) -> 'DecompositionMapWriter':
+        FileManager.validate_path_to_save(self.path)
+        FileManager.create_dir_tree_if_absent(os.path.dirname(self.path))
+        self._xml_file = self._exit_stack.enter_context(etree.xmlfile(self.path, encoding='utf-8'))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self._exit_stack.close()
+        except etree.LxmlSyntaxError:
+            # unfinished document of a failed decomposition, which is reported instead
+            if exc_type is None:
+                raise
+        finally:
+            self._pending.clear()
+            if exc_type is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def write_node(self, node: DecompositionStream.Node):
+        component = node.component
+        children = self._pending.pop(node.depth + 1, [])
+        if node.depth == 0:
+            # children of the decomposition node are already written
+            self._open_root(component)
+            self._root_element.__exit__(None, None, None)
+            return
+        if any(pred(component) for pred in self.excludingPredicates):
+            return
+        element = Element(component.name)
+        element.attrib[component.Tags.OFFSET] = hex(component.offset)
+        element.attrib[component.Tags.SIZE] = hex(component.size)
+        if children:
+            element.extend(children)
+        elif node.selected and not component.children:
+            element.attrib[component.Tags.VALUE] = self._format_value(component)
+        if node.depth > 1:
+            self._pending.setdefault(node.depth, []).append(element)
+            return
+        self._open_root(component.parent)
+        etree.indent(element, level=1)
+        self._xml_file.write('  ', element, '\n')
+
+    def _open_root(self, decomposition):
+        if self._root_element is not None:
+            return
+        attributes = {'file': decomposition.file_name} if decomposition.file_name else {}
+        self._root_element = self._xml_file.element(decomposition.name, attributes)
+        self._root_element.__enter__()  # pylint: disable=unnecessary-dunder-call
+        self._xml_file.write('\n')
+
+
 class MapGenerator:
 
     def __init__(self, formatter_class: type):
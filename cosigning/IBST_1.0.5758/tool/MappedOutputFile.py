@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import os
+import secrets
+import stat
+from typing import Callable, Optional
+
+from .FileManager import FileManager
+from .FileOpener import notify_file_access
+from .LibConfig import LibConfig
+from .LibException import SaveFileException, SymlinkException
+from .structures import Buffer
+
+
+class MappedOutputFile:
+    """
+    Output binary built directly in its file (--direct_output): the build buffer is a shared memory mapping of
+    a temporary file created next to the output file and sized to the layout, so the image is not copied from an
+    anonymous buffer to the file and it's held in memory (page cache) only once.
+
+    The temporary file replaces the output file atomically when the buffer is saved, so the output file is either
+    the previous one or the complete new binary. The file is flushed to disk before it's renamed if fsync is set.
+    A temporary file which was not saved (failed build, output not generated) is removed when the build ends.
+
+    Files mapped into memory can't be renamed on Windows, there the binary is built in memory and written as usual.
+    """
+    isSupported = Buffer.isResizable
+    tempSuffix = '.tmp'
+
+    def __init__(self, get_path: Callable[[], Optional[str]], fsync: bool = False):
+        """
+        :param get_path: returns path of the output file, it's called when the layout is built (None if the binary
+            is not saved, then the buffer is created as usual)
+        :param fsync: flush the binary to disk before it replaces the output file
+        """
+        self._get_path = get_path
+        self.fsync = fsync
+        self.path: Optional[str] = None
+        self.buffer: Optional[Buffer] = None
+        self._temp_path: Optional[str] = None
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> 'MappedOutputFile':
+        return self
+
+    def __exit__(self, *_):
+        self.discard()
+
+    def create_buffer(self, length: int) -> Buffer:
+        """Returns the build buffer of given length, mapped to the temporary file if the output file is known."""
+        path = self._get_path()
+        if path is None:
+            return Buffer.create_build_buffer(length)
+        path = os.path.abspath(FileManager.remove_whitespace_from_output_file(path))
+        if os.path.islink(path):
+            raise SymlinkException(path)
+        FileManager.validate_path_to_save(path)
+        self.discard()
+        directory, name = os.path.split(path)
+        temp_path = os.path.join(directory, f'.{name}.{secrets.token_hex(4)}{self.tempSuffix}')
+        try:
+            FileManager.create_dir_tree_if_absent(directory)
+            notify_file_access(path, 'wb')
+            # mode of a new file is set by umask as for files opened for writing
+            self._fd = os.open(temp_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o666)
+            self._temp_path = temp_path
+            if os.path.exists(path):
+                os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+            Buffer.reserve_file(self._fd, length)
+            self.buffer = Buffer(self._fd, length)
+        except OSError as exception:
+            self.discard()
+            raise SaveFileException(path) from exception
+        self.path = path
+        return self.buffer
+
+    def is_saved_by(self, buffer, path: str) -> bool:
+        """Checks that saving buffer to path means committing this file."""
+        return self.buffer is not None and buffer is self.buffer and self.path == os.path.abspath(
+            FileManager.remove_whitespace_from_output_file(path))
+
+    def commit(self):
+        """Replaces the output file with the temporary file, truncated to the end of the buffer content."""
+        try:
+            self.buffer.flush()
+            if os.fstat(self._fd).st_size != self.buffer.tell():
+                # the buffer is reduced to its content after the build, except an empty one
+                os.ftruncate(self._fd, self.buffer.tell())
+            if self.fsync:
+                os.fsync(self._fd)
+            if LibConfig.toolType == LibConfig.ToolType.FIT:
+                FileManager.set_linux_permissions(self._temp_path)
+            os.replace(self._temp_path, self.path)
+        except OSError as exception:
+            raise SaveFileException(self.path) from exception
+        self._temp_path = None
+        if self.fsync:
+            self._fsync_directory()
+        self._close()
+
+    def discard(self):
+        """Removes the temporary file if it was not committed, the buffer stays valid until it's closed."""
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+            self._temp_path = None
+        self._close()
+
+    def _close(self):
+        # the mapping keeps its own handle of the file
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _fsync_directory(self):
+        """Makes the rename durable, directories can't be opened on all platforms and file systems."""
+        try:
+            fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
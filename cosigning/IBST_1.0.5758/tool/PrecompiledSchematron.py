@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+import dis
+
+from lxml.etree import Element, XSLT, XSLTAccessControl  # nosec - parsed xml is checked if there are no DOCTYPE elements. We don't use features that introduce other vulnerabilities
+from lxml.isoschematron import Schematron  # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
+
+
+class PrecompiledSchematron(Schematron):
+    """
+    Schematron validator created directly from previously compiled validating XSLT, so the extract / include /
+    expand / compile steps of the iso-schematron skeleton are skipped.
+
+    The validator state is set as Schematron.__init__ sets it, is_supported checks that the installed lxml sets
+    the same attributes, otherwise the schematron is compiled as usual.
+    """
+    def __init__(self, validator_xslt: Element, error_finder=Schematron.ASSERTS_ONLY):
+        super(Schematron, self).__init__()  # pylint: disable=bad-super-call
+        self._store_report = False
+        self._schematron = None
+        self._validator_xslt = None
+        self._validation_report = None
+        if error_finder is not self.ASSERTS_ONLY:
+            self._validation_errors = error_finder
+        self._validator = XSLT(validator_xslt, access_control=XSLTAccessControl.DENY_ALL)
+
+    @classmethod
+    def is_supported(cls) -> bool:
+        return cls._get_set_attributes(Schematron.__init__) == cls._get_set_attributes(cls.__init__)
+
+    @staticmethod
+    def _get_set_attributes(function) -> set:
+        return {instruction.argval for instruction in dis.get_instructions(function)
+                if instruction.opname == 'STORE_ATTR'}
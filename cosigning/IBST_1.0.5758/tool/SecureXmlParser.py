@@ -15,15 +15,19 @@ implied warranties, other than those that are expressly stated in the License.
 """
 
 import os
+import hashlib
+import threading
 
 from collections import namedtuple
-from lxml.etree import Element, XMLSchema, XMLParser, fromstring  # nosec - parsed xml is checked if there are no DOCTYPE elements. We don't use features that introduce other vulnerabilities
-from lxml.isoschematron import Schematron  # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
+from lxml import etree
+from lxml.etree import Element, XMLSchema, XMLParser, fromstring, tostring  # nosec - parsed xml is checked if there are no DOCTYPE elements. We don't use features that introduce other vulnerabilities
 
 from . import utils
+from .BuildProfiler import BuildProfiler
 from .FileOpener import open_file
 from .LibException import LibException, XmlValidationFailedException
 from .LibConfig import LibConfig
+from .FileManager import FileManager
 
 
 class SecureXmlParser:
@@ -41,12 +45,22 @@ class SecureXmlParser:
         NoSchema = None
         PluginXml = SchemaType('schema/plugin_schema.xsd', xml_schema=True, schematron=False)
 
+    class ValidatorKind:
+        XML_SCHEMA = 'xml_schema'
+        SCHEMATRON = 'schematron'
+
+    # validators compiled in the process by schema path, schema digest, validator kind and thread
+    _compiled_validators = {}
+    precompiledSchematronExt = '.xsl'
+    precompiledSchematronDigestExt = '.sha256'
+
     def __init__(self, xml_path: str, schema: Schema):
         self.xml_path = xml_path
         self.schema = schema
         self._xml_file_content = None
         self._xml_root = None
         self._schema_xml_root = None
+        self._schema_file_content = None
         self._xml_parser = XMLParser(resolve_entities=False, no_network=True, load_dtd=False, remove_comments=True,
                                      encoding='UTF8')
 
@@ -61,23 +75,44 @@ class SecureXmlParser:
     @property
     def xml_root(self) -> Element:
         if self._xml_root is None:
-            self._xml_root = fromstring(self.xml_file_content.encode('utf8'), self._xml_parser)   # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
+            with BuildProfiler.section(BuildProfiler.Phase.XML_PARSE, self.xml_path):
+                self._xml_root = fromstring(self.xml_file_content.encode('utf8'), self._xml_parser)   # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
             if self.schema is not self.Schema.NoSchema and not LibConfig.skipSchemaValidation:
-                self.validate_xml_tree()
+                with BuildProfiler.section(BuildProfiler.Phase.SCHEMA_VALIDATION, self.xml_path):
+                    self.validate_xml_tree()
         return self._xml_root
 
+    @classmethod
+    def validate_xml_root(cls, xml_root: Element, xml_path: str, schema: Schema) -> Element:
+        """Validates xml parsed by the caller (e.g. created in memory), xml_path is used only in error messages."""
+        parser = cls(xml_path, schema)
+        parser._xml_root = xml_root
+        if schema is not cls.Schema.NoSchema and not LibConfig.skipSchemaValidation:
+            with BuildProfiler.section(BuildProfiler.Phase.SCHEMA_VALIDATION, xml_path):
+                parser.validate_xml_tree()
+        return xml_root
+
     @property
     def schema_path(self) -> str:
         if self.schema is self.Schema.NoSchema:
             raise LibException('Tried to get full path to schema while schema has not been set at all.')
         return os.path.abspath(os.path.join(LibConfig.appDir, self.schema.path))
 
+    @property
+    def schema_file_content(self) -> bytes:
+        if self._schema_file_content is None:
+            with open_file(self.schema_path, 'rb') as f:
+                self._schema_file_content = f.read()
+        return self._schema_file_content
+
+    @property
+    def schema_digest(self) -> str:
+        return hashlib.sha256(self.schema_file_content).hexdigest()
+
     @property
     def schema_xml_root(self) -> Element:
         if self._schema_xml_root is None:
-            with open_file(self.schema_path, 'r') as f:
-                schema_content = f.read()
-                self._schema_xml_root = fromstring(schema_content.encode('utf8'), self._xml_parser)   # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
+            self._schema_xml_root = fromstring(self.schema_file_content, self._xml_parser)   # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
         return self._schema_xml_root
 
     @classmethod
@@ -89,14 +124,83 @@ class SecureXmlParser:
                 for file in mxmls:
                     _ = cls(os.path.join(root_dir, file), cls.Schema.NoSchema).xml_root
 
+    @classmethod
+    def clear_compiled_validators(cls):
+        """Drops all compiled validators, e.g. when schema files were replaced while the process is running."""
+        cls._compiled_validators.clear()
+
+    def _get_validator(self, kind: str, compile_validator):
+        # validators keep the error log of the last validation, so each thread has its own
+        key = (self.schema_path, self.schema_digest, kind, threading.get_ident())
+        validator = self._compiled_validators.get(key)
+        if validator is None:
+            validator = compile_validator()
+            self._compiled_validators[key] = validator
+        return validator
+
+    def _compile_xml_schema(self):
+        return XMLSchema(self.schema_xml_root)
+
+    @property
+    def precompiled_schematron_path(self) -> str:
+        """Path to schematron validating XSLT stored on disk or None if storing it is turned off."""
+        if not LibConfig.schemaCacheDir:
+            return None
+        file_name = f'{os.path.basename(self.schema.path)}.{self.schema_digest[:16]}.lxml{etree.__version__}' \
+                    f'{self.precompiledSchematronExt}'
+        return os.path.join(LibConfig.schemaCacheDir, file_name)
+
+    def _compile_schematron(self):
+        # isoschematron parses its XSLT skeleton when imported, so it's imported only when a schematron is compiled
+        # pylint: disable=import-outside-toplevel
+        from lxml.isoschematron import Schematron  # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
+        from .PrecompiledSchematron import PrecompiledSchematron
+        precompiled_path = self.precompiled_schematron_path
+        if not PrecompiledSchematron.is_supported():
+            precompiled_path = None
+        if precompiled_path and os.path.isfile(precompiled_path):
+            try:
+                validator_xslt_content = self._read_precompiled_schematron(precompiled_path)
+                if validator_xslt_content is not None:
+                    validator_xslt = fromstring(validator_xslt_content, self._xml_parser)   # nosec - parsed xml is tested against DOCTYPE elements, we don't use features that introduce other vulnerabilities
+                    return PrecompiledSchematron(validator_xslt, error_finder=Schematron.ASSERTS_AND_REPORTS)
+            except (OSError, LibException, etree.LxmlError):
+                # Corrupted or unreadable file - compile schematron from schema once again
+                pass
+
+        validator = Schematron(etree=self.schema_xml_root, error_finder=Schematron.ASSERTS_AND_REPORTS,
+                               store_xslt=precompiled_path is not None)
+        if precompiled_path:
+            validator_xslt_content = tostring(validator.validator_xslt)
+            try:
+                FileManager.save_binary_file(precompiled_path, validator_xslt_content)
+                # the digest is stored after the XSLT, so a corrupted or partially stored XSLT is not used
+                FileManager.save_text_file(precompiled_path + self.precompiledSchematronDigestExt,
+                                           hashlib.sha256(validator_xslt_content).hexdigest())
+            except LibException:
+                # Storing precompiled schematron is only an optimization, the build does not depend on it
+                pass
+        return validator
+
+    def _read_precompiled_schematron(self, precompiled_path: str) -> bytes:
+        """
+        Returns stored validating XSLT or None if it doesn't match its stored digest. The digest only detects a corrupted
+        or partially written file, anyone able to edit the XSLT can store its new digest as well.
+        """
+        with open_file(precompiled_path, 'rb') as f:
+            content = f.read()
+        with open_file(precompiled_path + self.precompiledSchematronDigestExt, 'r', encoding='ascii') as f:
+            digest = f.read().strip()
+        return content if hashlib.sha256(content).hexdigest() == digest else None
+
     def validate_xml_tree(self):
         """Validates xml based on xml scheme and / or schematron included to source."""
         if self.schema.xml_schema:
-            schema_validator = XMLSchema(self.schema_xml_root)
+            schema_validator = self._get_validator(self.ValidatorKind.XML_SCHEMA, self._compile_xml_schema)
             self.validate_with(schema_validator)
 
         if self.schema.schematron:
-            schematron_validator = Schematron(etree=self.schema_xml_root, error_finder=Schematron.ASSERTS_AND_REPORTS)
+            schematron_validator = self._get_validator(self.ValidatorKind.SCHEMATRON, self._compile_schematron)
             self.validate_with(schematron_validator)
 
     def validate_with(self, validator):
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+INTEL CONFIDENTIAL
+Copyright 2024 Intel Corporation.
+This software and the related documents are Intel copyrighted materials, and
+your use of them is governed by the express license under which they were
+provided to you (License).Unless the License provides otherwise, you may not
+use, modify, copy, publish, distribute, disclose or transmit this software or
+the related documents without Intel's prior written permission.
+
+This software and the related documents are provided as is, with no express or
+implied warranties, other than those that are expressly stated in the License.
+"""
+
+from typing import Dict, List, Optional
+
+from lxml.etree import Element  # nosec - only used for type hints
+
+
+class XmlNameIndex:
+    """
+    Index of xml elements by 'name' attribute and by tag, used to resolve override paths without running
+    an XPath query for each path part. Lookups of an element are built on first use and return the first matching
+    element in document order, the same as 'find'. Code which adds or removes elements calls 'invalidate' or
+    'remove_descendants'.
+    """
+    nameAttribute = 'name'
+
+    def __init__(self, root: Element):
+        self.root = root
+        self._children_by_name: Dict[Element, Dict[str, Element]] = {}
+        self._children_by_tag: Dict[Element, Dict[str, Element]] = {}
+        self._descendants_by_name: Dict[Element, Dict[str, Element]] = {}
+        self._descendants_by_tag: Optional[Dict[str, List[Element]]] = None
+
+    def invalidate(self):
+        self._children_by_name.clear()
+        self._children_by_tag.clear()
+        self._descendants_by_name.clear()
+        self._descendants_by_tag = None
+
+    def remove_descendants(self, element: Element):
+        """Updates the index before all descendants of the element are removed from the tree."""
+        if self._descendants_by_tag is not None:
+            for descendant in element.iterdescendants():
+                if isinstance(descendant.tag, str):
+                    self._descendants_by_tag[descendant.tag].remove(descendant)
+        self._children_by_name.clear()
+        self._children_by_tag.clear()
+        self._descendants_by_name.clear()
+
+    def _index_children(self, element: Element):
+        by_name = {}
+        by_tag = {}
+        for child in element:
+            if not isinstance(child.tag, str):  # comments and processing instructions
+                continue
+            by_tag.setdefault(child.tag, child)
+            name = child.get(self.nameAttribute)
+            if name is not None:
+                by_name.setdefault(name, child)
+        self._children_by_name[element] = by_name
+        self._children_by_tag[element] = by_tag
+
+    def find_child(self, element: Element, name: str) -> Optional[Element]:
+        """Same as element.find("*[@name='<name>']")."""
+        if element not in self._children_by_name:
+            self._index_children(element)
+        return self._children_by_name[element].get(name)
+
+    def find_child_by_tag(self, element: Element, tag: str) -> Optional[Element]:
+        """Same as element.find('<tag>')."""
+        if element not in self._children_by_tag:
+            self._index_children(element)
+        return self._children_by_tag[element].get(tag)
+
+    def find_descendant(self, element: Element, name: str) -> Optional[Element]:
+        """Same as element.find(".//*[@name='<name>']")."""
+        if element not in self._descendants_by_name:
+            by_name = {}
+            for descendant in element.iterdescendants():
+                name_attribute = descendant.get(self.nameAttribute) if isinstance(descendant.tag, str) else None
+                if name_attribute is not None:
+                    by_name.setdefault(name_attribute, descendant)
+            self._descendants_by_name[element] = by_name
+        return self._descendants_by_name[element].get(name)
+
+    def find_all_by_tag(self, tag: str) -> List[Element]:
+        """Same as root.findall('.//<tag>')."""
+        if self._descendants_by_tag is None:
+            self._descendants_by_tag = {}
+            for descendant in self.root.iterdescendants():
+                if isinstance(descendant.tag, str):
+                    self._descendants_by_tag.setdefault(descendant.tag, []).append(descendant)
+        return self._descendants_by_tag.get(tag, [])
@@ -13,6 +13,7 @@ the related documents without Intel's prior written permission.
 This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
+import os
 from enum import Enum
 from typing import List
 from re import search
@@ -23,6 +24,7 @@ from .. import utils
 from ..PropertyState import ComponentPreChangeState
 from ..structures import RsaSigningKey, AsymmetricKeyType, SupportedSHAs, EcSigningKey
 from ..LibConfig import LibConfig
+from ..FileOpener import notify_file_access
 
 
 class AsymmetricKeyComponent(FileComponent):
@@ -74,6 +76,9 @@ class AsymmetricKeyComponent(FileComponent):
 
     hash_type = None
 
+    # keys parsed from files, by path, modification time, size, hash type and legacy mode
+    _parsed_keys = {}
+
     def __init__(self, xml_node, **kwargs):
         super().__init__(xml_node, **kwargs)
         self._key = None
@@ -120,7 +125,11 @@ class AsymmetricKeyComponent(FileComponent):
         super()._validate_file()
 
         try:
-            self._key = utils.process_key_file(self.value, self.hash_type, True)
+            memory_data = self.get_memory_data()
+            if memory_data is not None:
+                self._key = utils.process_key_data(memory_data, self.hash_type, True)
+            else:
+                self._key = self.load_key(self.value, self.hash_type)
         except LibException as e:
             raise ComponentException(f"Could not parse key: {self.value}\n" + str(e), self.display_name) from None
 
@@ -129,6 +138,39 @@ class AsymmetricKeyComponent(FileComponent):
             utils.hashed_key_printer(self._key, None)
             print("")
 
+    @classmethod
+    def load_key(cls, path: str, hash_type: SupportedSHAs.ShaType, is_legacy=True):
+        """Returns parsed key of given key file, the file is parsed again only if it was modified."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return utils.process_key_file(path, hash_type, is_legacy)  # reports missing or unreadable file
+        path = os.path.abspath(path)
+        cache_key = (path, stat.st_mtime_ns, stat.st_size, hash_type, is_legacy)
+        key = cls._parsed_keys.get(cache_key)
+        if key is not None:
+            notify_file_access(path, 'rb')  # cached key file is still an input of the build
+        else:
+            key = utils.process_key_file(path, hash_type, is_legacy)
+            # previous versions of modified key file won't be used anymore
+            for outdated in [k for k in list(cls._parsed_keys) if k[0] == path and k[3:] == cache_key[3:]]:
+                cls._parsed_keys.pop(outdated, None)
+            cls._parsed_keys[cache_key] = key
+        return key
+
+    @classmethod
+    def clear_key_cache(cls, path: str = None):
+        """
+        Drops parsed keys of given key file or all parsed keys if path is not given, e.g. when a long-running
+        process (GUI, build server) must not keep private keys in memory or key file was replaced in place.
+        """
+        if path is None:
+            cls._parsed_keys.clear()
+            return
+        path = os.path.abspath(path)
+        for cached in [k for k in list(cls._parsed_keys) if k[0] == path]:
+            cls._parsed_keys.pop(cached, None)
+
     def _parse_additional_attributes(self, xml_node):
         super()._parse_additional_attributes(xml_node)
         self._parse_hash_type(xml_node)
@@ -49,6 +49,7 @@ class BitFieldComponent(NumberComponent):
 
     children_allowed = True
     set_bits = None
+    rebuildable = True
 
     class Bit(NumberComponent):
         bit_low = None
@@ -69,6 +70,10 @@ class BitFieldComponent(NumberComponent):
             bit_node = fromstring(bit_node_str)  # nosec
             return BitFieldComponent.Bit(bit_node)
 
+        def get_build_unit(self):
+            # bits are built by the bit field
+            return self.parent
+
         def set_value_from_parent_value(self, parent_value):
             value = parent_value & self.get_mask()
             self.value = value >> self.bit_low
@@ -325,6 +330,14 @@ class BitFieldComponent(NumberComponent):
             return self.bit_fields_by_name[child_name]
         raise ComponentException(f"'{self.name}' does not have '{child_name}' child.")
 
+    def is_rebuildable(self) -> bool:
+        return self.rebuildable
+
+    def reset_build(self):
+        super().reset_build()
+        for bit in self.bit_fields:
+            bit.reset_build()
+
     def _build(self, buffer):
         super()._build(buffer)
         value = self.value if self.value is not None else 0
@@ -36,6 +36,7 @@ class ByteArrayComponent(IComponent):
     </byte_array>
     ```
     """
+    rebuildable = True
 
     def __init__(self, xml_node, **kwargs):
         super().__init__(xml_node, **kwargs)
@@ -13,39 +13,14 @@ the related documents without Intel's prior written permission.
 This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
+from importlib import import_module
+from functools import lru_cache
 from lxml.etree import _Comment  # nosec
 
-from .IterableComponent import IterableComponent, IterableEntryComponent
-from .GroupComponent import GroupComponent
-from .BitRegisterComponent import BitRegisterComponent
-from .IComponent import IComponent
-from .NumberComponent import NumberComponent
-from .StringComponent import StringComponent
-from .VersionComponent import VersionComponent
-from .ByteArrayComponent import ByteArrayComponent
 from .CustomComponent import CustomComponent
-from .ElfFileComponent import ElfFileComponent
-from .AsymmetricKeyComponent import AsymmetricKeyComponent
-from .FileComponent import FileComponent
-from .DateComponent import DateComponent
-from .BitFieldComponent import BitFieldComponent
-from .AesKeyComponent import AesKeyComponent
-from .function.HashFunction import HashFunction
-from .function.ModulusFunction import ModulusFunction
-from .function.SignFunction import SignFunction
-from .function.CrcFunction import CrcFunction
-from .function.ChecksumFunction import ChecksumFunction
-from .function.UpdateManifestFunction import UpdateManifestFunction
-from .function.VerifyFunction import VerifyFunction
-from .function.CompressedSizeFunction import CompressedSizeFunction
-from .function.ExportManifestsFunction import ExportManifestsFunction
-from .function.ImportManifestsFunction import ImportManifestsFunction
-from .function.ValidateManifestsFunction import ValidateManifestsFunction
-from .TableComponent import TableComponent
-from .RootComponent import RootComponent
-from .DecompositionComponent import DecompositionComponent
-from .function.UpdateValueFunction import UpdateValueFunction
-from .TableEntryComponent import TableEntryComponent
+from .IterableComponent import IterableComponent
+from ..BuildContext import BuildContext
+from ..DecompositionStream import DecompositionStream
 from ..LibConfig import LibConfig
 from ..structures import LibException
 
@@ -55,62 +30,80 @@ class ComponentFactory:
     custom_components = {}
 
     def __init__(self):
-        IComponent.componentFactory = self
+        BuildContext.current().component_factory = self
         self.unknown_types = []
-        self._class_map = {'number': NumberComponent,
-                           'string': StringComponent,
-                           'version': VersionComponent,
-                           'byte_array': ByteArrayComponent,
-                           'custom_component': CustomComponent,
-                           'image': ByteArrayComponent,
-                           'configuration': ByteArrayComponent,
-                           'layout': ByteArrayComponent,
-                           'outputs': ByteArrayComponent,
-                           'aliases': ByteArrayComponent,
-                           'default': IterableEntryComponent,
-                           'entry': IterableEntryComponent,
-                           'elf_file': ElfFileComponent,
-                           'rsa_key': AsymmetricKeyComponent,
-                           'asymmetric_key': AsymmetricKeyComponent,
-                           'aes_key': AesKeyComponent,
-                           'file': FileComponent,
-                           'date': DateComponent,
-                           'bit_field': BitFieldComponent,
-                           'bit_register': BitRegisterComponent,
-                           'table': TableComponent,
-                           'table_entry_pointer': TableEntryComponent,
-                           IterableComponent.Tags.ITERABLE: IterableComponent,
-                           LibConfig.rootTag: RootComponent,
-                           'decomposition_plugin': RootComponent,
-                           'function_sign': SignFunction,
-                           'function_hash': HashFunction,
-                           'function_crc': CrcFunction,
-                           'function_checksum': ChecksumFunction,
-                           'function_verify': VerifyFunction,
-                           'function_compressed_size': CompressedSizeFunction,
-                           'function_update_value': UpdateValueFunction,
-                           'function_export_manifests': ExportManifestsFunction,
-                           'function_import_manifests': ImportManifestsFunction,
-                           'function_validate_manifests': ValidateManifestsFunction,
-                           'function_update_manifest': UpdateManifestFunction,
-                           'function_modulus': ModulusFunction,
-                           'decomposition': DecompositionComponent,
-                           'group': GroupComponent}
+        # classes are given by their paths in this package and imported when the type is created first, so modules of
+        # types not used by the configuration (and their dependencies, e.g. cryptography or crcmod) are not imported
+        self._class_map = {'number': 'NumberComponent.NumberComponent',
+                           'string': 'StringComponent.StringComponent',
+                           'version': 'VersionComponent.VersionComponent',
+                           'byte_array': 'ByteArrayComponent.ByteArrayComponent',
+                           'custom_component': 'CustomComponent.CustomComponent',
+                           'image': 'ByteArrayComponent.ByteArrayComponent',
+                           'configuration': 'ByteArrayComponent.ByteArrayComponent',
+                           'layout': 'ByteArrayComponent.ByteArrayComponent',
+                           'outputs': 'ByteArrayComponent.ByteArrayComponent',
+                           'aliases': 'ByteArrayComponent.ByteArrayComponent',
+                           'default': 'IterableComponent.IterableEntryComponent',
+                           'entry': 'IterableComponent.IterableEntryComponent',
+                           'elf_file': 'ElfFileComponent.ElfFileComponent',
+                           'rsa_key': 'AsymmetricKeyComponent.AsymmetricKeyComponent',
+                           'asymmetric_key': 'AsymmetricKeyComponent.AsymmetricKeyComponent',
+                           'aes_key': 'AesKeyComponent.AesKeyComponent',
+                           'file': 'FileComponent.FileComponent',
+                           'date': 'DateComponent.DateComponent',
+                           'bit_field': 'BitFieldComponent.BitFieldComponent',
+                           'bit_register': 'BitRegisterComponent.BitRegisterComponent',
+                           'table': 'TableComponent.TableComponent',
+                           'table_entry_pointer': 'TableEntryComponent.TableEntryComponent',
+                           IterableComponent.Tags.ITERABLE: 'IterableComponent.IterableComponent',
+                           LibConfig.rootTag: 'RootComponent.RootComponent',
+                           'decomposition_plugin': 'RootComponent.RootComponent',
+                           'function_sign': 'function.SignFunction.SignFunction',
+                           'function_hash': 'function.HashFunction.HashFunction',
+                           'function_crc': 'function.CrcFunction.CrcFunction',
+                           'function_checksum': 'function.ChecksumFunction.ChecksumFunction',
+                           'function_verify': 'function.VerifyFunction.VerifyFunction',
+                           'function_compressed_size': 'function.CompressedSizeFunction.CompressedSizeFunction',
+                           'function_update_value': 'function.UpdateValueFunction.UpdateValueFunction',
+                           'function_export_manifests': 'function.ExportManifestsFunction.ExportManifestsFunction',
+                           'function_import_manifests': 'function.ImportManifestsFunction.ImportManifestsFunction',
+                           'function_validate_manifests':
+                               'function.ValidateManifestsFunction.ValidateManifestsFunction',
+                           'function_update_manifest': 'function.UpdateManifestFunction.UpdateManifestFunction',
+                           'function_modulus': 'function.ModulusFunction.ModulusFunction',
+                           'decomposition': 'DecompositionComponent.DecompositionComponent',
+                           'group': 'GroupComponent.GroupComponent'}
 
     def create_component(self, xml_node, **kwargs):
         if isinstance(xml_node, _Comment):
             return None
         type_name = self._get_type_name(xml_node)
-        component = self._class_map[type_name](xml_node, **kwargs)
+        component = self._get_class(type_name)(xml_node, **kwargs)
         if isinstance(component, CustomComponent):
             component = self.custom_components[component.custom_type_name](xml_node, **kwargs)
+        stream = DecompositionStream.active
+        if stream is not None and component.buffer is not None:
+            stream.emit(component)
         return component
 
     def create_root_component(self, xml_node, skip_calculates: bool = False):
         type_name = self._get_type_name(xml_node)
-        component = self._class_map[type_name](xml_node, is_root=True, skip_calculates=skip_calculates)
+        component = self._get_class(type_name)(xml_node, is_root=True, skip_calculates=skip_calculates)
         return component
 
+    def _get_class(self, type_name: str):
+        component_class = self._class_map[type_name]
+        if isinstance(component_class, str):
+            component_class = self._class_map[type_name] = self._import_class(component_class)
+        return component_class
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _import_class(class_path: str):
+        module_name, class_name = class_path.rsplit('.', 1)
+        return getattr(import_module(f'.{module_name}', __package__), class_name)
+
     def _get_type_name(self, xml_node):
         type_name = str(xml_node.tag).lower()
 
@@ -109,7 +109,11 @@ class DecompositionComponent(IComponent):
                 log().debug(f"{ex}")
                 raise WrongDecompositionFileException(self.file_name, path_split, self.name) from ex
             finally:
-                buffer.close()
+                try:
+                    buffer.close()
+                except BufferError:
+                    # values of components are views of the mapped file, it's unmapped when they are released
+                    pass
 
     def _validate_descendants(self):
         for descendant in self.descendants:
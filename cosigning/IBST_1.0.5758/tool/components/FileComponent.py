@@ -15,8 +15,11 @@ implied warranties, other than those that are expressly stated in the License.
 """
 import os
 from enum import Enum
-from typing import List
+from mmap import mmap, ACCESS_READ
+from typing import Dict, List, Optional
 
+from ..BuildContext import BuildContext
+from ..BuildProfiler import BuildProfiler
 from ..FileManager import FileManager
 from ..FileOpener import open_file
 from .ByteArrayComponent import ByteArrayComponent
@@ -50,6 +53,9 @@ class FileComponent(ByteArrayComponent):
     ----------------    -----------
     data                Acquires file data, can be used with a range e.g. data[4:16], data[0xA:0xC2E], data[128:]
     path                Gets file path
+
+    Files of at least 'mapThreshold' bytes are mapped to memory instead of being read. Their data is a read-only
+    memoryview of the mapping, so the file content is not copied when it is sliced, hashed or written to the output.
     """
 
     class Tags(ByteArrayComponent.Tags):
@@ -75,7 +81,11 @@ class FileComponent(ByteArrayComponent):
     required_formula = None
     _data = None
     expected_size = None
+    rebuildable = False
     output_file = False
+    mapThreshold = 1024 * 1024
+    # contents of files given in memory (e.g. by BuildApi) keyed by normalized path, used instead of files on disk
+    memoryFiles: Dict[str, bytes] = BuildContext.Attribute('memory_files')
 
     def __init__(self, xml_node, **kwargs):
         super().__init__(xml_node, **kwargs)
@@ -136,15 +146,34 @@ class FileComponent(ByteArrayComponent):
         self._validate_file()
         if not self.output_file:
             self.clear()
-            with open_file(self.value, "rb") as f:
-                self._data = f.read()
-                if not self.size or self.value_formula:
-                    self.size = len(self._data)
-                if self.size_formula:
-                    self.size = self.calculate_value(self.size_formula)
-                    if len(self._data) != self.size:
-                        raise ComponentException(f"Invalid size of external_data, should be {self.size} but is "
-                                                 f"{len(self._data)}", self.name)
+            self._data = self._read_data()
+            if not self.size or self.value_formula:
+                self.size = len(self._data)
+            if self.size_formula:
+                self.size = self.calculate_value(self.size_formula)
+                if len(self._data) != self.size:
+                    raise ComponentException(f"Invalid size of external_data, should be {self.size} but is "
+                                             f"{len(self._data)}", self.name)
+
+    def _read_data(self):
+        memory_data = self.get_memory_data()
+        if memory_data is not None:
+            return memory_data
+        with open_file(self.value, "rb") as f:
+            with BuildProfiler.section(BuildProfiler.Phase.FILE_IO, self.value):
+                return self._read_file(f)
+
+    def _read_file(self, file):
+        if os.fstat(file.fileno()).st_size < self.mapThreshold:
+            return file.read()
+        # mapping stays valid after the file is closed and is released together with the last view of it
+        return memoryview(mmap(file.fileno(), 0, access=ACCESS_READ))
+
+    def get_memory_data(self) -> Optional[bytes]:
+        """Returns content of the file if it was given in memory, None if the file is read from disk."""
+        if not self.memoryFiles or not self.value or self.output_file:
+            return None
+        return self.memoryFiles.get(os.path.normpath(self.value))
 
     def set_data(self, data: bytes):
         self._data = data
@@ -269,11 +298,13 @@ class FileComponent(ByteArrayComponent):
 
     def validate_file_size(self):
         if self.expected_size and self.value:
-
-            if not os.path.exists(self.value):
+            memory_data = self.get_memory_data()
+            if memory_data is not None:
+                real_file_size = len(memory_data)
+            elif not os.path.exists(self.value):
                 raise ComponentException(f"File '{self.value}' does not exist")
-
-            real_file_size = os.path.getsize(self.value)
+            else:
+                real_file_size = os.path.getsize(self.value)
             if self.expected_size != real_file_size:
                 file_name = os.path.basename(self.value)
                 raise ComponentException(f"File {file_name} size for {self.name} is not equal to expected size. "
@@ -288,6 +319,9 @@ class FileComponent(ByteArrayComponent):
         self._validate_file()
 
     def _validate_file(self):
+        if self.get_memory_data() is not None:
+            self.validate_file_size()
+            return
         try:
             FileManager.validate_path(self.value, for_saving=self.output_file)
         except FileException as ex:
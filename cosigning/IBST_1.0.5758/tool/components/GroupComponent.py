@@ -27,6 +27,7 @@ from ..PropertyState import PropertyState, ComponentPreChangeState
 
 class GroupComponent(ByteArrayComponent):
     default_enabled_formula = ""
+    rebuildable = False
 
     ui_params_class = GroupUiParams
 
@@ -18,6 +18,7 @@ import os
 from collections import namedtuple
 from mmap import ACCESS_READ
 from copy import copy
+from functools import lru_cache
 
 from typing import List, Optional, Iterable, Tuple, Dict, Generator
 from enum import Enum
@@ -25,16 +26,20 @@ from lxml.etree import SubElement  # nosec - only used to create xml objects (no
 
 from .IComponentParams import ComponentParams
 from ..AttributeGroup import DecompositionAttributes, UiParams
+from ..BuildContext import BuildContext
+from ..BuildProfiler import BuildProfiler
 from ..CustomError import CustomError, Severity
 from ..ExpressionEngine import ExpressionEngine
 from ..FileOpener import open_file
 from ..FileManager import FileManager
+from ..FormulaCompiler import FormulaCompiler
+from ..IncrementalBuilder import IncrementalBuilder
 from ..LibException import ComponentException, LibException, DependencyException, ValidateException, JSONException, \
     ValueException
 from ..PropertyState import PropertyState, ComponentPreChangeState
 from ..structures import AesEncryption, Buffer
 from ..Converter import Converter
-from ..utils import align_value, MapData
+from ..utils import align_value, is_immutable_data, MapData
 from ..OfflineEncryptionSettings import OfflineEncryptionSettings
 from ..LibConfig import LibConfig
 from ..dependencies.DependencyFactory import DependencyFactory
@@ -88,7 +93,9 @@ class IComponent:
 
             return cls(name, arguments)
 
-    componentFactory = None
+    # factory and root of the configuration parsed by the current build, components keep the root they were created with
+    componentFactory = BuildContext.Attribute('component_factory')
+    root_component = BuildContext.Attribute('root_component')
 
     class Tags:
         NAME = "name"
@@ -193,6 +200,14 @@ class IComponent:
     _exists = True
     _non_exist_help_text = ""
     is_built = False
+    # the component can be built again on its own when its inputs have changed (see IncrementalBuilder)
+    rebuildable = False
+    # the build reads or writes the buffer without recording it, so the binary can only be rebuilt as a whole
+    untracked_buffer_access = False
+    # values read from a buffer are kept as its views (see Buffer.read_view), components converting them don't need them
+    buffer_views = True
+    # properties fixed by the layout, they don't change when the component is built
+    layout_properties = ('offset', 'size', 'enabled')
     error_message = None
     _src_exists_setting = None
     _xml_save = None
@@ -244,7 +259,7 @@ class IComponent:
         if is_decomposition_child and self.size is None and self.value is None:
             self.size = self.buffer.tell() - self.offset
             self.buffer.seek(-self.size, os.SEEK_CUR)
-            self.value = self.buffer.read(self.size)
+            self.value = self.read_buffer_value(self.buffer)
         self._parse_custom_actions(xml_node)
 
         self.validate()
@@ -319,6 +334,7 @@ class IComponent:
         self.dependency_formula = self._parse_attribute(xml_node, self.Tags.DEPENDENCY, False, None)
         self.duplicates_formula = self._parse_attribute(xml_node, self.Tags.DUPLICATES, False, None)
         self.validate_formula = self._parse_attribute(xml_node, self.Tags.VALIDATE_FORMULA, False, None)
+        self._register_unique_check()
         self.xml_save_formula = self._parse_attribute(xml_node, self.Tags.XML_SAVE, False, None)
         self.fill = self._parse_attribute(xml_node, self.Tags.FILL, False, None)
         self.removable = Converter.string_to_bool(self._parse_attribute(xml_node, self.Tags.REMOVABLE, False, "true"))
@@ -332,6 +348,11 @@ class IComponent:
         self.params = self.params_class(self._parse_attribute(xml_node, self.Tags.PARAMS, False), self.size,
                                         self.string_value_converter, component=self)
 
+    def _register_unique_check(self):
+        if self.validate_formula and ExpressionEngine.uniqueCheckTag in self.validate_formula and \
+                hasattr(self.root_component, 'add_unique_checked_component'):
+            self.root_component.add_unique_checked_component(self)
+
     def _parse_validate_attribute(self):
         if not self.validate_formula:
             return None
@@ -426,7 +447,7 @@ class IComponent:
             if self.Tags.SIZE in xml_node.attrib:
                 if self.buffer.max_size < self.offset + self.size:
                     raise ComponentException(f"Buffer size too small, failed to read at offset {self.offset}")
-                self.value = self.buffer.read(self.size)
+                self.value = self.read_buffer_value(self.buffer)
 
     def _parse_encryption_tag(self, xml_node):
         if self.Tags.ENCRYPTION_MODE in xml_node.attrib:
@@ -586,11 +607,29 @@ class IComponent:
         Set component value.
         :param value: New value.
         """
+        if isinstance(value, memoryview) and isinstance(value.obj, Buffer) and \
+                not value.obj.is_shared_with(value, self):
+            # view of the build buffer owned by another component would change when the buffer is written
+            value = value.tobytes()
         self._validate_iterable(value)
         self._validate_value_list(value)
         self.previous_value = self.value
         self.value = value
 
+    def read_buffer_value(self, buffer):
+        """Reads value of the component at current position of buffer, as a view of it if the component keeps views."""
+        if self.buffer_views:
+            return buffer.read_view(self.size, self)
+        return buffer.read(self.size)
+
+    def detach_buffer_view(self, view: memoryview):
+        """Replaces view of the buffer with a copy, it's called by the buffer before the view is overwritten."""
+        data = None
+        for attribute in ('value', 'previous_value', 'raw_data'):
+            if getattr(self, attribute) is view:
+                data = view.tobytes() if data is None else data
+                setattr(self, attribute, data)
+
     def restore_previous_value(self):
         if self.previous_value is not None:
             self.value = self.previous_value
@@ -732,6 +771,7 @@ class IComponent:
         return self.ComponentProperty(property_name)
 
     @staticmethod
+    @lru_cache(maxsize=FormulaCompiler.maxCacheSize)
     def parse_property_indexing(property_name):
         # Examples of expected strings: data[20:128], data[512:], data[0xE:0x1A], value[0xBB:]
         match = re.match("(.+)\\[((?:0x)?.+):((?:0x)?.*)\\]", property_name)
@@ -755,6 +795,9 @@ class IComponent:
             index_from = len(value) - index_from
             index_to = len(value) - index_to
 
+        if isinstance(value, memoryview) and not is_immutable_data(value):
+            # part of a view of the build buffer is not replaced by copy on write
+            return value[index_from:index_to].tobytes()
         return value[index_from:index_to]
 
     def get_bytes(self):
@@ -766,6 +809,9 @@ class IComponent:
             return self.value
         try:
             value = self._get_bytes()
+            if isinstance(value, memoryview) and self.byte_order != self.littleOrder and len(value) == self.size:
+                # read-only view of mapped file needs no alignment, so it is returned without copying
+                return value
             if self.byte_order == self.littleOrder:
                 value = bytearray(value)
                 value.reverse()
@@ -1004,7 +1050,8 @@ class IComponent:
         elif self.children is not None:
             for child in self.children:
                 try:
-                    child.build_layout(buffer, clear_build_settings)
+                    BuildProfiler.call(BuildProfiler.Phase.LAYOUT, child, child.build_layout, buffer,
+                                       clear_build_settings)
                 except ComponentException as ex:
                     self.trace_exception(ex)
         elif self.size is None:
@@ -1057,7 +1104,8 @@ class IComponent:
 
         if self.value_formula and self.value is None:
             try:
-                value = self.calculate_value(formula=self.value_formula, allow_calculate=True, build_process=True)
+                with IncrementalBuilder.section(IncrementalBuilder.Phase.VALUE):
+                    value = self.calculate_value(formula=self.value_formula, allow_calculate=True, build_process=True)
                 self.set_value(value)
             except (ComponentException, AttributeError):
                 # Use default value as a temporary value
@@ -1111,7 +1159,7 @@ class IComponent:
         else:
             for child in self.children:
                 try:
-                    child.build(buffer)
+                    BuildProfiler.call(BuildProfiler.Phase.BUILD, child, child.build, buffer)
                 except ComponentException as ex:
                     self.trace_exception(ex)
 
@@ -1119,7 +1167,7 @@ class IComponent:
 
             if self.offset is not None:
                 buffer.seek(self.offset)
-                self.set_value(buffer.read(self.size))
+                self.set_value(self.read_buffer_value(buffer))
 
         if self.is_offline_encryption():
             if self.is_offline_encryption_save():
@@ -1150,6 +1198,7 @@ class IComponent:
                                          f"{size_in_buffer}", self.name)
 
         self.is_built = True
+        IncrementalBuilder.record_built(self)
 
         if self.save_file_path is not None:
             path = self.calculate_value(self.save_file_path)
@@ -1157,6 +1206,22 @@ class IComponent:
                 FileManager.save_binary_file(path, self.get_bytes())
                 print(f"Content of {self.get_string_path()} saved to {path}\n")
 
+    def reset_build(self):
+        """Resets results of the build, so the component is built again with current inputs."""
+        self.is_built = False
+
+    def get_build_target(self) -> 'IComponent':
+        """Returns component whose content is written to the buffer when this component is built."""
+        return self
+
+    def get_build_unit(self) -> 'IComponent':
+        """Returns component which is built again when inputs of this component have changed."""
+        return self
+
+    def is_rebuildable(self) -> bool:
+        """Checks if the component can be built again on its own, containers are built together with children."""
+        return self.rebuildable and not self.children
+
     def _build(self, _):
         if self.value_formula:
             self.set_value(self.calculate_value(formula=self.value_formula, build_process=True))
@@ -1460,9 +1525,11 @@ class IComponent:
 
     def _update_decomp_dependency(self):
         with open_file(self.value, 'rb') as file:
-            with Buffer(file.fileno(), 0, access=ACCESS_READ) as buffer:
-                for dep in self.decomp_dependency:  # pylint: disable=not-an-iterable
-                    dep.update_from_buffer(buffer)
+            buffer = Buffer(file.fileno(), 0, access=ACCESS_READ)
+        # values of dependencies are views of the mapped file, it's unmapped when they are released
+        with memoryview(buffer) as view:
+            for dep in self.decomp_dependency:  # pylint: disable=not-an-iterable
+                dep.update_from_buffer(view)
 
     def initialize_defaults(self):
         if self.node_tag not in self.Tags.OPTION_TYPE_MAP:
@@ -1544,6 +1611,7 @@ class IComponent:
         copied.children_by_name = {}
         copied.expr_engine = ExpressionEngine(copied)
         self._copy_params_to(copied)
+        copied._register_unique_check()  # pylint: disable=protected-access
 
         if self.children is not None:
             for child in self.children:
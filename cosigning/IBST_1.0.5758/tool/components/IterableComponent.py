@@ -26,6 +26,7 @@ from .IComponentParams import ComponentParams
 from ..AttributeGroup import UiParams, IterableUiParams
 from ..Converter import Converter
 from ..dependencies.Dependency import Dependency
+from ..LibConfig import LibConfig
 from ..LibException import ComponentException, ComponentAttributeException, ValidateException
 from ..structures import Buffer
 
@@ -71,6 +72,9 @@ class IterableComponent(IComponent):
     # pylint: enable=line-too-long
 
     uniqueNamePattern = '(?:.(?!-))+$'
+    # buffer for data of entries grows up to LibConfig.maxBufferSize (or default size if it's not set)
+    initialBufferSize = 4096
+    defaultBufferSize = 100000
     user_comment = '''It is recommended that the user modifies the iterables using the Modular Flash Image Tool's
     Graphical User Interface to avoid misconfiguration.'''
 
@@ -170,7 +174,7 @@ class IterableComponent(IComponent):
                 self.descendants_by_unique_id[value] = child
 
     def _load_data(self):
-        buffer = Buffer(-1, 100000)
+        buffer = Buffer(-1, self.initialBufferSize, max_size=LibConfig.maxBufferSize or self.defaultBufferSize)
         for entry in self.children:
             entry.build_layout(buffer)
         buffer.flush()
@@ -317,8 +321,7 @@ class IterableComponent(IComponent):
             raise ComponentException(f"'{self.name}' has no children", self.name)
         if child_name in self.children_by_name:
             return self.children_by_name[child_name]
-        child_name_regex = re.search(rf'^{self.name}\[(\d+)\]$', child_name)
-        index = int(child_name_regex.group(1)) if child_name_regex else None
+        index = self._get_entry_index(child_name)
         if index is not None and self.max_size is not None and index >= self.max_size:
             raise ComponentException(
                 f'Trying to get configuration for non-existing index. Exceeded max_size: {index}', self.name)
@@ -331,6 +334,15 @@ class IterableComponent(IComponent):
         raise ComponentException(
             f"No '{child_name}' child. Choose one of: {', '.join(self.children_by_name.keys())}", self.name)
 
+    def _get_entry_index(self, child_name) -> Optional[int]:
+        """Returns index of '<name>[<index>]' entry name, or None for other names."""
+        prefix = f'{self.name}['
+        if child_name.startswith(prefix) and child_name.endswith(']'):
+            index = child_name[len(prefix):-1]
+            if index.isdecimal():
+                return int(index)
+        return None
+
     def _update_entry_from_starting_entries(self, entry, entry_name):
         starting_entry = self.starting_entries[entry_name]
         for c in entry.children:
@@ -18,7 +18,8 @@ from .IComponent import IComponent
 from ..ColorPrint import log
 from ..LibException import ValueException, ComponentException, ValidateException
 from ..Converter import Converter
-from ..utils import to_hex, parse_json_str, get_item_from_structure, XmlAttrType, XmlAttr, get_min_max_values
+from ..utils import to_hex, parse_json_str, get_item_from_structure, XmlAttrType, XmlAttr, get_min_max_values, \
+    BYTES_LIKE_TYPES
 from .IComponentParams import ComponentParams, DisplayMode
 
 
@@ -31,6 +32,10 @@ class NumberComponent(IComponent):
         DISPLAY_MODE = "display_mode"
         SIGNED = "signed"
 
+    rebuildable = True
+    # values are converted to int, a decomposed value is kept as bytes
+    buffer_views = False
+
     def __init__(self, xml_node, **kwargs):
         super().__init__(xml_node, **kwargs)
         self.byte_order = self.littleOrder
@@ -129,7 +134,7 @@ class NumberComponent(IComponent):
 
     def set_value(self, value):  # val: "str/int/bytearray/byte"
         int_value = value
-        if isinstance(value, (bytes, bytearray)):
+        if isinstance(value, BYTES_LIKE_TYPES):
             int_value = int.from_bytes(value, self.byte_order)
         if isinstance(value, str):
             int_value = Converter.string_to_int(value)
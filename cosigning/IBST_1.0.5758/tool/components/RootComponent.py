@@ -13,7 +13,10 @@ the related documents without Intel's prior written permission.
 This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
+from typing import Dict, List
+
 from .ByteArrayComponent import ByteArrayComponent
+from ..BuildContext import BuildContext
 from ..LibException import ComponentException
 from .IComponent import IComponent
 from ..LibConfig import LibConfig
@@ -22,9 +25,38 @@ from ..LibConfig import LibConfig
 class RootComponent(ByteArrayComponent):
 
     def __init__(self, xml_node, **kwargs):
-        IComponent.root_component = self
+        BuildContext.current().root_component = self
+        # components which check uniqueness of their value ('unique[...]' in validation formula), registered when
+        # parsed, so the check does not walk all descendants of the root
+        self._unique_checked_components = []
+        # registered components grouped by checked variable, e.g. 'unique[address]'
+        self._unique_check_groups: Dict[str, List[IComponent]] = {}
         super().__init__(xml_node, **kwargs)
 
+    def add_unique_checked_component(self, component: IComponent):
+        self._unique_checked_components.append(component)
+        for variable, group in self._unique_check_groups.items():
+            if variable in component.validate_formula:
+                group.append(component)
+
+    def get_unique_checked_components(self, variable: str) -> List[IComponent]:
+        """Returns registered components checking given variable which are currently descendants of the root."""
+        group = self._unique_check_groups.get(variable)
+        if group is None:
+            group = [component for component in self._unique_checked_components
+                     if variable in component.validate_formula]
+            self._unique_check_groups[variable] = group
+        return [component for component in group if self._is_descendant(component)]
+
+    def _is_descendant(self, component: IComponent) -> bool:
+        while component.parent is not None:
+            parent = component.parent
+            if not (parent.children_by_name and parent.children_by_name.get(component.name) is component) and \
+                    not any(child is component for child in parent.children or ()):
+                return False
+            component = parent
+        return component is self
+
     def _parse_children(self, xml_node, **kwargs):
         # Only <settings> node is parsed from xml to prevent parsing <decomposition> node from before
         # overriding <settings> values
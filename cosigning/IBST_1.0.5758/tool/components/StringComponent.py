@@ -16,6 +16,7 @@ implied warranties, other than those that are expressly stated in the License.
 
 from .IComponent import IComponent
 from ..LibException import ComponentException, ValueException
+from ..utils import BYTES_LIKE_TYPES
 
 
 class StringComponent(IComponent):
@@ -23,6 +24,9 @@ class StringComponent(IComponent):
 
     _max_size = None
     DEFAULT_MAX_SIZE = 32767
+    rebuildable = True
+    # values are decoded, a decomposed value is kept as bytes
+    buffer_views = False
 
     def __init__(self, xml_node, **kwargs):
         self.align_byte = self.AlignByte.Byte00
@@ -82,9 +86,9 @@ class StringComponent(IComponent):
         return not self.value
 
     def set_value(self, value):
-        if isinstance(value, (bytes, bytearray)):
+        if isinstance(value, BYTES_LIKE_TYPES):
             try:
-                string_value = value.decode("ascii")
+                string_value = bytes(value).decode("ascii")
             except UnicodeDecodeError as e:
                 raise ComponentException(f"Failed to decode value for '{self.name}'", self.name) from e
             super().set_value(string_value.strip('\0'))
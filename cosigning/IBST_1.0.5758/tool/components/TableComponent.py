@@ -13,10 +13,9 @@ the related documents without Intel's prior written permission.
 This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
-from cffi.backend_ctypes import xrange
 from .IComponent import IComponent
 from ..LibException import ComponentException
-from ..utils import MapData
+from ..utils import MapData, BYTES_LIKE_TYPES
 
 
 class TableComponent(IComponent):
@@ -84,7 +83,7 @@ class TableComponent(IComponent):
 
     def get_count(self):
         count = self.calculate_value(self.count_formula, allow_calculate=True)
-        if isinstance(count, (bytes, bytearray)):
+        if isinstance(count, BYTES_LIKE_TYPES):
             return int.from_bytes(count, "little")
         return count
 
@@ -96,7 +95,7 @@ class TableComponent(IComponent):
         self.indices = [(index, None) for index in indices]
 
     def sort_indices(self, xml_node):
-        for i in xrange(0, self.get_count()):
+        for i in range(0, self.get_count()):
             sort_formula = xml_node.attrib[self.Tags.SORT]
             if "{index}" in sort_formula:
                 sort_formula = sort_formula.replace("{index}", str(i))
@@ -123,7 +122,7 @@ class TableComponent(IComponent):
                     for indices in self.indices:
                         self.componentFactory.create_component(child_node, index=indices[0], **kwargs)
                 else:
-                    for i in xrange(self.get_count()):
+                    for i in range(self.get_count()):
                         self.componentFactory.create_component(child_node, index=i, **kwargs)
 
         except ComponentException as ex:
@@ -43,6 +43,7 @@ class ChecksumFunction(IFunction):
         XOR = 'xor'
 
     operation = Operation.SUM
+    rebuildable = True
 
     def _parse_children(self, xml_node, **kwargs):
         super()._parse_children(xml_node, **kwargs)
@@ -62,12 +63,11 @@ class ChecksumFunction(IFunction):
 
     def _build(self, buffer):
         super()._build(buffer)
-        data = self.get_input_bytes()
-        self.set_value(struct.pack("<i", self.calculate_checksum(data))[0:self.size])
+        self.set_value(struct.pack("<i", self.calculate_checksum(self.iter_input_bytes(buffer)))[0:self.size])
 
-    def calculate_checksum(self, data):
+    def calculate_checksum(self, segments):
         if self.operation == self.Operation.SUM:
-            return -sum(data)
+            return -sum(sum(segment) for segment in segments)
         if self.operation == self.Operation.XOR:
-            return reduce(operator.xor, data)
+            return reduce(operator.xor, (reduce(operator.xor, segment, 0) for segment in segments), 0)
         raise ComponentException(f"Undefined checksum operation '{self.operation}' in {self.path}.")
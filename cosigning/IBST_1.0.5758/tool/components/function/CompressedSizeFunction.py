@@ -16,7 +16,6 @@ implied warranties, other than those that are expressly stated in the License.
 
 import string
 
-from cffi.backend_ctypes import xrange
 from .IFunction import IFunction
 from ...LibException import ComponentException, LibException
 
@@ -32,6 +31,7 @@ class CompressedSizeFunction(IFunction):
     startNode = None
     moduleNode = None
     countNode = None
+    untracked_buffer_access = True
 
     def _parse_children(self, xml_node, **kwargs):
         super()._parse_children(xml_node, **kwargs)
@@ -52,7 +52,7 @@ class CompressedSizeFunction(IFunction):
         module_meta = module_name + ".met"
         buffer.seek(module_name_offset)
         try:
-            for _ in xrange(count):
+            for _ in range(count):
                 # read module name from entry
                 mod_name = buffer.read(12).decode("ascii")
                 mod_name = mod_name.strip('\0')
@@ -17,6 +17,7 @@ implied warranties, other than those that are expressly stated in the License.
 from collections import namedtuple
 import crcmod
 from .IFunction import IFunction
+from ...DigestScheduler import DigestScheduler
 from ...LibException import ComponentException
 
 
@@ -43,6 +44,7 @@ class CrcFunction(IFunction):
             'crc16': CrcDefinition(xorOut=0, initCrc=0xffff, poly=0x11021, rev=False),  # CRC16-CCITT
             'crc32': CrcDefinition(xorOut=0xffffffff, initCrc=0, poly=0x104C11DB7, rev=True),  # CRC32
         }
+    rebuildable = True
 
     @staticmethod
     def get_crc_class(crc_name):
@@ -63,6 +65,9 @@ class CrcFunction(IFunction):
             raise ComponentException("Problem with crc calculation occurred", self.name) from e
         self.size = self.crc_class.digest_size
 
+    def new_input_digest(self):
+        return self.crc_class.new()
+
     def _build_layout(self):
         if self.crc_class.digest_size > self.size:
             raise ComponentException(f"Given size ({self.size} bytes) is not enough for {self.crc_type}", self.name)
@@ -70,8 +75,12 @@ class CrcFunction(IFunction):
 
     def _build(self, buffer):
         super()._build(buffer)
-        # pylint: disable-next=attribute-defined-outside-init
-        self.crc_class = self.crc_class.new()  # refresh initial value
-        data = self.get_input_bytes(buffer)
-        self.crc_class.update(data)
+        scheduled_crc = DigestScheduler.get_result(self)
+        if scheduled_crc is not None:
+            # pylint: disable-next=attribute-defined-outside-init
+            self.crc_class = scheduled_crc
+        else:
+            # pylint: disable-next=attribute-defined-outside-init
+            self.crc_class = self.crc_class.new()  # refresh initial value
+            self.update_with_input_bytes(self.crc_class, buffer)
         self.set_value(self.crc_class.crcValue.to_bytes(self.size, self.littleOrder))
@@ -14,11 +14,14 @@ This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
 import os
+import hashlib
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
 
+from ...BuildProfiler import BuildProfiler
 from ...ColorPrint import log
+from ...DigestScheduler import DigestScheduler
 from ...FileManager import FileManager
 from ...structures import SupportedSHAs
 from .IFunction import IFunction
@@ -54,7 +57,7 @@ class HashFunction(IFunction):
     </function_hash>
     ```
 
-    Note: it's possible to add more than one 'data' node to any function input, then the data will be concatenated before performing calculations:
+    Note: it's possible to add more than one 'data' node to any function input, then the data will be concatenated before performing calculations (inputs are hashed one after another, so the concatenation is never stored in memory):
 
     ```xml
     <input>
@@ -80,6 +83,7 @@ class HashFunction(IFunction):
     reverse_formula = None
     reverse = True
     sha = None
+    rebuildable = True
 
     @IFunction.size.getter
     def size(self):  # pylint: disable=invalid-overridden-method
@@ -128,14 +132,27 @@ class HashFunction(IFunction):
     def get_sha_size(self):
         return int(self.sha_type.value) // 8
 
+    def reset_build(self):
+        super().reset_build()
+        self.sha = None
+
     def get_sha(self, buffer=None):
         if self.sha is None:
-            data = bytes(self.get_input_bytes(buffer))
-            digest = hashes.Hash(SupportedSHAs.get_sha_class(self.sha_type, self.is_legacy), backend=default_backend())
-            digest.update(data)
-            self.sha = digest.finalize()
+            with BuildProfiler.section(BuildProfiler.Phase.HASH, self.get_string_path()):
+                scheduled_digest = DigestScheduler.get_result(self)
+                if scheduled_digest is not None:
+                    self.sha = scheduled_digest.digest()
+                else:
+                    digest = hashes.Hash(SupportedSHAs.get_sha_class(self.sha_type, self.is_legacy),
+                                         backend=default_backend())
+                    self.update_with_input_bytes(digest, buffer)
+                    self.sha = digest.finalize()
         return self.sha
 
+    def new_input_digest(self):
+        # hashlib releases the GIL while hashing, so digests scheduled in threads are calculated in parallel
+        return hashlib.new(SupportedSHAs.get_sha_class(self.sha_type, self.is_legacy).name)
+
     def get_default_value(self):
         return b'\0' * (self.get_sha_size() if self.size is None else self.size)
 
@@ -14,9 +14,13 @@ This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
 
+from contextlib import closing
+
 from ..ByteArrayComponent import ByteArrayComponent
+from ...IncrementalBuilder import IncrementalBuilder
 from ...LibException import ComponentException, LibException
 from ...structures import DataNode
+from ...utils import BYTES_LIKE_TYPES, is_immutable_data
 
 
 class IFunction(ByteArrayComponent):
@@ -26,8 +30,8 @@ class IFunction(ByteArrayComponent):
         SHA = 'sha'
 
     input_data = []
-    input_bytes = None
     decrypted = False
+    rebuildable = False
 
     def __init__(self, xml_node, **kwargs):
         super().__init__(xml_node, **kwargs)
@@ -63,33 +67,37 @@ class IFunction(ByteArrayComponent):
         return None
 
     def _build(self, buffer):
-        self.get_input_bytes(buffer, build_process=True)
+        # inputs are only evaluated here, data is streamed by subclasses when result is calculated
+        for _ in self.iter_input_bytes(buffer, build_process=True):
+            pass
 
-    def calculate_input_bytes(self, buffer, input_data, build_process=False):
-        """This method calculates the value of input data.
+    def iter_input_segments(self, buffer, input_data, build_process=False, raw=False):
+        """This method yields the input data as consecutive segments, so they can be hashed without concatenating
+        them. Segments are read-only views of buffer, components and formula results, exclude ranges are yielded
+        as separate 0xFF segments. Views of the buffer are released when the iteration ends, so segments
+        must not be kept after they were consumed.
 
         :param buffer: the buffer as reference input data has been given in <path> node with exclude ranges.
         :param input_data: the array of DataNode instances with inputs from input node in <function_hash>.
         :param build_process: boolean flag whether the call is on build-time
                               to set flag that the component has been used in building.
-        :return: the calculated data as array of bytes: input bytes from data node or raw data if from path node"""
-        input_bytes = bytearray()
-        raw_data = bytearray()
+        :param raw: yield raw data (before encryption) of path and buffer inputs instead of input bytes.
+        :return: generator of bytes-like segments"""
         for input_datum in input_data:
             if input_datum.value:
                 value = self.calculate_value(formula=input_datum.value, build_process=build_process)
-                if not isinstance(value, bytes) and not isinstance(value, bytearray):
+                if not isinstance(value, BYTES_LIKE_TYPES):
                     raise ComponentException(
                         f"Formula '{input_datum.value}' must return 'bytes' or 'bytearray', but returned "
                         f"'{type(value).__name__}'", self.name)
-                if input_datum.exclude_ranges:
-                    value = self._mask_with_exclude_ranges(value, input_datum.exclude_ranges)
+                if raw:
+                    continue
+                start, end = 0, len(value)
                 if input_datum.start_index and input_datum.end_index:
                     start = self.calculate_value(formula=input_datum.start_index)
                     end = self.calculate_value(formula=input_datum.end_index)
                     self._validate_data_offsets_are_in_range(value, start, end)
-                    value = value[start:end]
-                input_bytes.extend(value)
+                yield from self._iter_masked_segments(memoryview(value), input_datum.exclude_ranges, start, end)
             elif buffer is None:
                 raise ComponentException(f"Buffer was not given - '{self.Tags.DATA}' in '{self.Tags.INPUT}' must use "
                                          f"'{self.Tags.VALUE}' attribute", self.name)
@@ -97,27 +105,50 @@ class IFunction(ByteArrayComponent):
                 input_component = self.calculate_value(formula=input_datum.path)
                 if input_component.offset is not None:
                     input_component.build(buffer)
-                input_component_bytes = input_component.get_bytes()
-                if input_datum.exclude_ranges:
-                    input_component_bytes = self._mask_with_exclude_ranges(input_component_bytes,
-                                                                           input_datum.exclude_ranges)
-                input_bytes.extend(input_component_bytes)
-                if input_component.raw_data:
-                    component_raw_data = input_component.raw_data
-                    if input_datum.exclude_ranges:
-                        component_raw_data = self._mask_with_exclude_ranges(component_raw_data,
-                                                                            input_datum.exclude_ranges)
-                    raw_data.extend(component_raw_data)
+                IncrementalBuilder.record_read(input_component, self, self.ComponentProperty.VALUE.value)
+                data = input_component.raw_data if raw else input_component.get_bytes()
+                if data:
+                    data = memoryview(data)
+                    yield from self._iter_masked_segments(data, input_datum.exclude_ranges, 0, len(data))
             else:
                 start = self.calculate_value(formula=input_datum.start)
                 end = self.calculate_value(formula=input_datum.end)
+                if IncrementalBuilder.active is not None:
+                    exclude_ranges = self.calculate_value(formula=input_datum.exclude_ranges) \
+                        if input_datum.exclude_ranges else None
+                    IncrementalBuilder.record_buffer_read(self, start, min(end, len(buffer)), exclude_ranges)
                 buffer.seek(start)
-                val = buffer.read(end - start)
-                if input_datum.exclude_ranges:
-                    val = self._mask_with_exclude_ranges(val, input_datum.exclude_ranges)
-                input_bytes.extend(val)
-                raw_data.extend(val)
-        return input_bytes, raw_data
+                with memoryview(buffer) as view, view[start:end] as data:
+                    yield from self._iter_masked_segments(data, input_datum.exclude_ranges, 0, len(data))
+                    end = start + len(data)
+                buffer.seek(end)
+
+    def _iter_masked_segments(self, data: memoryview, exclude_ranges_formula, start, end):
+        """Yields data[start:end] split on exclude ranges, which are replaced with 0xFF bytes."""
+        exclude_ranges = []
+        if exclude_ranges_formula:
+            exclude_ranges = self.calculate_value(formula=exclude_ranges_formula)
+            IFunction.check_if_ranges_are_exclusive(exclude_ranges)
+            for exclude_start, exclude_end in exclude_ranges:
+                if exclude_start > exclude_end:
+                    raise ComponentException(f'Exclude range limit cannot be smaller than its base. '
+                                             f'Exclude base: "{exclude_start}", '
+                                             f'exclude limit: "{exclude_end}"')
+                if exclude_end > len(data):
+                    raise ComponentException(f'Exclude range limit cannot exceed data size. '
+                                             f'Exclude limit: "{exclude_end}", '
+                                             f'data size: "{len(data)}"')
+        position = start
+        for exclude_start, exclude_end in sorted(exclude_ranges):
+            exclude_start = min(max(exclude_start, position), end)
+            exclude_end = min(max(exclude_end, exclude_start), end)
+            if exclude_start > position:
+                yield data[position:exclude_start]
+            if exclude_end > exclude_start:
+                yield b'\xFF' * (exclude_end - exclude_start)
+            position = exclude_end
+        if end > position:
+            yield data[position:end]
 
     def _validate_data_offsets_are_in_range(self, input_data, start, end):
         if start >= end:
@@ -128,22 +159,6 @@ class IFunction(ByteArrayComponent):
             raise ComponentException(f"End offset ({end}) cannot be greater than data length ({data_length}).",
                                      self.name)
 
-    def _mask_with_exclude_ranges(self, val, exclude_ranges_formula: [int, int]):
-        exclude_ranges = self.calculate_value(formula=exclude_ranges_formula)
-        IFunction.check_if_ranges_are_exclusive(exclude_ranges)
-        val = bytearray(val)
-        for start, end in exclude_ranges:
-            if start > end:
-                raise ComponentException(f'Exclude range limit cannot be smaller than its base. '
-                                         f'Exclude base: "{start}", '
-                                         f'exclude limit: "{end}"')
-            if end > len(val):
-                raise ComponentException(f'Exclude range limit cannot exceed data size. '
-                                         f'Exclude limit: "{end}", '
-                                         f'data size: "{len(val)}"')
-            val[start:end] = [0xFF] * (end - start)
-        return val
-
     @staticmethod
     def check_if_ranges_are_exclusive(range_tuples: []):
         if len(range_tuples) < 2:
@@ -157,16 +172,74 @@ class IFunction(ByteArrayComponent):
                 raise ComponentException(f"Exclude ranges are overlapping! {higher_start}:{higher_end} overlaps "
                                          f"{lower_start}:{lower_end}")
 
+    def iter_input_bytes(self, buffer=None, build_process=False):
+        """This method yields segments of input data, raw data is used instead if the function works on decrypted
+        data and any of its inputs was encrypted.
+
+        :param buffer: the buffer as input for iter_input_segments if input data comes from path node.
+        :param build_process: boolean flag whether the call is on build-time
+                              to set flag that the component has been used in building.
+        :return: generator of bytes-like segments."""
+        raw = False
+        if self.decrypted:
+            with closing(self.iter_input_segments(buffer, self.input_data, build_process, raw=True)) as segments:
+                raw = any(len(segment) for segment in segments)
+        yield from self.iter_input_segments(buffer, self.input_data, build_process, raw=raw)
+
+    def update_with_input_bytes(self, digest, buffer=None, build_process=False):
+        """Feeds input data to object with 'update' method (hash, crc) segment by segment."""
+        for segment in self.iter_input_bytes(buffer, build_process):
+            digest.update(segment)
+
     def get_input_bytes(self, buffer=None, build_process=False):
-        """This method gets the value of input data.
+        """This method gets the value of input data as a single copy, for consumers which need contiguous data.
 
-        :param buffer: the buffer as input for calculate_input_bytes if input data comes from path node.
+        :param buffer: the buffer as input for iter_input_segments if input data comes from path node.
         :param build_process: boolean flag whether the call is on build-time
                               to set flag that the component has been used in building.
         :return: calculated input bytes."""
-        if self.input_bytes is None or self.raw_data is None:
-            self.input_bytes, self.raw_data = self.calculate_input_bytes(buffer, self.input_data,
-                                                                         build_process=build_process)
-        if self.decrypted and self.raw_data:
-            return self.raw_data
-        return self.input_bytes
+        input_bytes = bytearray()
+        for segment in self.iter_input_bytes(buffer, build_process):
+            input_bytes.extend(segment)
+        return bytes(input_bytes)
+
+    def get_static_input_segments(self):
+        """This method gets input data if it does not depend on the build, i.e. all inputs are value formulas returning
+        immutable data (e.g. mapped input files), so the digest can be calculated ahead of the build.
+
+        :return: tuple (sources, segments) where sources are (data, start, end, exclude ranges) of each input,
+                 or None if any input depends on the build."""
+        if self.decrypted or not self.input_data:
+            return None
+        sources = []
+        segments = []
+        for input_datum in self.input_data:
+            if not input_datum.value:
+                return None
+            value = self.calculate_value(formula=input_datum.value)
+            if not is_immutable_data(value):
+                return None
+            start, end = 0, len(value)
+            if input_datum.start_index and input_datum.end_index:
+                start = self.calculate_value(formula=input_datum.start_index)
+                end = self.calculate_value(formula=input_datum.end_index)
+                self._validate_data_offsets_are_in_range(value, start, end)
+            exclude_ranges = self.calculate_value(formula=input_datum.exclude_ranges) \
+                if input_datum.exclude_ranges else None
+            sources.append((value, start, end, exclude_ranges))
+            segments.extend(self._iter_masked_segments(memoryview(value), input_datum.exclude_ranges, start, end))
+        return sources, segments
+
+    def is_enabled_before_build(self) -> bool:
+        """Checks if the function will be built without caching the result, as values used by the formula may change
+        until the function is built."""
+        if not self.exists:
+            return False
+        if self.enabled_formula is None:
+            return self.enabled is not False
+        return self.calculate_value(formula=self.enabled_formula) is True
+
+    def new_input_digest(self):
+        """Returns a new digest object (with 'update' method) for input data if the digest can be calculated
+        ahead of the build by DigestScheduler, otherwise None."""
+        return None
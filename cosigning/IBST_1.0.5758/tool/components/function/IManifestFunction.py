@@ -14,13 +14,17 @@ This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
 import os
+import re
+from typing import List, Tuple
+
 from lxml.etree import SubElement  # nosec
 
+from ...BuildContext import BuildContext
 from ...Converter import Converter
 from ...LibException import ComponentException
 from ...components.function.IFunction import IFunction
-from ...structures import ValueWrapper, SupportedSHAs
-from ...utils import calculate_hash
+from ...structures import Buffer, ValueWrapper, SupportedSHAs
+from ...utils import calculate_segments_hash
 
 
 class IManifestFunction(IFunction):
@@ -39,6 +43,8 @@ class IManifestFunction(IFunction):
         MANIFEST_LIST = 'manifests_list'
         IMPORT_XML_NODE = 'import_xml'
 
+    untracked_buffer_access = True
+
     class ManifestListTags:
         ID = 'id'
         IMPORT = 'import'
@@ -80,6 +86,41 @@ class IManifestFunction(IFunction):
             SubElement(export_node, 'number',
                        {'name': IManifestFunction.ManifestListTags.MANIFEST_OFFSET, 'value': hex(self.manifest_offset)})
 
+    class MagicNumberIndex:
+        """
+        Offsets of all occurrences of magic numbers in a buffer, found in a single pass over it: a pattern matching
+        any of the magic numbers is searched from the position after each occurrence, so overlapping occurrences are
+        found, instead of searching the rest of the buffer for each magic number after every occurrence.
+
+        Manifest functions of a build (export, import, validate) searching the same buffer for the same magic numbers
+        share the index, it's found again when the buffer was written or resized since.
+        """
+
+        def __init__(self, buffer, magic_numbers: Tuple[bytes, ...]):
+            self.state = self._get_state(buffer)
+            self.offsets: List[int] = []
+            if not magic_numbers:
+                return
+            pattern = re.compile(b'|'.join(re.escape(magic_number) for magic_number in magic_numbers))
+            match = pattern.search(buffer)
+            while match is not None:
+                self.offsets.append(match.start())
+                match = pattern.search(buffer, match.start() + 1)
+
+        @classmethod
+        def get(cls, buffer, magic_numbers: Tuple[bytes, ...]) -> 'IManifestFunction.MagicNumberIndex':
+            if not isinstance(buffer, Buffer):
+                return cls(buffer, magic_numbers)
+            indexes = BuildContext.current().magic_number_indexes.setdefault(buffer, {})
+            index = indexes.get(magic_numbers)
+            if index is None or index.state != cls._get_state(buffer):
+                index = indexes[magic_numbers] = cls(buffer, magic_numbers)
+            return index
+
+        @staticmethod
+        def _get_state(buffer):
+            return (buffer.write_count, len(buffer)) if isinstance(buffer, Buffer) else None
+
     def __init__(self, xml_node, **kwargs):
         self.decomposition_node: ValueWrapper = None
         self.valid_manifest_header_type = None
@@ -132,14 +173,8 @@ class IManifestFunction(IFunction):
         buffer.seek(self.offset)
 
     def _find_manifests(self, buffer, manifests_output_path=None):
-        magic_number_bytes = [magic_bytes.value.encode('ascii') for magic_bytes in self.magic_numbers]
-        for i, magic_bytes in enumerate(magic_number_bytes):
-            if magic_bytes[0:2] == b'0x':
-                int_value = Converter.string_to_int(magic_bytes.decode('ascii'))
-                magic_number_bytes[i] = Converter.to_bytes(int_value, 8)
         index = 0
-        magic_number_position = self.find_next_magic_number_occurrence(magic_number_bytes, buffer)
-        while magic_number_position >= 0:
+        for magic_number_position in self.MagicNumberIndex.get(buffer, self._get_magic_number_bytes()).offsets:
             manifest_offset = magic_number_position - self.magic_number_offset.value
             if manifest_offset < 0:
                 raise ComponentException(f"Found manifest magic magic number at offset {magic_number_position} "
@@ -155,18 +190,15 @@ class IManifestFunction(IFunction):
                                     public_key_hash=self._get_public_key_hash(), manifest_offset=manifest_offset,
                                     post_pv=self.post_pv.recalculate(), sha_size=self._get_sha_size())
                 index += 1
-
             buffer.seek(magic_number_position + 1)
-            magic_number_position = self.find_next_magic_number_occurrence(magic_number_bytes, buffer)
 
-    @staticmethod
-    def find_next_magic_number_occurrence(magic_number_bytes, buffer):
-        occurrence_positions = []
-        for magic_number in magic_number_bytes:
-            magic_number_position = buffer.find(magic_number, buffer.tell())
-            if magic_number_position >= 0:
-                occurrence_positions.append(magic_number_position)
-        return min(occurrence_positions) if len(occurrence_positions) > 0 else -1
+    def _get_magic_number_bytes(self) -> Tuple[bytes, ...]:
+        magic_number_bytes = [magic_bytes.value.encode('ascii') for magic_bytes in self.magic_numbers]
+        for i, magic_bytes in enumerate(magic_number_bytes):
+            if magic_bytes[0:2] == b'0x':
+                int_value = Converter.string_to_int(magic_bytes.decode('ascii'))
+                magic_number_bytes[i] = Converter.to_bytes(int_value, 8)
+        return tuple(magic_number_bytes)
 
     def _load_manifest(self, buffer):
         decomposition_component = self.decomposition_node.value
@@ -175,12 +207,12 @@ class IManifestFunction(IFunction):
         return manifest
 
     def _get_manifest_hash(self, buffer=None):
-        data, _ = self.calculate_input_bytes(buffer, input_data=self.manifest_hash_input_data)
-        return calculate_hash(data, self.sha_type, self.is_legacy)
+        segments = self.iter_input_segments(buffer, input_data=self.manifest_hash_input_data)
+        return calculate_segments_hash(segments, self.sha_type, self.is_legacy)
 
     def _get_public_key_hash(self, buffer=None):
-        data, _ = self.calculate_input_bytes(buffer, input_data=self.public_key_hash_input_data)
-        return calculate_hash(data, self.sha_type, self.is_legacy)
+        segments = self.iter_input_segments(buffer, input_data=self.public_key_hash_input_data)
+        return calculate_segments_hash(segments, self.sha_type, self.is_legacy)
 
     def _get_sha_size(self):
         return SupportedSHAs.get_sha_class(self.sha_type, self.is_legacy).digest_size
@@ -20,6 +20,7 @@ import os
 from enum import Enum
 from cryptography.hazmat.primitives.asymmetric import utils
 
+from ...BuildProfiler import BuildProfiler
 from ...FileManager import FileManager
 from ...FileOpener import open_file
 from ...LibException import ComponentException, LibException
@@ -28,6 +29,7 @@ from ...structures import SupportedSHAs, SupportedPaddings, RsaSigningKey, EcSig
 from ...Converter import Converter
 from ...ColorPrint import log
 from ...LibConfig import LibConfig
+from ...utils import BYTES_LIKE_TYPES
 
 
 class SignFunction(HashFunction):
@@ -111,6 +113,8 @@ class SignFunction(HashFunction):
     offline_signing_formula = None
     offline_signing = False
     ecc_padding = None
+    # header version depends on the key and the algorithms only
+    layout_properties = HashFunction.layout_properties + ('header_version',)
 
     class ComponentProperty(Enum):
         HEADER_VERSION = "header_version"
@@ -396,10 +400,12 @@ class SignFunction(HashFunction):
                             f"Cannot load external data - '{self.Tags.EXTERNAL_DATA}' tag with '{self.Tags.CALCULATE}' "
                             f"attribute was not specified", self.name)
                 self.external_data = self.calculate_value(formula=self.external_data_formula, build_process=True)
-                if not isinstance(self.external_data, bytes) and not isinstance(self.external_data, bytearray):
+                if not isinstance(self.external_data, BYTES_LIKE_TYPES):
                     raise ComponentException(
                         f"{self.Tags.EXTERNAL_DATA} must result in a 'bytearray' or 'bytes', but is: "
                         f"{type(self.external_data).__name__}", self.name)
+                if isinstance(self.external_data, memoryview):
+                    self.external_data = self.external_data.tobytes()
 
                 # convert to R+PADDING+S+PADDING
                 if isinstance(self.key.key, EcSigningKey) and EcSigningKey.is_der_format(self.external_data):
@@ -437,9 +443,12 @@ class SignFunction(HashFunction):
                 padding = self.ecc_padding
 
             try:
-                signature = self.key.sign(self.get_sha(buffer), padding,
-                                          utils.Prehashed(SupportedSHAs.get_sha_class(self.sha_type, self.is_legacy)),
-                                          self.reverse)
+                sha = self.get_sha(buffer)
+                with BuildProfiler.section(BuildProfiler.Phase.SIGN, self.get_string_path()):
+                    signature = self.key.sign(sha, padding,
+                                              utils.Prehashed(SupportedSHAs.get_sha_class(self.sha_type,
+                                                                                          self.is_legacy)),
+                                              self.reverse)
             except (ValueError, TypeError) as e:
                 raise ComponentException(f"Signing error: {e.args[0]}", self.name) from None
             self.set_value(signature)
@@ -15,6 +15,7 @@ implied warranties, other than those that are expressly stated in the License.
 """
 import re
 from ...Converter import Converter
+from ...IncrementalBuilder import IncrementalBuilder
 from .IFunction import IFunction
 from ...LibException import ComponentException
 
@@ -61,6 +62,7 @@ class UpdateValueFunction(IFunction):
     node_path = None
     new_value_path = None
     new_value = None
+    rebuildable = True
 
     def build(self, buffer):
         if not self.is_enabled():
@@ -83,12 +85,19 @@ class UpdateValueFunction(IFunction):
         if node_to_update.parent:
             new_value = Converter.to_bytes(new_value, node_to_update.size, byte_order=node_to_update.byte_order)
             self._set_value_for_parent(node_to_update, node_to_update.parent, new_value)
+        IncrementalBuilder.record_built(self, node_to_update)
+
+    def get_build_target(self):
+        return self.calculate_value_from_path(self.node_path)
 
     @staticmethod
     def _set_value_for_parent(node_to_update, parent, new_value):
         if parent.value and parent.offset is not None:
             offset_delta = node_to_update.offset - parent.offset
             parent_val = parent.value
+            if isinstance(parent_val, memoryview):
+                # value is a read-only view of mapped file or of the build buffer, updated value is a new copy
+                parent_val = parent_val.tobytes()
             parent.value = parent_val[:offset_delta] + new_value + parent_val[offset_delta + node_to_update.size:]
 
         if parent.parent:
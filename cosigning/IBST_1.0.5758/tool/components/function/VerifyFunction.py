@@ -74,6 +74,7 @@ class VerifyFunction(SignFunction):
     hash = None
     key = None
     signature_to_verify = None
+    rebuildable = False
 
     def __init__(self, xml_node, **kwargs):
         self.data = {}
@@ -18,6 +18,7 @@ from typing import List
 from ..LibException import ComponentException
 from ..PropertyState import PropertyState, ComponentPreChangeState
 from ..LibException import DependencyException
+from ..utils import BYTES_LIKE_TYPES
 from .Dependency import Dependency
 
 
@@ -63,7 +64,7 @@ class GetDependency(Dependency):
                     self.new_value = new_value
                     # pylint: disable-next=import-outside-toplevel
                     from library.tool.components.NumberComponent import NumberComponent
-                    if isinstance(new_value, (bytearray, bytes)) and isinstance(self.dst_setting_ref, NumberComponent):
+                    if isinstance(new_value, BYTES_LIKE_TYPES) and isinstance(self.dst_setting_ref, NumberComponent):
                         str_value = str(int.from_bytes(new_value, self.dst_setting_ref.byte_order))
                         change_state_list = self.dst_setting_ref.parse_string_value(str_value)
                     else:
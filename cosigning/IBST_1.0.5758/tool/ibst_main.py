@@ -15,18 +15,38 @@ implied warranties, other than those that are expressly stated in the License.
 """
 
 import os
+import io
 import copy
+import contextlib
+from typing import List, Optional, Tuple
 
 from .ColorPrint import log
 from .IbstCommandLineOptions import IbstCommandLineOptions
 from .BinaryGenerator import BinaryGenerator
+from .BuildContext import BuildContext
+from .BuildProfiler import BuildProfiler
+from .ConfigSnapshot import ConfigSnapshot
 from .LibException import LibException, ComponentException
+from .MappedOutputFile import MappedOutputFile
 from .utils import get_file_name_no_ext, print_header, is_python_ver_satisfying
 from .components.IComponent import IComponent
 from .LibConfig import LibConfig
 from .PathResolver import PathResolver
 from .SecureXmlParser import SecureXmlParser
 
+IBST_VERSION = '1.0.5758'
+
+
+def save_profile(profiler: BuildProfiler, path: str, created_files: List[str]):
+    try:
+        speedscope_path = profiler.save(path)
+    except LibException as ex:
+        print(f"Failed to save build profile: {ex}")
+        LibConfig.exitCode = -1
+        return
+    created_files += [os.path.abspath(path), os.path.abspath(speedscope_path)]
+    print(f"Build profile saved: {os.path.abspath(path)}, {os.path.abspath(speedscope_path)}")
+
 
 def print_info(input_name, command_line_options):
     if command_line_options.output_file:
@@ -34,16 +54,122 @@ def print_info(input_name, command_line_options):
         print(f"{input_name} binary created: {output_path}")
 
 
-def main(appfilepath=__file__, input_args=None):
+def configure_lib_config(app_dir):
     LibConfig.toolType = LibConfig.ToolType.IBST
+    LibConfig.toolVersion = IBST_VERSION
+    LibConfig.appDir = app_dir
+    LibConfig.settingsTag = 'settings'
+    LibConfig.overridesTag = 'ibst_overrides'
+    LibConfig.defaultPaddingValue = IComponent.AlignByte.Byte00
+    LibConfig.rootTag = 'ibst'
+    LibConfig.maxBufferSize = 128 * 1024 * 1024
+    # larger images are built in buffers backed by temporary files
+    LibConfig.diskBufferThreshold = LibConfig.maxBufferSize
+    LibConfig.schemaCacheDir = os.path.join(LibConfig.appDir, 'schema_cache')
+    LibConfig.buildCacheDir = os.path.join(LibConfig.appDir, 'build_cache')
+
+
+def get_snapshot(command_line_options, schema) -> Optional[ConfigSnapshot]:
+    """Returns snapshot of the configuration requested by --snapshot_in/--snapshot_out options, if any."""
+    if not command_line_options.snapshot_in_file and not command_line_options.snapshot_out_file:
+        return None
+    return ConfigSnapshot(command_line_options.input_file, schema, command_line_options.snapshot_in_file,
+                          command_line_options.snapshot_out_file)
+
+
+def build_override_node(command_line_options, template: BinaryGenerator, override_node, input_name) -> List[str]:
+    cli_opt_copy = copy.deepcopy(command_line_options)
+    generator = template.clone()
+    generator.apply_nodes_override(override_node)
+    created_files = generator.process_build(cli_opt_copy, input_name)
+    print_info(input_name, cli_opt_copy)
+    return created_files
+
+
+# configuration loaded by a worker process, reused by all nodes built by the worker
+_worker_template: Optional[Tuple[tuple, BinaryGenerator]] = None
+
+
+def _get_worker_template(command_line_options, schema, app_dir) -> BinaryGenerator:
+    global _worker_template  # pylint: disable=global-statement
+    input_file = command_line_options.input_file
+    # snapshot is saved by the main process, workers only load it
+    load_path = command_line_options.snapshot_in_file or command_line_options.snapshot_out_file
+    key = (input_file, schema, app_dir, load_path)
+    if _worker_template is None or _worker_template[0] != key:
+        snapshot = ConfigSnapshot(input_file, schema, load_path) if load_path else None
+        _worker_template = (key, BinaryGenerator(input_file, schema, PathResolver(app_dir), snapshot=snapshot))
+    return _worker_template[1]
+
+
+def _build_override_node_in_worker(app_dir, is_verbose, schema, command_line_options, node_index, input_name):
+    """
+    Builds single <cosign> node of override file in a worker process. Worker does not share any state with
+    the main process (it could be spawned), so configuration and override nodes are loaded again, the configuration
+    once per worker.
+    Output is captured and returned together with exit code and created files, so the main process can print it
+    in order of nodes.
+    """
+    configure_lib_config(app_dir)
+    LibConfig.isVerbose = is_verbose
+    LibConfig.diskBufferDir = command_line_options.buffer_dir
+    LibConfig.exitCode = 0
+    schema = SecureXmlParser.Schema.SchemaType(*schema) if schema is not None else SecureXmlParser.Schema.NoSchema
+    output = io.StringIO()
+    created_files = []
+    with contextlib.redirect_stdout(output):
+        try:
+            override_node = BinaryGenerator.get_override_nodes(command_line_options.config_override_file)[node_index]
+            template = _get_worker_template(command_line_options, schema, app_dir)
+            created_files = build_override_node(command_line_options, template, override_node, input_name)
+        except (LibException, ComponentException) as ex:
+            print(f"Failed to build image, an error occurred: {ex}")
+            LibConfig.exitCode = -1
+    return LibConfig.exitCode, output.getvalue(), created_files
+
+
+def build_override_nodes_in_parallel(command_line_options, schema, override_nodes, input_name) -> List[str]:
+    """Builds override nodes in a process pool. Output is printed and exit code aggregated in order of nodes."""
+    # multiprocessing is imported only by builds using --jobs
+    from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+    created_files = []
+    schema = tuple(schema) if schema is not None else None
+    jobs = min(command_line_options.jobs, len(override_nodes))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_build_override_node_in_worker, LibConfig.appDir, LibConfig.isVerbose, schema,
+                                   command_line_options, index, input_name) for index in range(len(override_nodes))]
+        for future in futures:
+            exit_code, output, node_files = future.result()
+            print(output, end='')
+            created_files.extend(node_files)
+            if exit_code != 0:
+                LibConfig.exitCode = exit_code
+    return created_files
+
+
+def main(appfilepath=__file__, input_args=None):
+    if input_args and input_args[0] == 'serve':
+        from .BuildServer import BuildServer  # pylint: disable=import-outside-toplevel
+        return BuildServer.main(appfilepath, input_args[1:])
+    return run(appfilepath, input_args)[0]
+
+
+def run(appfilepath=__file__, input_args=None) -> Tuple[int, List[str]]:
+    """Runs IBST with given command line arguments. Returns exit code and paths of created files."""
+    # settings of the build are kept in its own context, so runs in one process (server, threads) don't share them
+    with BuildContext().activate():
+        return _run(appfilepath, input_args)
+
+
+def _run(appfilepath, input_args) -> Tuple[int, List[str]]:
+    created_files = []
     appfilename = os.path.basename(appfilepath)
-    LibConfig.appDir = os.path.split(os.path.abspath(appfilepath))[0]
+    configure_lib_config(os.path.split(os.path.abspath(appfilepath))[0])
     name = '\nIntel (R) IBST - Image Building and Signing Tool. '
-    version = '1.0.5758'
-    print_header(name=name, version=version, copyright_date_range="2015-2024")
+    print_header(name=name, version=IBST_VERSION, copyright_date_range="2015-2024")
     if not is_python_ver_satisfying(required_python=(3, 8)):
         LibConfig.exitCode = -1
-        return LibConfig.exitCode
+        return LibConfig.exitCode, created_files
 
     # If IBST was loaded as module it happen that appfilepath doesn't point to ibst.py but to this file: ibst_main.py
     # But schema.xsd is next to ibst.py, therefore we need to change the path to schema
@@ -57,33 +183,64 @@ def main(appfilepath=__file__, input_args=None):
         xml_parser = SecureXmlParser(None, SecureXmlParser.Schema.Ibst)
         log().warning(f'Changed path to schema to: {xml_parser.schema_path}')
 
-    LibConfig.settingsTag = 'settings'
-    LibConfig.overridesTag = 'ibst_overrides'
-    LibConfig.defaultPaddingValue = IComponent.AlignByte.Byte00
-    LibConfig.rootTag = 'ibst'
-    LibConfig.maxBufferSize = 128 * 1024 * 1024
-
     command_line_options = IbstCommandLineOptions(appfilename, LibConfig.appDir, input_args)
     input_name = get_file_name_no_ext(command_line_options.input_file)
     path_resolver = PathResolver(LibConfig.appDir)
+    # pylint: disable-next=line-too-long
+    schema = SecureXmlParser.Schema.NoSchema if command_line_options.skip_validation else SecureXmlParser.Schema.Ibst
+    if command_line_options.direct_output and not MappedOutputFile.isSupported:
+        log().warning("Memory mapped files can't replace output files on this platform, --direct_output option is "
+                      "ignored")
+    if command_line_options.watch:
+        from .BuildWatcher import BuildWatcher  # pylint: disable=import-outside-toplevel
+        if command_line_options.jobs > 1 or command_line_options.profile_file:
+            log().warning("Watched builds run in a single process and are not profiled, --jobs and --profile "
+                          "options are ignored")
+        return BuildWatcher(command_line_options, schema, path_resolver, input_name).run()
+    profiler = BuildProfiler.start() if command_line_options.profile_file else None
     try:
         override_nodes = []
         if command_line_options.config_override_file is not None:
             override_nodes = BinaryGenerator.get_override_nodes(command_line_options.config_override_file)
-        # pylint: disable-next=line-too-long
-        schema = SecureXmlParser.Schema.NoSchema if command_line_options.skip_validation else SecureXmlParser.Schema.Ibst
-        if override_nodes:
+        parallel = len(override_nodes) > 1 and command_line_options.jobs > 1
+        if parallel and (command_line_options.output_file or command_line_options.output_map or
+                         command_line_options.output_info):
+            log().warning("All <cosign> nodes are saved to the same output file, --jobs option is ignored")
+            parallel = False
+        if parallel and profiler:
+            log().warning("Profiled builds run in a single process, --jobs option is ignored")
+            parallel = False
+        if command_line_options.decompose_map:
+            generator = BinaryGenerator(command_line_options.input_file, schema, path_resolver,
+                                        snapshot=get_snapshot(command_line_options, schema))
+            created_files += generator.process_decomposition(command_line_options, input_name)
+        elif parallel:
+            if command_line_options.snapshot_out_file:
+                get_snapshot(command_line_options, schema).get_xml_root()
+            created_files += build_override_nodes_in_parallel(command_line_options, schema, override_nodes,
+                                                              input_name)
+        elif override_nodes:
+            # configuration is parsed and validated once, each node is built from its copy
+            template = BinaryGenerator(command_line_options.input_file, schema, path_resolver,
+                                       snapshot=get_snapshot(command_line_options, schema))
             for override_node in override_nodes:
-                cli_opt_copy = copy.deepcopy(command_line_options)
-                generator = BinaryGenerator(cli_opt_copy.input_file, schema, path_resolver)
-                generator.apply_nodes_override(override_node)
-                generator.process_build(cli_opt_copy, input_name)
-                print_info(input_name, cli_opt_copy)
+                # a failed node doesn't stop the others, as in builds in parallel (--jobs)
+                try:
+                    created_files += build_override_node(command_line_options, template, override_node, input_name)
+                except (LibException, ComponentException) as ex:
+                    print(f"Failed to build image, an error occurred: {ex}")
+                    LibConfig.exitCode = -1
         else:
-            generator = BinaryGenerator(command_line_options.input_file, schema, path_resolver)
-            generator.process_build(command_line_options, input_name)
+            generator = BinaryGenerator(command_line_options.input_file, schema, path_resolver,
+                                        snapshot=get_snapshot(command_line_options, schema))
+            created_files += generator.process_build(command_line_options, input_name)
             print_info(input_name, command_line_options)
     except (LibException, ComponentException) as ex:
         print(f"Failed to build image, an error occurred: {ex}")
         LibConfig.exitCode = -1
-    return LibConfig.exitCode
+    finally:
+        if profiler:
+            profiler.stop()
+    if profiler:
+        save_profile(profiler, command_line_options.profile_file, created_files)
+    return LibConfig.exitCode, created_files
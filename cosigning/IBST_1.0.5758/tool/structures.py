@@ -13,21 +13,24 @@ This software and the related documents are provided as is, with no express or
 implied warranties, other than those that are expressly stated in the License.
 """
 import copy
+import errno
+import os
 import sys
+import tempfile
 from os import urandom
-from mmap import mmap
+from mmap import mmap, ACCESS_READ, PAGESIZE
 from enum import Enum
-from cryptography.hazmat.primitives.asymmetric import padding, utils
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.ciphers import algorithms, modes
-from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
-from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePrivateKey, ECDSA
-from cryptography.exceptions import InvalidSignature
 
 from .ColorPrint import log
 from .LibConfig import LibConfig
 from .LibException import LibException, InternalBufferTooSmallException, ComponentException
 
+try:
+    from mmap import MADV_DONTNEED
+except ImportError:
+    # madvise is not available on Windows
+    MADV_DONTNEED = None
+
 
 class SupportedSHAs:
     class ShaType(Enum):
@@ -35,8 +38,11 @@ class SupportedSHAs:
         SHA384 = "384"
         SHA512 = "512"
 
-    _supportedSHAClasses = {ShaType.SHA384: hashes.SHA384(), ShaType.SHA512: hashes.SHA512()}
-    _legacySHAClasses = {ShaType.SHA256: hashes.SHA256()}
+    # hash algorithms of cryptography (named as the sha types) are created on first use, so cryptography is imported
+    # only by builds which hash or sign
+    _supportedSHATypes = [ShaType.SHA384, ShaType.SHA512]
+    _legacySHATypes = [ShaType.SHA256]
+    _shaClasses = {}
 
     _mask = 0xF000
     _maskVersions = {ShaType.SHA256: 0, ShaType.SHA384: 0x1000, ShaType.SHA512: 0x2000, }
@@ -58,13 +64,15 @@ class SupportedSHAs:
 
     @classmethod
     def get_sha_class(cls, sha_type: ShaType, is_legacy=False):
-        if sha_type in SupportedSHAs._supportedSHAClasses:
-            return cls._supportedSHAClasses[sha_type]
-        if is_legacy and sha_type in cls._legacySHAClasses:
-            return cls._legacySHAClasses[sha_type]
+        if sha_type in cls._supportedSHATypes or is_legacy and sha_type in cls._legacySHATypes:
+            sha_class = cls._shaClasses.get(sha_type)
+            if sha_class is None:
+                from cryptography.hazmat.primitives import hashes  # pylint: disable=import-outside-toplevel
+                sha_class = cls._shaClasses[sha_type] = getattr(hashes, sha_type.name)()
+            return sha_class
         LibConfig.exitCode = -1
         raise LibException(f"Given sha size is deprecated: {sha_type.value}.\n"
-                           f"Accepted are: " + ", ".join([sha.value for sha in cls._supportedSHAClasses]))
+                           f"Accepted are: " + ", ".join([sha.value for sha in cls._supportedSHATypes]))
 
     @classmethod
     def get_mask_version(cls, sha_type: ShaType):  # pylint: disable=inconsistent-return-statements
@@ -83,18 +91,22 @@ class SupportedPaddings:
         PKCS1_V1_5 = "v1_5"
         PKCS1_PSS = "PSS"
 
-    _supportedPaddingClasses = {PaddingSchemeType.PKCS1_PSS: padding.PSS}
-    _legacyPaddingClasses = {PaddingSchemeType.PKCS1_V1_5: padding.PKCS1v15}
+    # names of padding classes in cryptography's padding module, imported on first use
+    _supportedPaddingClasses = {PaddingSchemeType.PKCS1_PSS: 'PSS'}
+    _legacyPaddingClasses = {PaddingSchemeType.PKCS1_V1_5: 'PKCS1v15'}
     _mask = 0xF0000
     _maskVersions = {PaddingSchemeType.PKCS1_V1_5: 0x10000, PaddingSchemeType.PKCS1_PSS: 0x20000}
-    maxSaltLen = padding.PSS.MAX_LENGTH
+    # salt lengths replaced with padding.PSS.MAX_LENGTH and padding.PSS.AUTO when padding args are created
+    maxSaltLen = 'max_length'
+    autoSaltLen = 'auto'
 
     @classmethod
     def get_padding_class(cls, padding_type: PaddingSchemeType, is_legacy=False):
+        from cryptography.hazmat.primitives.asymmetric import padding  # pylint: disable=import-outside-toplevel
         if padding_type in cls._supportedPaddingClasses:
-            return cls._supportedPaddingClasses[padding_type]
+            return getattr(padding, cls._supportedPaddingClasses[padding_type])
         if is_legacy and padding_type in cls._legacyPaddingClasses:
-            return cls._legacyPaddingClasses[padding_type]
+            return getattr(padding, cls._legacyPaddingClasses[padding_type])
         raise LibException(f"Given padding type is deprecated: {padding_type.value}.\n"
                            f"Accepted are: " + ", ".join([sha.value for sha in cls._supportedPaddingClasses]))
 
@@ -107,7 +119,7 @@ class SupportedPaddings:
         raise LibException(f"No padding scheme type for given header: '{hex(header)}'.")
 
     @classmethod
-    def get_padding_args(cls, padding_type, sha_type, is_legacy, salt_len=padding.PSS.AUTO):
+    def get_padding_args(cls, padding_type, sha_type, is_legacy, salt_len=autoSaltLen):
         """
             Returns padding args needed for padding class with given padding type and sha type.
             :param padding_type: type of the padding (PSS, PKCS)
@@ -115,6 +127,11 @@ class SupportedPaddings:
             :param is_legacy: tells if it is a legacy algorithm
             :param salt_len: recommended salt length, it won't affect the verification if left as PSS.AUTO
         """
+        from cryptography.hazmat.primitives.asymmetric import padding  # pylint: disable=import-outside-toplevel
+        if salt_len == cls.maxSaltLen:
+            salt_len = padding.PSS.MAX_LENGTH
+        elif salt_len == cls.autoSaltLen:
+            salt_len = padding.PSS.AUTO
         padding_args = {cls.PaddingSchemeType.PKCS1_V1_5: [], cls.PaddingSchemeType.PKCS1_PSS: [
             padding.MGF1(SupportedSHAs.get_sha_class(sha_type, is_legacy)), salt_len]}
         return padding_args[padding_type]
@@ -162,6 +179,8 @@ class RsaSigningKey:
 
     @rsa_key.setter
     def rsa_key(self, value):
+        # pylint: disable-next=import-outside-toplevel
+        from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
         self._rsa_key = value
         if isinstance(value, RSAPrivateKey):
             self.key_type = AsymmetricKeyType.PRIVATE
@@ -183,6 +202,9 @@ class RsaSigningKey:
             :param padding_algorithm: padding algorithm class, can be PSS or PKCS
             :param hash_algorithm: prehashed hash algorithm class, can be SHA256, SHA384 OR SHA512
         """
+        # pylint: disable=import-outside-toplevel
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives.asymmetric import padding
         if self.key_type == AsymmetricKeyType.PRIVATE:
             key = self.rsa_key.public_key()
         else:
@@ -235,11 +257,13 @@ class EcSigningKey:
         self._curve = curve_type.value
 
     @property
-    def ec_key(self) -> EllipticCurvePrivateKey:
+    def ec_key(self) -> 'EllipticCurvePrivateKey':
         return self._ec_key
 
     @ec_key.setter
     def ec_key(self, value):
+        # pylint: disable-next=import-outside-toplevel
+        from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePrivateKey
         self._ec_key: EllipticCurvePrivateKey = value
         if isinstance(value, EllipticCurvePrivateKey):
             self.key_type = AsymmetricKeyType.PRIVATE
@@ -247,6 +271,7 @@ class EcSigningKey:
             self.key_type = AsymmetricKeyType.PUBLIC
 
     def sign(self, computed_hash, length, hash_algorithm, reverse: bool):
+        from cryptography.hazmat.primitives.asymmetric.ec import ECDSA  # pylint: disable=import-outside-toplevel
         reverse_order = ByteOrder.LITTLE if reverse else ByteOrder.BIG
         # the same output here as openssl so called encoded
         signature = self.ec_key.sign(computed_hash, ECDSA(hash_algorithm))
@@ -262,6 +287,9 @@ class EcSigningKey:
             - decoded: r_component + ecc_padding + s_component + ecc_padding
                 note: in decoded format, bytes can be without padding
         """
+        # pylint: disable=import-outside-toplevel
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives.asymmetric.ec import ECDSA
         if self.key_type == AsymmetricKeyType.PRIVATE:
             key = self.ec_key.public_key()
         else:
@@ -278,6 +306,7 @@ class EcSigningKey:
 
     @classmethod
     def add_padding(cls, signature: bytes, coordinate_size: int, bytes_length: int, reverse_order: ByteOrder):
+        from cryptography.hazmat.primitives.asymmetric import utils  # pylint: disable=import-outside-toplevel
         r, s = utils.decode_dss_signature(signature)
         r_bytes = r.to_bytes(coordinate_size, reverse_order.value)
         s_bytes = s.to_bytes(coordinate_size, reverse_order.value)
@@ -311,6 +340,7 @@ class EcSigningKey:
         openssl pkeyutl -sign -inkey key.pem -keyform PEM -in hash.bin -pkeyopt digest:sha256 > encoded_signature.bin
         """
 
+        from cryptography.hazmat.primitives.asymmetric import utils  # pylint: disable=import-outside-toplevel
         if EcSigningKey.is_der_format(signature):
             return signature
 
@@ -334,6 +364,7 @@ class EcSigningKey:
         """
         Checks whether given signature is in ASN.1 DER format
         """
+        from cryptography.hazmat.primitives.asymmetric import utils  # pylint: disable=import-outside-toplevel
         try:
             # if possible to get r & s, then the given signature is already in ASN.1 DER format
             utils.decode_dss_signature(signature)
@@ -450,7 +481,8 @@ class AesEncryption:
         CTR = 'CTR'
 
     modeTypes = {Mode.CBC: 1, Mode.CTR: 2}
-    aesBlockSizeBytes = algorithms.AES.block_size // 8
+    # algorithms.AES.block_size // 8, AES block is 128 bits for all key lengths
+    aesBlockSizeBytes = 16
 
     _paddingTypes = None
     _supportedAesSizes = [KeyLength.AES256]
@@ -478,6 +510,7 @@ class AesEncryption:
         When starting new encryption, a new initialization vector
         of random data must be generated. Old one should not be reused.
         """
+        from cryptography.hazmat.primitives.ciphers import modes  # pylint: disable=import-outside-toplevel
         if name == cls.Mode.CBC:
             return modes.CBC(iv if iv is not None else urandom(cls.aesBlockSizeBytes))
         if name == cls.Mode.CTR:
@@ -558,11 +591,62 @@ class AesEncryption:
 
 
 class Buffer(mmap):
+    """
+    Memory mapped buffer. Anonymous buffer (file_no -1) created with max_size greater than its length grows
+    geometrically up to max_size when data is written past its end (resizing is not supported on Windows, so there
+    the buffer is allocated with max_size at once).
+
+    Values of components can be read as views of the buffer (see read_view), so a component tree doesn't copy the
+    image at each level. A view of a writable buffer is owned by a component, before its range is written the owner
+    replaces the view with a copy (copy on write), so values don't change when the buffer is written.
+    """
     _error_message_pattern = "out of range"
+    fillChunkSize = 64 * 1024
+    isResizable = sys.platform != 'win32'
+
+    def __new__(cls, file_no, length, max_size=None, **kwargs):
+        if max_size is not None and not cls.isResizable:
+            length = max_size
+        return super().__new__(cls, file_no, length, **kwargs)
 
-    def __init__(self, file_no, length, **_):
+    def __init__(self, file_no, length, max_size=None, **kwargs):
         self._file_no = file_no
         self._max_size = length if length != 0 else self.size()
+        if max_size is not None:
+            self._max_size = max_size
+        self._readonly = kwargs.get('access') == ACCESS_READ
+        # (start, end, owner, view) of views given by read_view, end of the last one
+        self._shared_views = []
+        self._shared_end = 0
+        # number of writes, content derived from the buffer is found again when it changes
+        self._write_count = 0
+
+    @staticmethod
+    def create_build_buffer(length: int) -> 'Buffer':
+        """Returns buffer for an image of given length, backed by a temporary file if the image is larger than
+        LibConfig.diskBufferThreshold."""
+        if LibConfig.diskBufferThreshold is not None and length > LibConfig.diskBufferThreshold:
+            return DiskBuffer(length, LibConfig.diskBufferDir)
+        return Buffer(-1, length)
+
+    @staticmethod
+    def get_max_image_size() -> int:
+        if LibConfig.diskBufferThreshold is None or LibConfig.maxBufferSize is None:
+            return LibConfig.maxBufferSize
+        return max(LibConfig.maxBufferSize, LibConfig.maxDiskBufferSize)
+
+    @staticmethod
+    def reserve_file(fd: int, length: int):
+        """Sets size of the file to be mapped. Disk space is allocated where possible, so a full disk is reported
+        here instead of crashing the process (SIGBUS) on a write to the mapping."""
+        if hasattr(os, 'posix_fallocate') and length > 0:
+            try:
+                os.posix_fallocate(fd, 0, length)
+                return
+            except OSError as ex:
+                if ex.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+        os.ftruncate(fd, length)
 
     def size(self):
         if self._file_no == -1:
@@ -573,8 +657,70 @@ class Buffer(mmap):
     def max_size(self):
         return self._max_size
 
+    @property
+    def readonly(self) -> bool:
+        return self._readonly
+
+    @property
+    def write_count(self) -> int:
+        return self._write_count
+
+    def read_view(self, size: int, owner=None):
+        """
+        Reads size bytes as a read-only view of the buffer. A view of a writable buffer is registered for owner,
+        owner.detach_buffer_view(view) is called before its range is written. Bytes are returned if the buffer can't
+        share its content: there is no owner or the buffer may still grow (a resize fails while views exist).
+        """
+        start = self.tell()
+        if not self._readonly and (owner is None or len(self) < self._max_size):
+            return self.read(size)
+        end = min(start + size, len(self))
+        with memoryview(self) as buffer_view:
+            view = buffer_view[start:end].toreadonly()
+        self.seek(end)
+        if not self._readonly:
+            self._shared_views.append((start, end, owner, view))
+            self._shared_end = max(self._shared_end, end)
+        return view
+
+    def is_shared_with(self, view: memoryview, owner) -> bool:
+        """Checks if view of the buffer is owned by owner, i.e. it's replaced with a copy before it's overwritten."""
+        if self._readonly:
+            return True
+        return any(shared_view is view and shared_owner is owner
+                   for _, _, shared_owner, shared_view in reversed(self._shared_views))
+
+    def release_pages(self, start: int, end: int):
+        """Drops whole pages of given range of a read-only mapping from memory of the process, they are read again
+        from the file when they are accessed. Pages of a writable mapping are kept, they may hold the only copy."""
+        if not self._readonly or MADV_DONTNEED is None:
+            return
+        start = -(-start // PAGESIZE) * PAGESIZE
+        end = min(end, len(self)) // PAGESIZE * PAGESIZE
+        if start < end:
+            self.madvise(MADV_DONTNEED, start, end - start)
+
+    def _detach_views(self, start: int, end: int):
+        if start >= self._shared_end or end <= start:
+            return
+        kept = []
+        for shared in self._shared_views:
+            view_start, view_end, owner, view = shared
+            if view_start < end and start < view_end:
+                owner.detach_buffer_view(view)
+            else:
+                kept.append(shared)
+        self._shared_views = kept
+        self._shared_end = max((view_end for _, view_end, _, _ in kept), default=0)
+
+    def _grow(self, end):
+        if len(self) < end <= self._max_size and self._file_no == -1 and self.isResizable:
+            self.resize(min(max(end, 2 * len(self)), self._max_size))
+
     def seek(self, *args, **kwargs):
         try:
+            if len(args) == 1 and not kwargs:
+                self._grow(args[0])
             return super().seek(*args, **kwargs)
         except OverflowError as e:
             offset = args[0]
@@ -586,14 +732,46 @@ class Buffer(mmap):
 
     def write(self, *args, **kwargs):
         try:
+            if len(args) == 1 and not kwargs:
+                self._grow(self.tell() + len(args[0]))
+                self._detach_views(self.tell(), self.tell() + len(args[0]))
+            self._write_count += 1
             return super().write(*args, **kwargs)
         except ValueError as e:
             if self._error_message_pattern in str(e):
                 raise InternalBufferTooSmallException(self.max_size) from e
             raise
 
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            self._detach_views(*key.indices(len(self))[:2])
+        else:
+            index = key + len(self) if key < 0 else key
+            self._detach_views(index, index + 1)
+        self._write_count += 1
+        super().__setitem__(key, value)
+
+    def fill(self, value: int, start: int, end: int):
+        """Fills given range with byte value, without creating a temporary object of the range size."""
+        chunk = bytes([value]) * min(self.fillChunkSize, max(end - start, 0))
+        for offset in range(start, end, self.fillChunkSize):
+            length = min(self.fillChunkSize, end - offset)
+            self[offset:offset + length] = chunk if length == len(chunk) else chunk[:length]
+
     def reduce_buffer_to_match_content(self):
         current_offset = self.tell()
+        if self.isResizable:
+            # shrinking the mapping keeps content in place (a mapped file is truncated), nothing is copied
+            try:
+                self.resize(max(current_offset, 1))
+                self._max_size = current_offset
+                return self
+            except (BufferError, OSError, SystemError):
+                pass
+        if self._shared_views:
+            # values of components are views of the buffer, the content is not moved to a smaller buffer
+            self._max_size = current_offset
+            return self
         if current_offset == 0:
             # We cannot create mmap with size 0 so we set size to 1
             # but the current position (tell()) will stay at 0 so it will be fine
@@ -609,6 +787,86 @@ class Buffer(mmap):
         return new_buffer
 
 
+class DiskBuffer(Buffer):
+    """
+    Buffer backed by a temporary file, for images which may not fit in memory: the kernel writes pages of the mapping
+    back to the file instead of keeping them in memory (or swap), so the image size is limited by disk space.
+    The file is removed when the buffer is closed (on POSIX it has no name from the start).
+    """
+    filePrefix = 'ibst-buffer-'
+
+    def __new__(cls, length, directory=None):
+        file = None
+        try:
+            # pylint: disable-next=consider-using-with
+            file = tempfile.TemporaryFile(prefix=cls.filePrefix, dir=directory)
+            cls.reserve_file(file.fileno(), length)
+            buffer = super().__new__(cls, file.fileno(), length)
+        except (OSError, ValueError) as ex:
+            if file is not None:
+                file.close()
+            raise LibException(f"Cannot create buffer of size {length} in '{directory or tempfile.gettempdir()}': "
+                               f"{ex}") from ex
+        buffer._file = file  # pylint: disable=protected-access
+        return buffer
+
+    def __init__(self, length, directory=None):  # pylint: disable=unused-argument
+        super().__init__(self._file.fileno(), length)
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+    def __exit__(self, *_):
+        # mmap.__exit__ does not call overridden close
+        self.close()
+
+    def reduce_buffer_to_match_content(self):
+        if self.isResizable:
+            return super().reduce_buffer_to_match_content()
+        # the content stays in the file, a smaller mapping would copy it
+        self._max_size = self.tell()
+        return self
+
+
+class LayoutBuffer:
+    """
+    Buffer of layout pass, where only offsets and sizes of components are calculated. Written data is not stored,
+    only current position and the highest written offset are tracked, so the layout pass does not allocate memory.
+    """
+
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._position = 0
+        self.high_water_mark = 0
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=0):
+        position = offset + (0, self._position, self._max_size)[whence]
+        if position > sys.maxsize:
+            raise LibException(f"Value of {hex(offset)} is too big. Limit is {hex(sys.maxsize)}")
+        if not 0 <= position <= self._max_size:
+            raise InternalBufferTooSmallException(self.max_size)
+        self._position = position
+
+    def write(self, data):
+        end = self._position + len(data)
+        if end > self._max_size:
+            raise InternalBufferTooSmallException(self.max_size)
+        self._position = end
+        self.high_water_mark = max(self.high_water_mark, end)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
 class ValueWrapper:
     class Tags:
         VALUE = 'value'
@@ -30,11 +30,6 @@ import math
 from datetime import datetime
 from typing import Any, Tuple
 
-from cryptography.hazmat.primitives.asymmetric import rsa, ec, utils
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-
 from .FileManager import FileManager
 from .FileOpener import open_file
 from .LibException import LibException, ComponentException, JSONException, XmlAttrException, \
@@ -65,6 +60,18 @@ bin_operators_map = {  # python operators precedence
     '%': (operator.mod, True),
 }
 ILLEGAL_PATH_CHARACTERS = '[@!#$%^&*<>?|}{~:]'
+# Binary data types returned by formulas, memoryview is a read-only view of mapped input file
+BYTES_LIKE_TYPES = (bytes, bytearray, memoryview)
+
+
+def is_immutable_data(value) -> bool:
+    """Checks if bytes-like value cannot change, i.e. it is bytes or a read-only view of bytes or of a mapped file."""
+    if isinstance(value, bytes):
+        return True
+    if not isinstance(value, memoryview) or not value.readonly:
+        return False
+    # pylint: disable-next=unidiomatic-typecheck
+    return type(value.obj) in (bytes, mmap.mmap) or (isinstance(value.obj, ss.Buffer) and value.obj.readonly)
 
 
 def calc_operator(oper: str, left, right):
@@ -100,9 +107,18 @@ class ComponentProperty(Enum):
 
 
 def calculate_hash(buffer, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
+    return calculate_segments_hash([bytes(buffer)], hash_type, is_legacy)
+
+
+def calculate_segments_hash(segments, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
+    """Hashes concatenation of bytes-like segments without joining them."""
     if hash_type:
+        # pylint: disable=import-outside-toplevel
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives import hashes
         digest = hashes.Hash(ss.SupportedSHAs.get_sha_class(hash_type, is_legacy), backend=default_backend())
-        digest.update(bytes(buffer))
+        for segment in segments:
+            digest.update(segment)
         return digest.finalize()
     raise LibException("Hash type not supported")
 
@@ -120,19 +136,17 @@ def process_key_file(file_name, hash_type: ss.SupportedSHAs.ShaType, is_legacy:
         msg = f'Could not open key file - "{file_name}"'
         raise LibException(msg)
 
-    use_dbg_key = False
-
     with open_file(file_name, 'rb') as kfile:
-        line = b'(8:sequence'
-        buffer = kfile.read(len(line))
-        if line == buffer:
-            use_dbg_key = True
+        return process_key_data(kfile.read(), hash_type, is_legacy)
 
-    if use_dbg_key:
+
+def process_key_data(data: bytes, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
+    """Parses content of a key file."""
+    if data.startswith(b'(8:sequence'):
         # convert the raw data into the right structure
-        key = convert_rsa_key_format(file_name, hash_type, is_legacy)
+        key = convert_rsa_key_data(data, hash_type, is_legacy)
     else:
-        key = process_openssl_key(file_name, hash_type, is_legacy)
+        key = process_openssl_key_data(data, hash_type, is_legacy)
 
     if isinstance(key, ss.RsaSigningKey):
         expected_exponent = 0x010001
@@ -153,6 +167,7 @@ def hash_signing_key(signing_key, hash_type: ss.SupportedSHAs.ShaType, is_legacy
 
 
 def calculate_signature_r_s(signing_key, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
+    from cryptography.hazmat.primitives.asymmetric import ec, utils  # pylint: disable=import-outside-toplevel
     sig = signing_key.ec_key.sign(signing_key.hashed_key,
                                   ec.ECDSA(ss.SupportedSHAs.get_sha_class(hash_type, is_legacy)))
     r, s = utils.decode_dss_signature(sig)
@@ -161,10 +176,13 @@ def calculate_signature_r_s(signing_key, hash_type: ss.SupportedSHAs.ShaType, is
 
 
 def convert_rsa_key_format(key_file, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
-    stat = os.stat(key_file)
     with open_file(key_file, 'rb') as kfile:
-        mm = mmap.mmap(-1, stat.st_size)
-        mm.write(kfile.read())
+        return convert_rsa_key_data(kfile.read(), hash_type, is_legacy)
+
+
+def convert_rsa_key_data(data: bytes, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
+    with mmap.mmap(-1, len(data)) as mm:
+        mm.write(data)
         mm.seek(0)
 
         search = b'(11:private-key'
@@ -219,6 +237,9 @@ def convert_rsa_key_format(key_file, hash_type: ss.SupportedSHAs.ShaType, is_leg
         p = int.from_bytes(primep, 'little')
         q = int.from_bytes(primeq, 'little')
 
+        # pylint: disable=import-outside-toplevel
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.asymmetric import rsa
         ppn = rsa.RSAPrivateNumbers(p, q, d, rsa.rsa_crt_dmp1(d, p), rsa.rsa_crt_dmq1(d, q), rsa.rsa_crt_iqmp(p, q),
                                     rsa.RSAPublicNumbers(e, n))
         pkey = ppn.private_key(backend=default_backend())
@@ -237,6 +258,10 @@ def check_is_private_key(file_name):
 
 
 def process_private_key(data, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
+    # pylint: disable=import-outside-toplevel
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
     pkey = serialization.load_pem_private_key(data, password=None, backend=default_backend())
     if isinstance(pkey, rsa.RSAPrivateKey):
         return process_private_rsa_key(pkey, hash_type, is_legacy)
@@ -285,6 +310,10 @@ def process_public_ec_key(pkey, hash_type: ss.SupportedSHAs.ShaType, is_legacy:
 
 
 def process_public_key(data, hash_type, is_legacy):
+    # pylint: disable=import-outside-toplevel
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
     public_key = serialization.load_pem_public_key(data, default_backend())
     if isinstance(public_key, rsa.RSAPublicKey):
         return process_public_rsa_key(public_key, hash_type, is_legacy)
@@ -305,18 +334,20 @@ def process_public_rsa_key(pkey, hash_type, is_legacy):
 
 
 def process_openssl_key(file_name, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
-    is_private = check_is_private_key(file_name)
     with open_file(file_name, 'rb') as kfile:
-        data = kfile.read()
-        try:
-            if is_private:
-                signing_key = process_private_key(data, hash_type, is_legacy)
-            else:
-                signing_key = process_public_key(data, hash_type, is_legacy)
-        except (ValueError, IndexError, TypeError) as ex:
-            raise LibException(ex.args[0]) from None
+        return process_openssl_key_data(kfile.read(), hash_type, is_legacy)
 
-        return signing_key
+
+def process_openssl_key_data(data: bytes, hash_type: ss.SupportedSHAs.ShaType, is_legacy: bool):
+    try:
+        if b"PRIVATE" in data:
+            signing_key = process_private_key(data, hash_type, is_legacy)
+        else:
+            signing_key = process_public_key(data, hash_type, is_legacy)
+    except (ValueError, IndexError, TypeError) as ex:
+        raise LibException(ex.args[0]) from None
+
+    return signing_key
 
 
 def hashed_key_printer(signing_key, file_name):